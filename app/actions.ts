@@ -343,13 +343,16 @@ export async function markMessageAsUnread(
       return { success: false, error: "Message not found" };
     }
 
-    await db
-      .insert(InboxMessageOperationsTable)
-      .values({
+    await db.transaction(async (tx) => {
+      await tx.insert(InboxMessageOperationsTable).values({
         inboxMessageId: messageId,
         operation: "UNREAD",
-      })
-      .execute();
+      });
+      await tx
+        .update(InboxMessagesTable)
+        .set({ latestOperation: "UNREAD" })
+        .where(eq(InboxMessagesTable.id, messageId));
+    });
 
     revalidatePath(`/admin/messages/${messageId}`);
     revalidatePath(`/admin/inboxes/${inboxId}`);
@@ -366,13 +369,16 @@ export async function markMessageAsArchived(
 ) {
   const db = getDb();
 
-  await db
-    .insert(InboxMessageOperationsTable)
-    .values({
+  await db.transaction(async (tx) => {
+    await tx.insert(InboxMessageOperationsTable).values({
       inboxMessageId: messageId,
       operation: "ARCHIVED",
-    })
-    .execute();
+    });
+    await tx
+      .update(InboxMessagesTable)
+      .set({ latestOperation: "ARCHIVED" })
+      .where(eq(InboxMessagesTable.id, messageId));
+  });
 
   revalidatePath(`/admin/messages/${messageId}`);
   revalidatePath(`/admin/inboxes/${inboxId}`);
@@ -466,15 +472,18 @@ export async function bulkArchiveMessages(
 ) {
   const db = getDb();
 
-  await db
-    .insert(InboxMessageOperationsTable)
-    .values(
+  await db.transaction(async (tx) => {
+    await tx.insert(InboxMessageOperationsTable).values(
       messageIds.map((messageId) => ({
         inboxMessageId: messageId,
         operation: "ARCHIVED" as const,
       }))
-    )
-    .execute();
+    );
+    await tx
+      .update(InboxMessagesTable)
+      .set({ latestOperation: "ARCHIVED" })
+      .where(inArray(InboxMessagesTable.id, messageIds));
+  });
 
   revalidatePath(`/admin/inboxes/${inboxId}`);
   revalidatePath("/admin/inboxes");
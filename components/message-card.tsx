@@ -88,6 +88,8 @@ const MessageCard = ({
       return "bg-amber-100 text-amber-800";
     } else if (status === "ARCHIVED") {
       return "bg-gray-100 text-gray-800";
+    } else if (status === "FAILED") {
+      return "bg-red-100 text-red-800";
     } else {
       return "bg-green-100 text-green-800";
     }
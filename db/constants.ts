@@ -10,6 +10,7 @@ export const InboxMessageOperationTypes = [
   "READ",
   "ARCHIVED",
   "UNREAD",
+  "FAILED",
 ] as const;
 
 export const AppTypes = [
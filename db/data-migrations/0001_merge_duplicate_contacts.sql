@@ -0,0 +1,80 @@
+-- Merge contacts that share an email, phone number or Slack ID so the unique
+-- constraints on those columns can be created. The oldest contact in each group
+-- is kept; the others' messages, recipients, chat sessions, jobs and GitHub repos
+-- are repointed to it, and any identifiers it lacks are copied over. Safe to run
+-- more than once: after the first run there is nothing left to merge.
+DO $$
+DECLARE
+  identifier text;
+BEGIN
+  IF to_regclass('public.contacts') IS NULL THEN
+    RETURN;
+  END IF;
+
+  FOREACH identifier IN ARRAY ARRAY['email', 'phone_number', 'slack_id'] LOOP
+    EXECUTE format(
+      'CREATE TEMP TABLE contact_merges AS
+       SELECT id AS duplicate_id, canonical_id FROM (
+         SELECT id, first_value(id) OVER (PARTITION BY %1$I ORDER BY created_at, id) AS canonical_id
+         FROM contacts
+         WHERE %1$I IS NOT NULL
+       ) ranked
+       WHERE id <> canonical_id',
+      identifier
+    );
+
+    UPDATE contacts c
+    SET email = COALESCE(c.email, d.email),
+        phone_number = COALESCE(c.phone_number, d.phone_number),
+        full_name = COALESCE(c.full_name, d.full_name),
+        slack_id = COALESCE(c.slack_id, d.slack_id),
+        slack_display_name = COALESCE(c.slack_display_name, d.slack_display_name),
+        supports_imessage = c.supports_imessage OR d.supports_imessage
+    FROM (
+      SELECT m.canonical_id,
+             max(dup.email) AS email,
+             max(dup.phone_number) AS phone_number,
+             max(dup.full_name) AS full_name,
+             max(dup.slack_id) AS slack_id,
+             max(dup.slack_display_name) AS slack_display_name,
+             bool_or(dup.supports_imessage) AS supports_imessage
+      FROM contact_merges m
+      JOIN contacts dup ON dup.id = m.duplicate_id
+      GROUP BY m.canonical_id
+    ) d
+    WHERE c.id = d.canonical_id;
+
+    UPDATE inbox_messages t SET contact_id = m.canonical_id
+    FROM contact_merges m WHERE t.contact_id = m.duplicate_id;
+
+    UPDATE outbox_message_recipients t SET contact_id = m.canonical_id
+    FROM contact_merges m WHERE t.contact_id = m.duplicate_id;
+
+    UPDATE chat_sessions t SET contact_id = m.canonical_id
+    FROM contact_merges m WHERE t.contact_id = m.duplicate_id;
+
+    UPDATE jobs t SET contact_id = m.canonical_id
+    FROM contact_merges m WHERE t.contact_id = m.duplicate_id;
+
+    -- Keep one row per repo in each merged group so unique_contact_repo still holds
+    DELETE FROM contact_github_repos t
+    USING contact_merges m
+    WHERE t.contact_id = m.duplicate_id
+      AND EXISTS (
+        SELECT 1
+        FROM contact_github_repos other
+        LEFT JOIN contact_merges other_merge ON other_merge.duplicate_id = other.contact_id
+        WHERE COALESCE(other_merge.canonical_id, other.contact_id) = m.canonical_id
+          AND other.repo_owner = t.repo_owner
+          AND other.repo_name = t.repo_name
+          AND (other.contact_id = m.canonical_id OR other.id < t.id)
+      );
+
+    UPDATE contact_github_repos t SET contact_id = m.canonical_id
+    FROM contact_merges m WHERE t.contact_id = m.duplicate_id;
+
+    DELETE FROM contacts c USING contact_merges m WHERE c.id = m.duplicate_id;
+
+    DROP TABLE contact_merges;
+  END LOOP;
+END $$;
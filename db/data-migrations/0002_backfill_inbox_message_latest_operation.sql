@@ -0,0 +1,28 @@
+-- Add inbox_messages.latest_operation and fill it from the operations log in the same
+-- transaction. Left to the schema push, the column would start out null for every
+-- message, which the unread index and claims treat as unread, so old mail would be
+-- triaged and answered again. Runs only while the column is missing, so it is a no-op
+-- once applied.
+DO $$
+BEGIN
+  IF to_regclass('public.inbox_messages') IS NULL
+    OR EXISTS (
+      SELECT 1 FROM information_schema.columns
+      WHERE table_schema = 'public'
+        AND table_name = 'inbox_messages'
+        AND column_name = 'latest_operation'
+    ) THEN
+    RETURN;
+  END IF;
+
+  ALTER TABLE inbox_messages ADD COLUMN latest_operation inbox_message_operation_type;
+
+  UPDATE inbox_messages m
+  SET latest_operation = latest.operation
+  FROM (
+    SELECT DISTINCT ON (inbox_message_id) inbox_message_id, operation
+    FROM inbox_message_operations
+    ORDER BY inbox_message_id, created_at DESC
+  ) latest
+  WHERE latest.inbox_message_id = m.id;
+END $$;
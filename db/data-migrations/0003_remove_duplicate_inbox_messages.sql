@@ -0,0 +1,46 @@
+-- Remove redelivered inbox messages that share an inbox and external_id so the
+-- unique_inbox_external_id constraint can be created. The oldest message in each
+-- group is kept; replies and operations of the others are repointed to it, and its
+-- latest_operation is recomputed from the combined log. Safe to run more than once:
+-- after the first run there is nothing left to remove.
+DO $$
+BEGIN
+  IF to_regclass('public.inbox_messages') IS NULL THEN
+    RETURN;
+  END IF;
+
+  CREATE TEMP TABLE inbox_message_merges AS
+  SELECT id AS duplicate_id, canonical_id FROM (
+    SELECT id, first_value(id) OVER (PARTITION BY inbox_id, external_id ORDER BY created_at, id) AS canonical_id
+    FROM inbox_messages
+    WHERE external_id IS NOT NULL
+  ) ranked
+  WHERE id <> canonical_id;
+
+  UPDATE outbox_messages t SET parent_inbox_message_id = m.canonical_id
+  FROM inbox_message_merges m WHERE t.parent_inbox_message_id = m.duplicate_id;
+
+  UPDATE inbox_message_operations t SET inbox_message_id = m.canonical_id
+  FROM inbox_message_merges m WHERE t.inbox_message_id = m.duplicate_id;
+
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'public'
+      AND table_name = 'inbox_messages'
+      AND column_name = 'latest_operation'
+  ) THEN
+    UPDATE inbox_messages c
+    SET latest_operation = latest.operation
+    FROM (
+      SELECT DISTINCT ON (inbox_message_id) inbox_message_id, operation
+      FROM inbox_message_operations
+      WHERE inbox_message_id IN (SELECT canonical_id FROM inbox_message_merges)
+      ORDER BY inbox_message_id, created_at DESC
+    ) latest
+    WHERE c.id = latest.inbox_message_id;
+  END IF;
+
+  DELETE FROM inbox_messages c USING inbox_message_merges m WHERE c.id = m.duplicate_id;
+
+  DROP TABLE inbox_message_merges;
+END $$;
@@ -1,5 +1,8 @@
+import { sql } from "drizzle-orm";
 import {
   boolean,
+  index,
+  integer,
   jsonb,
   pgEnum,
   pgTable,
@@ -43,29 +46,60 @@ export const InboxesTable = pgTable("inboxes", {
 
 export type Inbox = typeof InboxesTable.$inferSelect;
 
-export const InboxMessagesTable = pgTable("inbox_messages", {
-  id: uuid("id").primaryKey().defaultRandom(),
-  inboxId: uuid("inbox_id")
-    .notNull()
-    .references(() => InboxesTable.id),
-  body: text("body").notNull(),
-  threadId: varchar("thread_id"),
-  externalId: varchar("external_id"),
-  contactId: uuid("contact_id")
-    .notNull()
-    .references(() => ContactsTable.id),
-  createdAt: timestamp("created_at").defaultNow().notNull(),
-  metadata: jsonb("metadata"),
-});
-
 export type InboxMessageOperationType =
   (typeof InboxMessageOperationTypes)[number];
-/** Enum for inbox message operation types - includes READ, ARCHIVED, and UNREAD */
+/** Enum for inbox message operation types - includes READ, ARCHIVED, UNREAD, and FAILED */
 export const InboxMessageOperationTypesEnum = pgEnum(
   "inbox_message_operation_type",
   InboxMessageOperationTypes
 );
 
+export const InboxMessagesTable = pgTable(
+  "inbox_messages",
+  {
+    id: uuid("id").primaryKey().defaultRandom(),
+    inboxId: uuid("inbox_id")
+      .notNull()
+      .references(() => InboxesTable.id),
+    body: text("body").notNull(),
+    threadId: varchar("thread_id"),
+    externalId: varchar("external_id"),
+    contactId: uuid("contact_id")
+      .notNull()
+      .references(() => ContactsTable.id),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+    metadata: jsonb("metadata"),
+    /** Projection of the newest inbox_message_operations row, null until the first operation.
+     * Added and backfilled by db/data-migrations/0002_backfill_inbox_message_latest_operation.sql. */
+    latestOperation: InboxMessageOperationTypesEnum("latest_operation"),
+    /** Worker currently triaging the message, cleared once it finishes */
+    leasedBy: varchar("leased_by"),
+    /** After this time another worker may reclaim the message */
+    leasedUntil: timestamp("leased_until"),
+    /** Times the message has been claimed since it was last unread; it is marked FAILED after too many */
+    claimAttempts: integer("claim_attempts").notNull().default(0),
+  },
+  (table) => ({
+    unreadCreatedAtIdx: index("inbox_messages_unread_created_at_idx")
+      .on(table.createdAt)
+      .where(
+        sql`latest_operation IS NULL OR latest_operation = 'UNREAD'`
+      ),
+    leasedUntilIdx: index("inbox_messages_leased_until_idx")
+      .on(table.leasedUntil)
+      .where(sql`leased_until IS NOT NULL`),
+    contactCreatedAtIdx: index("inbox_messages_contact_created_at_idx").on(
+      table.contactId,
+      table.createdAt
+    ),
+    /** db/data-migrations/0003_remove_duplicate_inbox_messages.sql removes existing redeliveries first */
+    uniqueInboxExternalId: unique("unique_inbox_external_id").on(
+      table.inboxId,
+      table.externalId
+    ),
+  })
+);
+
 export const InboxMessageOperationsTable = pgTable("inbox_message_operations", {
   id: uuid("id").primaryKey().defaultRandom(),
   inboxMessageId: uuid("inbox_message_id")
@@ -78,10 +112,12 @@ export const InboxMessageOperationsTable = pgTable("inbox_message_operations", {
 
 export const ContactsTable = pgTable("contacts", {
   id: uuid("id").primaryKey().defaultRandom(),
-  email: varchar("email"),
-  phoneNumber: varchar("phone_number"),
+  /** Unique identifiers are the ON CONFLICT targets for get-or-create; nulls never conflict.
+   * db/data-migrations/0001_merge_duplicate_contacts.sql merges existing duplicates first. */
+  email: varchar("email").unique(),
+  phoneNumber: varchar("phone_number").unique(),
   fullName: varchar("full_name"),
-  slackId: varchar("slack_id"),
+  slackId: varchar("slack_id").unique(),
   slackDisplayName: varchar("slack_display_name"),
   supportsImessage: boolean("supports_imessage").default(false),
   status: ContactStatusesEnum("status").default("NEW"),
@@ -90,16 +126,22 @@ export const ContactsTable = pgTable("contacts", {
 
 export type Contact = typeof ContactsTable.$inferSelect;
 
-export const OutboxMessagesTable = pgTable("outbox_messages", {
-  id: uuid("id").primaryKey().defaultRandom(),
-  parentInboxMessageId: uuid("parent_inbox_message_id")
-    .notNull()
-    .references(() => InboxMessagesTable.id),
-  body: text("body").notNull(),
-  threadId: varchar("thread_id"),
-  createdAt: timestamp("created_at").defaultNow().notNull(),
-  type: InboxTypesEnum("type").notNull(),
-});
+export const OutboxMessagesTable = pgTable(
+  "outbox_messages",
+  {
+    id: uuid("id").primaryKey().defaultRandom(),
+    parentInboxMessageId: uuid("parent_inbox_message_id")
+      .notNull()
+      .references(() => InboxMessagesTable.id),
+    body: text("body").notNull(),
+    threadId: varchar("thread_id"),
+    createdAt: timestamp("created_at").defaultNow().notNull(),
+    type: InboxTypesEnum("type").notNull(),
+  },
+  (table) => ({
+    createdAtIdx: index("outbox_messages_created_at_idx").on(table.createdAt),
+  })
+);
 
 export const OutboxMessageRecipientsTable = pgTable(
   "outbox_message_recipients",
@@ -112,7 +154,13 @@ export const OutboxMessageRecipientsTable = pgTable(
       .notNull()
       .references(() => ContactsTable.id),
     type: OutboxRecipientTypesEnum("type").notNull(),
-  }
+  },
+  (table) => ({
+    contactMessageIdx: index("outbox_message_recipients_contact_message_idx").on(
+      table.contactId,
+      table.messageId
+    ),
+  })
 );
 
 export const ApplicationsTable = pgTable("applications", {
@@ -3,6 +3,7 @@
 import { execSync } from "child_process";
 import { existsSync, readdirSync, readFileSync } from "fs";
 import { join } from "path";
+import { Client } from "pg";
 import { postGitHubComment, getNeonPreviewDatabaseUrl } from "./utils";
 
 async function sendSlackMessageToEng(
@@ -128,6 +129,7 @@ class MigrationRunner {
   private dbDir: string;
   private isPreviewMode: boolean;
   private readonly TEMP_DIR = "./migrations-temp";
+  private readonly DATA_MIGRATIONS_DIR = "data-migrations";
 
   constructor(isPreviewMode: boolean = false) {
     this.dbDir = join(process.cwd(), "db");
@@ -297,6 +299,17 @@ class MigrationRunner {
       }
     }
 
+    const dataMigrations = this.readDataMigrations();
+    if (dataMigrations.length > 0) {
+      migrationContent +=
+        "\n🧹 **Data migrations run before the schema is pushed:**\n\n";
+      console.log("\n🧹 Data migrations run before the schema is pushed:");
+      for (const { file, sql } of dataMigrations) {
+        migrationContent += `-- ${file}\n${sql}\n`;
+        console.log(`-- ${file}\n${sql}`);
+      }
+    }
+
     migrationContent +=
       "\n✅ **End of migration preview** - The above SQL statements would be applied to update your database schema.\n";
     console.log("✅ End of migration preview");
@@ -308,6 +321,8 @@ class MigrationRunner {
         "Posted migration preview comment to PR"
       );
     } else {
+      await this.applyDataMigrations(postgresUrl, dataMigrations);
+
       console.log("🚀 Applying migrations to production database...");
       try {
         execSync(
@@ -327,6 +342,53 @@ class MigrationRunner {
 
     execSync(`rm -rf ${tempMigrationsDir}`, { cwd: process.cwd() });
   }
+
+  /**
+   * Data migrations reshape existing rows before the schema push, e.g. merging duplicates
+   * before a unique constraint is added, or adding and backfilling a column in one
+   * transaction so no reader sees it empty. Each must be safe to run repeatedly.
+   */
+  private readDataMigrations(): { file: string; sql: string }[] {
+    const dataMigrationsDir = join(this.dbDir, this.DATA_MIGRATIONS_DIR);
+    if (!existsSync(dataMigrationsDir)) {
+      return [];
+    }
+
+    return readdirSync(dataMigrationsDir)
+      .filter((file) => file.endsWith(".sql"))
+      .sort()
+      .map((file) => ({
+        file,
+        sql: readFileSync(join(dataMigrationsDir, file), "utf8"),
+      }));
+  }
+
+  private async applyDataMigrations(
+    postgresUrl: string,
+    dataMigrations: { file: string; sql: string }[]
+  ): Promise<void> {
+    if (dataMigrations.length === 0) {
+      return;
+    }
+
+    const client = new Client({ connectionString: postgresUrl });
+    await client.connect();
+    try {
+      for (const { file, sql } of dataMigrations) {
+        console.log(`🧹 Applying data migration ${file}...`);
+        try {
+          await client.query("BEGIN");
+          await client.query(sql);
+          await client.query("COMMIT");
+        } catch (error) {
+          await client.query("ROLLBACK");
+          throw new Error(`Failed to apply data migration ${file}: ${error}`);
+        }
+      }
+    } finally {
+      await client.end();
+    }
+  }
 }
 
 async function main() {
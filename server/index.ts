@@ -127,15 +127,20 @@ export const addInboxMessage = async ({
     throw new NotFoundError("Inbox not found");
   }
 
-  await db.insert(InboxMessagesTable).values({
-    body: body,
-    inboxId: inbox[0].id,
-    threadId,
-    externalId,
-    createdAt,
-    metadata,
-    contactId,
-  });
+  await db
+    .insert(InboxMessagesTable)
+    .values({
+      body: body,
+      inboxId: inbox[0].id,
+      threadId,
+      externalId,
+      createdAt,
+      metadata,
+      contactId,
+    })
+    .onConflictDoNothing({
+      target: [InboxMessagesTable.inboxId, InboxMessagesTable.externalId],
+    });
 };
 
 export const postSlackMessage = async ({
@@ -14,6 +14,7 @@ from workflows.triage_message.workflow import TriageMessageWorkflow
 from evals.base import BaseEval
 from evals.metrics import BaseMetric, ExactMatchMetric, RegexMatchMetric
 from services import postgres_session
+from services.contacts import invalidate_contact
 from sqlmodel import select
 from models.inbox import Inbox
 from models.contact import Contact
@@ -175,6 +176,7 @@ class EvalRunner:
                     contact = session.get(Contact, record_id)
                     if contact:
                         session.delete(contact)
+                    invalidate_contact(record_id)
                 elif record_type == "inbox":
                     inbox = session.get(Inbox, record_id)
                     if inbox:
@@ -3,6 +3,7 @@ from typing import Optional, Any
 from uuid import UUID, uuid4
 from sqlmodel import SQLModel, Field, Column
 from sqlalchemy import JSON
+from models.types import InboxMessageOperationType
 
 
 class InboxMessage(SQLModel, table=True):
@@ -15,6 +16,12 @@ class InboxMessage(SQLModel, table=True):
     thread_id: Optional[str] = Field(default=None, sa_column_kwargs={"name": "thread_id"})
     external_id: Optional[str] = Field(default=None, sa_column_kwargs={"name": "external_id"})
     message_metadata: Optional[dict[str, Any]] = Field(default=None, sa_column=Column("metadata", JSON))
+    latest_operation: Optional[InboxMessageOperationType] = Field(
+        default=None, sa_column_kwargs={"name": "latest_operation"}
+    )
+    leased_by: Optional[str] = Field(default=None, sa_column_kwargs={"name": "leased_by"})
+    leased_until: Optional[datetime] = Field(default=None, sa_column_kwargs={"name": "leased_until"})
+    claim_attempts: int = Field(default=0, sa_column_kwargs={"name": "claim_attempts"})
     created_at: datetime = Field(
         default_factory=lambda: datetime.now(UTC),
         sa_column_kwargs={"name": "created_at"},
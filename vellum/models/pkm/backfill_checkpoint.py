@@ -0,0 +1,12 @@
+from datetime import date, datetime
+from sqlmodel import Field, SQLModel
+from models.types import Sport
+
+
+class BackfillCheckpoint(SQLModel, table=True):
+    __tablename__ = "backfill_checkpoints"
+
+    sport: Sport = Field(primary_key=True)
+    game_date: date = Field(primary_key=True)
+    games: int
+    completed_at: datetime
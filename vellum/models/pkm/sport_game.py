@@ -1,10 +1,31 @@
 from datetime import datetime
 from uuid import UUID, uuid4
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
 class SportGame(SQLModel, table=True):
     __tablename__ = "sport_games"
+    # Kept in sync with the pkm.db migrations in services/pkm_migrations.py
+    __table_args__ = (
+        Index("sport_games_start_time_teams_idx", "start_time", "home_team_id", "away_team_id", unique=True),
+        Index(
+            "sport_games_home_team_start_time_idx",
+            "home_team_id",
+            "start_time",
+            "away_team_id",
+            "home_team_score",
+            "away_team_score",
+        ),
+        Index(
+            "sport_games_away_team_start_time_idx",
+            "away_team_id",
+            "start_time",
+            "home_team_id",
+            "home_team_score",
+            "away_team_score",
+        ),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     home_team_id: UUID = Field(foreign_key="sport_teams.id")
@@ -13,9 +34,3 @@ class SportGame(SQLModel, table=True):
     away_team_score: int
     start_time: datetime
     end_time: datetime
-
-    class Config:
-        table = True
-        json_schema_extra = {
-            "unique_together": [("start_time", "home_team_id", "away_team_id")]
-        }
@@ -1,17 +1,25 @@
+from typing import Optional
 from uuid import UUID, uuid4
+from sqlalchemy import Column, Computed, Index, String
 from sqlmodel import Field, SQLModel
 from models.types import Sport
 
 
 class SportTeam(SQLModel, table=True):
     __tablename__ = "sport_teams"
+    # Kept in sync with the pkm.db migrations in services/pkm_migrations.py
+    __table_args__ = (
+        Index("sport_teams_sport_espn_id_idx", "sport", "espn_id"),
+        Index("sport_teams_sport_full_name_idx", "sport", "full_name"),
+    )
 
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     location: str
     name: str
     sport: Sport
     espn_id: str
-
-    @property
-    def full_name(self) -> str:
-        return f"{self.location} {self.name}"
+    # Generated by SQLite from location and name, so it is never written
+    full_name: Optional[str] = Field(
+        default=None,
+        sa_column=Column("full_name", String, Computed("location || ' ' || name", persisted=False)),
+    )
@@ -18,6 +18,7 @@ class InboxMessageOperationType(str, Enum):
     READ = "READ"
     ARCHIVED = "ARCHIVED"
     UNREAD = "UNREAD"
+    FAILED = "FAILED"
 
 
 class OutboxRecipientType(str, Enum):
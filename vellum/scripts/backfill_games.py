@@ -1,9 +1,28 @@
-from datetime import datetime, timedelta
-from services import fetch_scoreboard_on_date
+import argparse
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from models.types import Sport
+from services import create_console_logger
+from services.sport_games import DEFAULT_BACKFILL_WORKERS, backfill_sport_games
 
 
 if __name__ == "__main__":
-    today = datetime.now()
-    for i in range(1):
-        date = today - timedelta(days=i) - timedelta(days=2)
-        games = fetch_scoreboard_on_date(date)  # type: ignore
+    load_dotenv()
+    yesterday = date.today() - timedelta(days=1)
+    parser = argparse.ArgumentParser(description="Record completed games from ESPN into pkm.db")
+    parser.add_argument("--start", type=date.fromisoformat, default=yesterday, help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=yesterday, help="Last day, inclusive, YYYY-MM-DD")
+    parser.add_argument("--sport", type=Sport, action="append", choices=list(Sport), help="Repeat to select several")
+    parser.add_argument("--workers", type=int, default=DEFAULT_BACKFILL_WORKERS)
+    parser.add_argument("--no-resume", action="store_true", help="Refetch days already checkpointed")
+    args = parser.parse_args()
+
+    result = backfill_sport_games(
+        args.start,
+        args.end,
+        create_console_logger("backfill_games"),
+        sports=args.sport,
+        max_workers=args.workers,
+        resume=not args.no_resume,
+    )
+    print(result.model_dump_json(indent=2))
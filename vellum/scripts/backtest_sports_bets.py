@@ -0,0 +1,38 @@
+import argparse
+import json
+from datetime import date, timedelta
+from dotenv import load_dotenv
+from models.types import Sport
+from services.backtest import BacktestConfig, load_backtest_games, run_backtest_grid
+from services.database import sqlite_session
+from services.sport_predictions import RecencyParams
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    defaults = RecencyParams()
+    parser = argparse.ArgumentParser(description="Backtest the make_sports_bets strategy against pkm.db")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today() - timedelta(days=365), help="First day, YYYY-MM-DD")
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today() - timedelta(days=1), help="Last day, inclusive, YYYY-MM-DD")
+    parser.add_argument("--sport", type=Sport, action="append", choices=list(Sport), help="Repeat to select several")
+    parser.add_argument("--home-multiplier", type=float, action="append", help="Repeat to sweep several")
+    parser.add_argument("--window", type=int, action="append", help="Repeat to sweep several")
+    parser.add_argument("--initial-balance", type=float, default=BacktestConfig().initial_balance)
+    parser.add_argument("--spread", type=float, default=BacktestConfig().spread, help="Home line every game is settled against")
+    parser.add_argument("--odds", type=int, default=BacktestConfig().odds, help="American odds every pick is paid at")
+    args = parser.parse_args()
+
+    windows = args.window or [defaults.window]
+    with sqlite_session(read_only=True) as session:
+        games = load_backtest_games(session, args.end, max(windows))
+
+    results = run_backtest_grid(
+        games,
+        args.start,
+        args.end,
+        home_multipliers=args.home_multiplier or [defaults.home_multiplier],
+        windows=windows,
+        config=BacktestConfig(initial_balance=args.initial_balance, spread=args.spread, odds=args.odds),
+        sports=args.sport,
+    )
+    print(json.dumps([result.model_dump(mode="json") for result in results], indent=2))
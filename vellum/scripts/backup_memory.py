@@ -1,5 +1,6 @@
-from services import backup_memory
+from services import backup_memory, create_console_logger
 
 
 if __name__ == "__main__":
-    backup_memory()  # type: ignore
+    result = backup_memory(create_console_logger("backup_memory"))
+    print(result.model_dump_json(indent=2))
@@ -1,8 +1,12 @@
+import argparse
+from services import create_console_logger
 from services.aws import download_memory
-import logging
 
-logger = logging.getLogger(__name__)
 
 if __name__ == "__main__":
-    download_memory(logger)
+    parser = argparse.ArgumentParser(description="Restore the memory directory from S3")
+    parser.add_argument("--prefix", action="append", help="Only restore keys starting with this, e.g. reports/. Repeat to select several")
+    args = parser.parse_args()
 
+    result = download_memory(create_console_logger("download_memory"), prefixes=args.prefix)
+    print(result.model_dump_json(indent=2))
@@ -0,0 +1,19 @@
+import argparse
+from dotenv import load_dotenv
+from services import create_console_logger
+from services.database import get_sqlite_engine
+from services.pkm_export import PKM_EXPORT_DIR, PKM_EXPORT_TABLES, export_pkm
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export pkm.db tables to partitioned Parquet files")
+    parser.add_argument("--table", action="append", choices=[table.name for table in PKM_EXPORT_TABLES], help="Repeat to select several")
+    parser.add_argument("--full", action="store_true", help="Discard previous exports and export every row again")
+    args = parser.parse_args()
+
+    with get_sqlite_engine(read_only=True).connect() as connection:
+        manifest = export_pkm(connection, create_console_logger("export_pkm"), tables=args.table, full=args.full)
+
+    print(f"Exported to {PKM_EXPORT_DIR}")
+    print(manifest.model_dump_json(indent=2))
@@ -1,57 +1,19 @@
-import importlib
-import inspect
-import pkgutil
 import sys
-from sqlmodel import SQLModel, text
-from services import sqlite_session
+from services import create_console_logger
+from services.database import get_sqlite_engine
+from services.pkm_migrations import migrate_pkm
 
 
 if __name__ == "__main__":
-    # Import the pkm models module
     dry_run = "--dry-run" in sys.argv  # type: ignore
-    pkm_module = importlib.import_module("models.pkm")
+    logger = create_console_logger("pkm_migrate")
 
-    pkm_models: list[type[SQLModel]] = []
-    for _, name, _ in pkgutil.iter_modules(pkm_module.__path__):  # type: ignore
-        pkm_model_module = importlib.import_module(f"{pkm_module.__name__}.{name}")
-        sql_model = next(
-            (
-                cls
-                for _, cls in inspect.getmembers(pkm_model_module)
-                if inspect.isclass(cls) and issubclass(cls, SQLModel) and cls != SQLModel
-            ),
-            None,
-        )
-        if not sql_model:
-            raise ValueError(f"No SQLModel found in {pkm_model_module.__name__}")
+    with get_sqlite_engine(check_schema=False).connect() as connection:
+        applied = migrate_pkm(connection, logger, dry_run=dry_run)
 
-        pkm_models.append(sql_model)
-
-    # Create engine and tables
-    with sqlite_session() as session:
-        existing_tables = set(
-            [
-                row[0]
-                for row in session.exec(
-                    text(
-                        """\
-SELECT name 
-FROM sqlite_master 
-WHERE type='table'
-AND name not like 'sqlite_%'"""
-                    )
-                ).fetchall()
-            ]
-        )
-
-        models_to_create = [model for model in pkm_models if model.__tablename__ not in existing_tables]
-
-        if models_to_create:
-            for model in models_to_create:
-                print(f"Creating table: {model.__tablename__}")
-                if not dry_run:
-                    SQLModel.metadata.create_all(session.bind, tables=[getattr(model, "__table__")])
-        else:
-            print("No models to create")
-
-    print("Successfully migrated!")
+    if not applied:
+        print("No migrations to apply")
+    elif dry_run:
+        print(f"Would apply {len(applied)} migrations")
+    else:
+        print("Successfully migrated!")
@@ -0,0 +1,22 @@
+import os
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+from services.sql_metrics import write_query_report
+from workflows.triage_message.batch import run_triage_batch
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    report_dir = os.getenv("SQL_METRICS_REPORT_DIR")
+
+    results = run_triage_batch(limit=limit, max_workers=max_workers)
+    for result in results:
+        status = "fulfilled" if result.fulfilled else f"failed: {result.error}"
+        print(f"{result.message_id} {status} {result.summary or ''}")
+        if report_dir and result.query_report:
+            print(f"  SQL report: {write_query_report(result.query_report, Path(report_dir))}")
+    print(f"Triaged {sum(r.fulfilled for r in results)}/{len(results)} messages")
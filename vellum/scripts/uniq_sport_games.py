@@ -1,50 +1,20 @@
-from sqlmodel import select, func
-from services import sqlite_session
-from models.pkm.sport_game import SportGame
-from models.pkm.sport_team import SportTeam
-from sqlalchemy.orm import aliased
+import argparse
+from pathlib import Path
+from dotenv import load_dotenv
+from services.database import get_sqlite_engine
+from services.sport_games import dedupe_sport_games
 
 
-def main():
-    with sqlite_session() as session:
-        HomeTeam = aliased(SportTeam, name="home_team")
-        AwayTeam = aliased(SportTeam, name="away_team")
-        statement = (
-            select(
-                func.count(SportGame.id).label("count"),
-                AwayTeam.name.label("away_name"),
-                HomeTeam.name.label("home_name"),
-                AwayTeam.id.label("away_team_id"),
-                HomeTeam.id.label("home_team_id"),
-                SportGame.start_time,
-            )
-            .join(AwayTeam, AwayTeam.id == SportGame.away_team_id)
-            .join(HomeTeam, HomeTeam.id == SportGame.home_team_id)
-            .group_by(SportGame.start_time, SportGame.home_team_id, SportGame.away_team_id)
-            .order_by(func.count(SportGame.id).desc())
-            .limit(40)
-        )
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Delete duplicate games with the same start time and teams from pkm.db")
+    parser.add_argument("--dry-run", action="store_true", help="Only count the duplicates")
+    parser.add_argument("--db", type=Path, help="Database file. Defaults to MEMORY_DIR/pkm.db.")
+    args = parser.parse_args()
 
-        results = session.exec(statement).all()
-        games_to_delete = []
-        for result in results:
-            if result.count <= 1:
-                print(
-                    f"Found only {result.count} game for {result.away_name}@{result.home_name} on {result.start_time}"
-                )
-                continue
+    # Also runs on a database that hasn't been migrated yet, which is when duplicates block migration 1
+    with get_sqlite_engine(path=args.db, check_schema=False).connect() as connection:
+        result = dedupe_sport_games(connection, dry_run=args.dry_run)
 
-            duplicate_games = select(SportGame).where(
-                SportGame.start_time == result.start_time,
-                SportGame.home_team_id == result.home_team_id,
-                SportGame.away_team_id == result.away_team_id,
-            )
-            duplicates = session.exec(duplicate_games).all()
-            print(
-                f"Found {len(duplicates)} duplicate games for {result.away_name}@{result.home_name} on {result.start_time}"
-            )
-            games_to_delete.extend(duplicates[1:])
-
-        for game in games_to_delete:
-            session.delete(game)
-        session.commit()
+    action = "Found" if args.dry_run else "Deleted"
+    print(f"{action} {result.duplicates} duplicate games in {result.groups} groups")
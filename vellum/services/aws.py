@@ -1,14 +1,15 @@
 from datetime import datetime
+import threading
 import boto3
 import os
+from botocore.config import Config
 from logging import Logger
-from services.constants import MEMORY_DIR
 from email.utils import formataddr
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email import message_from_bytes
 from email.message import Message
-from typing import Any, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 
 
 def get_region() -> str:
@@ -16,10 +17,50 @@ def get_region() -> str:
     return os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION") or "us-east-1"
 
 
-def get_aws_session() -> boto3.Session:
-    """Get AWS session for vargasjr-vellum user."""
-    region = get_region()
-    return boto3.Session(region_name=region)
+AWS_CLIENT_CONFIG = Config(
+    max_pool_connections=32,
+    connect_timeout=5,
+    read_timeout=60,
+    tcp_keepalive=True,
+    retries={"max_attempts": 5, "mode": "adaptive"},
+)
+
+AwsClientFactory = Callable[[str, str], Any]
+
+_clients: Dict[Tuple[str, str], Any] = {}
+_clients_lock = threading.Lock()
+_client_factory: Optional[AwsClientFactory] = None
+
+
+def _create_aws_client(service: str, region: str) -> Any:
+    return boto3.Session(region_name=region).client(service, config=AWS_CLIENT_CONFIG)  # type: ignore[call-overload]
+
+
+def get_aws_client(service: str, region: Optional[str] = None) -> Any:
+    """
+    Get the process-wide client for an AWS service and region.
+
+    Clients are created once and shared, which is safe across threads, so botocore's
+    service models and the credentials are only loaded on first use.
+    """
+    key = (service, region or get_region())
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = (_client_factory or _create_aws_client)(*key)
+            _clients[key] = client
+        return client
+
+
+def set_aws_client_factory(factory: Optional[AwsClientFactory]) -> None:
+    """
+    Replace how clients are created, e.g. with clients of a local stand-in like moto or
+    LocalStack, and drop every cached client. Pass None to restore the default.
+    """
+    global _client_factory
+    with _clients_lock:
+        _client_factory = factory
+        _clients.clear()
 
 
 def generate_s3_key(base_key: str) -> str:
@@ -42,33 +83,11 @@ def generate_s3_key(base_key: str) -> str:
     return f"previews/{preview_id}/{base_key}"
 
 
-def download_memory(logger: Logger):
-    session = get_aws_session()
-    s3_client = session.client("s3")
-    bucket_name = "vargas-jr-memory"
-    if not MEMORY_DIR.exists():
-        MEMORY_DIR.mkdir(parents=True)
-        logger.info(f"Created memory directory: {MEMORY_DIR}")
-
-    # List all objects in the bucket
-    objects = s3_client.list_objects_v2(Bucket=bucket_name)
+def download_memory(logger: Logger, prefixes: Optional[list[str]] = None):
+    # memory_sync builds on this module, so it is imported when needed
+    from services.memory_sync import restore_memory
 
-    # Download each file
-    for obj in objects.get("Contents", []):
-        key = obj["Key"]
-        target_path = MEMORY_DIR / key
-
-        # Create directories if they don't exist
-        target_path.parent.mkdir(parents=True, exist_ok=True)
-
-        try:
-            logger.info(f"Downloading {key} from S3")
-            s3_client.download_file(bucket_name, key, str(target_path))
-        except Exception:
-            logger.exception(f"Failed to download {key} from S3")
-
-    del s3_client
-    del session
+    return restore_memory(logger, prefixes=prefixes)
 
 
 def send_email(
@@ -79,8 +98,7 @@ def send_email(
     in_reply_to: str | None = None,
     references: str | None = None,
 ) -> None:
-    session = get_aws_session()
-    ses_client = session.client("ses")
+    ses_client = get_aws_client("ses")
     if bcc:
         destination: Any = {"ToAddresses": [to], "BccAddresses": [bcc]}
     else:
@@ -134,8 +152,7 @@ def extract_original_message_id(s3_key: str) -> Optional[str]:
         The original Message-ID if found, None otherwise
     """
     try:
-        session = get_aws_session()
-        s3_client = session.client("s3")
+        s3_client = get_aws_client("s3")
         
         response = s3_client.get_object(
             Bucket="vargas-jr-memory",
@@ -174,8 +191,7 @@ def extract_original_message_id(s3_key: str) -> Optional[str]:
 
 
 def list_attachments_since(cutoff_date: datetime) -> list[str]:
-    session = get_aws_session()
-    s3 = session.client("s3")
+    s3 = get_aws_client("s3")
 
     # List objects
     recent_objects = []
@@ -192,7 +208,4 @@ def list_attachments_since(cutoff_date: datetime) -> list[str]:
             if obj["LastModified"] >= cutoff_date:
                 recent_objects.append(obj["Key"])
 
-    del s3
-    del session
-
     return recent_objects
@@ -0,0 +1,271 @@
+from datetime import date, datetime, timedelta
+from itertools import product
+from math import floor
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from pydantic import BaseModel
+from sqlmodel import Session, select
+from models.pkm.sport_game import SportGame
+from models.pkm.sport_team import SportTeam
+from models.types import Sport
+from services.sport_predictions import RecencyParams, weighted_recency_scores
+
+# Percent of the balance SubmitBets stakes on each pick, in order of confidence
+STAKE_PERCENT = 5
+MIN_WAGER = 1
+MIN_BALANCE = 1
+
+
+class BacktestConfig(BaseModel):
+    initial_balance: float = 100
+    # sport_games doesn't record the posted lines, so every game is settled against the same one
+    spread: float = 0
+    odds: int = -110
+    # Teams need this many prior games before their games are bet
+    min_games: int = 1
+
+
+class SportBacktestStats(BaseModel):
+    sport: Sport
+    bets: int = 0
+    wins: int = 0
+    losses: int = 0
+    pushes: int = 0
+    wagered: float = 0
+    profit: float = 0
+    roi: float = 0
+    hit_rate: float = 0
+    # Largest peak to trough fall of the sport's cumulative profit, in dollars
+    max_drawdown: float = 0
+
+
+class BacktestResult(BaseModel):
+    params: RecencyParams
+    config: BacktestConfig
+    start: date
+    end: date
+    days: int
+    final_balance: float
+    roi: float
+    hit_rate: float
+    # Largest peak to trough fall of the end of day balance, as a fraction of the peak
+    max_drawdown: float
+    ran_out_of_money: bool
+    sports: List[SportBacktestStats]
+
+
+class BacktestGames:
+    """
+    Every recorded game up to the end of a backtest, with each team's prior games as arrays.
+
+    For each game, `home_*` and `away_*` hold the team's last `max_window` games that started on
+    an earlier day, most recent first, so a replayed day never sees its own results.
+    """
+
+    def __init__(self, games: List[SportGame], sports: List[Sport], max_window: int) -> None:
+        self.max_window = max_window
+        self.sports = np.array([sport.value for sport in sports], dtype=object)
+        self.days = np.array([game.start_time.date().toordinal() for game in games], dtype=np.int64)
+        self.margins = np.array([game.home_team_score - game.away_team_score for game in games], dtype=np.float64)
+
+        team_rows: Dict[object, int] = {}
+        home_teams = np.array([team_rows.setdefault(game.home_team_id, len(team_rows)) for game in games], dtype=np.int64)
+        away_teams = np.array([team_rows.setdefault(game.away_team_id, len(team_rows)) for game in games], dtype=np.int64)
+
+        # One appearance per team per game, ordered by team and then by the game's start time
+        appearance_teams = np.concatenate([home_teams, away_teams])
+        appearance_days = np.concatenate([self.days, self.days])
+        appearance_order = np.concatenate([np.arange(len(games)), np.arange(len(games))])
+        order = np.lexsort((appearance_order, appearance_teams))
+        appearance_teams = appearance_teams[order]
+        appearance_days = appearance_days[order]
+        self._diffs = np.concatenate([self.margins, -self.margins])[order]
+        self._was_home = np.concatenate([np.ones(len(games), dtype=bool), np.zeros(len(games), dtype=bool)])[order]
+
+        # Sorted keys of (team, day), so a game's prior appearances are found with one binary search
+        self._day_span = int(self.days.max() - self.days.min() + 1) if len(games) else 1
+        self._first_day = int(self.days.min()) if len(games) else 0
+        self._keys = appearance_teams * self._day_span + (appearance_days - self._first_day)
+        self._team_starts = np.searchsorted(appearance_teams, np.arange(len(team_rows)))
+
+        self.home_diffs, self.home_was_home, self.home_played = self._prior_games(home_teams)
+        self.away_diffs, self.away_was_home, self.away_played = self._prior_games(away_teams)
+
+    def _prior_games(self, teams: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if not len(teams):
+            empty = np.zeros((0, self.max_window))
+            return empty, empty.astype(bool), empty.astype(bool)
+        keys = teams * self._day_span + (self.days - self._first_day)
+        # First appearance of the team on or after the game's day; everything before it is prior
+        ends = np.searchsorted(self._keys, keys, side="left")
+        indexes = ends[:, None] - 1 - np.arange(self.max_window)[None, :]
+        played = indexes >= self._team_starts[teams][:, None]
+        indexes = np.where(played, indexes, 0)
+        return self._diffs[indexes], self._was_home[indexes], played
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+
+def load_backtest_games(session: Session, end: date, max_window: int) -> BacktestGames:
+    """Load every game that started by the end date, in start time order, with its sport"""
+    statement = (
+        select(SportGame, SportTeam.sport)
+        .join(SportTeam, SportGame.home_team_id == SportTeam.id)  # type: ignore[arg-type]
+        .where(SportGame.start_time < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        .order_by(SportGame.start_time)  # type: ignore[arg-type]
+    )
+    rows = session.exec(statement).all()
+    return BacktestGames([game for game, _ in rows], [Sport(sport) for _, sport in rows], max_window)
+
+
+def _max_drawdown(curve: List[float], relative: bool) -> float:
+    peaks = np.maximum.accumulate(np.asarray(curve, dtype=np.float64))
+    drops = peaks - np.asarray(curve, dtype=np.float64)
+    if relative:
+        drops = np.divide(drops, peaks, out=np.zeros_like(drops), where=peaks > 0)
+    return float(drops.max()) if len(drops) else 0.0
+
+
+def run_backtest(
+    games: BacktestGames,
+    start: date,
+    end: date,
+    params: Optional[RecencyParams] = None,
+    config: Optional[BacktestConfig] = None,
+    sports: Optional[Iterable[Sport]] = None,
+) -> BacktestResult:
+    """
+    Replay the strategy of PredictOutcomes and SubmitBets one day at a time.
+
+    Each day's games are scored only from games of earlier days. Picks are staked in order of
+    confidence at 5% of the remaining balance, with the same minimum wager and out of money rule
+    as SubmitBets, and settled at the end of the day before the next day is bet.
+
+    Args:
+        games: Games loaded with a max_window of at least params.window
+        start: First day to bet
+        end: Last day to bet, inclusive
+        params: Scoring parameters. Defaults to those PredictOutcomes uses.
+        config: Bankroll, line and odds every game is settled against
+        sports: Sports to bet. Defaults to all of them.
+    """
+    params = params or RecencyParams()
+    config = config or BacktestConfig()
+    if games.max_window < params.window:
+        raise ValueError(f"Games were loaded with {games.max_window} prior games, fewer than the window of {params.window}")
+
+    home_scores = weighted_recency_scores(
+        games.home_diffs, games.home_was_home, games.home_played, True, params
+    ) * params.home_multiplier
+    away_scores = weighted_recency_scores(
+        games.away_diffs, games.away_was_home, games.away_played, False, params
+    ) * params.away_multiplier
+    calculated_spreads = (away_scores - home_scores) / params.spread_divisor
+    picks_home = calculated_spreads < config.spread
+    confidences = np.abs(calculated_spreads - config.spread)
+
+    # The picked side's margin against the line: positive wins, zero pushes
+    cover_margins = np.where(picks_home, games.margins + config.spread, -games.margins - config.spread)
+    payout = 1 + (100 / -config.odds if config.odds < 0 else config.odds / 100)
+
+    window = slice(None, params.window)
+    eligible = (
+        (games.days >= start.toordinal())
+        & (games.days <= end.toordinal())
+        & (games.home_played[:, window].sum(axis=1) >= config.min_games)
+        & (games.away_played[:, window].sum(axis=1) >= config.min_games)
+    )
+    if sports is not None:
+        eligible &= np.isin(games.sports, [sport.value for sport in sports])
+    bets = np.flatnonzero(eligible)
+    # By day, then by confidence descending as SubmitBets stakes them
+    bets = bets[np.lexsort((-confidences[bets], games.days[bets]))]
+
+    stats: Dict[str, SportBacktestStats] = {}
+    profit_curves: Dict[str, List[float]] = {}
+    balance = config.initial_balance
+    balance_curve = [balance]
+    ran_out_of_money = False
+    days = 0
+    for day_bets in np.split(bets, np.flatnonzero(np.diff(games.days[bets])) + 1) if len(bets) else []:
+        if round(balance - MIN_WAGER, 2) < MIN_BALANCE:
+            ran_out_of_money = True
+            break
+
+        days += 1
+        returned = 0.0
+        for game in day_bets:
+            wager = max(MIN_WAGER, floor(balance * STAKE_PERCENT) / 100)
+            if round(balance - wager, 2) < MIN_BALANCE:
+                ran_out_of_money = True
+                break
+            balance = round(balance - wager, 2)
+
+            sport = games.sports[game]
+            sport_stats = stats.setdefault(sport, SportBacktestStats(sport=Sport(sport)))
+            sport_stats.bets += 1
+            sport_stats.wagered = round(sport_stats.wagered + wager, 2)
+            if cover_margins[game] > 0:
+                winning = round(wager * payout, 2)
+                sport_stats.wins += 1
+            elif cover_margins[game] == 0:
+                winning = wager
+                sport_stats.pushes += 1
+            else:
+                winning = 0
+                sport_stats.losses += 1
+            returned += winning
+            sport_stats.profit = round(sport_stats.profit + winning - wager, 2)
+            profit_curves.setdefault(sport, [0.0]).append(sport_stats.profit)
+
+        balance = round(balance + returned, 2)
+        balance_curve.append(balance)
+
+    for sport, sport_stats in stats.items():
+        decided = sport_stats.wins + sport_stats.losses
+        sport_stats.roi = sport_stats.profit / sport_stats.wagered if sport_stats.wagered else 0
+        sport_stats.hit_rate = sport_stats.wins / decided if decided else 0
+        sport_stats.max_drawdown = _max_drawdown(profit_curves[sport], relative=False)
+
+    wagered = sum(sport_stats.wagered for sport_stats in stats.values())
+    wins = sum(sport_stats.wins for sport_stats in stats.values())
+    decided = sum(sport_stats.wins + sport_stats.losses for sport_stats in stats.values())
+    return BacktestResult(
+        params=params,
+        config=config,
+        start=start,
+        end=end,
+        days=days,
+        final_balance=balance,
+        roi=(balance - config.initial_balance) / wagered if wagered else 0,
+        hit_rate=wins / decided if decided else 0,
+        max_drawdown=_max_drawdown(balance_curve, relative=True),
+        ran_out_of_money=ran_out_of_money,
+        sports=sorted(stats.values(), key=lambda sport_stats: sport_stats.sport.value),
+    )
+
+
+def run_backtest_grid(
+    games: BacktestGames,
+    start: date,
+    end: date,
+    home_multipliers: Iterable[float],
+    windows: Iterable[int],
+    config: Optional[BacktestConfig] = None,
+    sports: Optional[Iterable[Sport]] = None,
+) -> List[BacktestResult]:
+    """Backtest every combination of home multiplier and window, best final balance first"""
+    selected = list(sports) if sports is not None else None
+    results = [
+        run_backtest(
+            games,
+            start,
+            end,
+            params=RecencyParams(home_multiplier=home_multiplier, window=window),
+            config=config,
+            sports=selected,
+        )
+        for home_multiplier, window in product(home_multipliers, windows)
+    ]
+    return sorted(results, key=lambda result: result.final_balance, reverse=True)
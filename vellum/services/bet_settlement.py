@@ -0,0 +1,76 @@
+from typing import Dict, FrozenSet, Iterable, List, Literal, Optional, Tuple
+from pydantic import BaseModel
+from models.types import Sport
+
+BetResult = Literal["win", "loss", "push", "void"]
+
+
+class CompletedGame(BaseModel):
+    sport: Sport
+    home_team: str
+    away_team: str
+    home_team_score: int
+    away_team_score: int
+
+
+class SpreadBet(BaseModel):
+    # Row of the bet in the Bets sheet
+    row: int
+    sport: Sport
+    pick: str
+    opponent: str
+    spread: float
+    odds: int
+    wager: float
+
+
+class SettledBet(BaseModel):
+    bet: SpreadBet
+    result: BetResult
+    # Amount returned, including the wager
+    winnings: float
+    game: Optional[CompletedGame] = None
+
+
+class GameIndex:
+    """
+    Completed games keyed by sport and the full names of both teams.
+
+    When the same teams played more than once, the first game added is kept, so games
+    should be added most recent first.
+    """
+
+    def __init__(self, games: Iterable[CompletedGame]) -> None:
+        self._games: Dict[Tuple[Sport, FrozenSet[str]], CompletedGame] = {}
+        for game in games:
+            self._games.setdefault((game.sport, frozenset((game.home_team, game.away_team))), game)
+
+    def find(self, sport: Sport, team: str, opponent: str) -> Optional[CompletedGame]:
+        return self._games.get((sport, frozenset((team, opponent))))
+
+
+def settle_bet(bet: SpreadBet, game: Optional[CompletedGame]) -> SettledBet:
+    """Settle a spread bet against its game, returning the wager when the game wasn't found"""
+    if not game:
+        return SettledBet(bet=bet, result="void", winnings=bet.wager)
+
+    if bet.pick == game.home_team:
+        margin = game.home_team_score + bet.spread - game.away_team_score
+    elif bet.pick == game.away_team:
+        margin = game.away_team_score + bet.spread - game.home_team_score
+    else:
+        raise ValueError(f"Selected winner {bet.pick} not found in game {game.away_team} @ {game.home_team}")
+
+    if margin == 0:
+        return SettledBet(bet=bet, result="push", winnings=bet.wager, game=game)
+    if margin < 0:
+        return SettledBet(bet=bet, result="loss", winnings=0, game=game)
+
+    delta = (bet.wager * 100 / -bet.odds) if bet.odds < 0 else (bet.wager * bet.odds / 100)
+    return SettledBet(bet=bet, result="win", winnings=round(bet.wager + delta, 2), game=game)
+
+
+def settle_bets(bets: Iterable[SpreadBet], games: Iterable[CompletedGame]) -> List[SettledBet]:
+    """Settle every bet in one pass over an index of the games, in the order the bets are given"""
+    index = GameIndex(games)
+    return [settle_bet(bet, index.find(bet.sport, bet.pick, bet.opponent)) for bet in bets]
@@ -2,3 +2,5 @@ from pathlib import Path
 
 MEMORY_DIR = Path(__file__).parent.parent.parent.parent / ".memory"
 S3_MEMORY_BUCKET = "vargas-jr-memory"
+# Local caches of data kept elsewhere, which memory backups skip
+MEMORY_CACHE_DIR = MEMORY_DIR / ".cache"
@@ -0,0 +1,126 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from services.aws import generate_s3_key, get_aws_client
+from services.constants import MEMORY_CACHE_DIR, S3_MEMORY_BUCKET
+
+CONTACT_SUMMARY_CACHE_DIR = MEMORY_CACHE_DIR / "contact_summaries"
+CONTACT_SUMMARY_CACHE_MAX_SIZE = 1024
+
+
+class _CachedSummary(BaseModel):
+    etag: str
+    summary: str
+
+
+def _error_code(error: ClientError) -> str:
+    return str(error.response.get("Error", {}).get("Code", ""))
+
+
+class ContactSummaryStore:
+    """
+    Contact summaries in S3, read through an on-disk LRU cache.
+
+    A cached summary is revalidated with If-None-Match on every read, so an unchanged summary
+    is never downloaded twice, while edits made elsewhere are still picked up. Writes go to S3
+    first and then to the cache. Files are touched on every hit and the least recently used
+    are evicted beyond max_size.
+    """
+
+    def __init__(
+        self,
+        directory: Path = CONTACT_SUMMARY_CACHE_DIR,
+        max_size: int = CONTACT_SUMMARY_CACHE_MAX_SIZE,
+        bucket: str = S3_MEMORY_BUCKET,
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.bucket = bucket
+        self._lock = threading.Lock()
+
+    def _s3_key(self, contact_id: str) -> str:
+        return generate_s3_key(f"contacts/{contact_id}/summary.txt")
+
+    def _path(self, contact_id: str) -> Path:
+        return self.directory / f"{contact_id}.json"
+
+    def _read(self, contact_id: str) -> Optional[_CachedSummary]:
+        try:
+            return _CachedSummary.model_validate_json(self._path(contact_id).read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, contact_id: str, cached: _CachedSummary) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(contact_id)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_text(cached.model_dump_json())
+            os.replace(temp_path, path)
+            self._evict()
+
+    def _evict(self) -> None:
+        entries = list(self.directory.glob("*.json"))
+        if len(entries) <= self.max_size:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[: len(entries) - self.max_size]:
+            entry.unlink(missing_ok=True)
+
+    def get(self, contact_id: str) -> Optional[str]:
+        """
+        Get a contact's summary, or None if they don't have one yet.
+
+        Raises:
+            ClientError, BotoCoreError: If S3 couldn't be reached or refused the request,
+                so a failure is never mistaken for a missing summary.
+        """
+        cached = self._read(contact_id)
+        request: dict[str, Any] = {"Bucket": self.bucket, "Key": self._s3_key(contact_id)}
+        if cached:
+            request["IfNoneMatch"] = cached.etag
+
+        try:
+            response = get_aws_client("s3").get_object(**request)
+        except ClientError as e:
+            code = _error_code(e)
+            if cached and code in ("304", "NotModified"):
+                self._path(contact_id).touch(exist_ok=True)
+                return cached.summary
+            if code in ("NoSuchKey", "404"):
+                self.invalidate(contact_id)
+                return None
+            raise
+
+        summary = response["Body"].read().decode("utf-8")
+        self._write(contact_id, _CachedSummary(etag=response["ETag"], summary=summary))
+        return summary
+
+    def put(self, contact_id: str, summary: str) -> None:
+        """Upload a contact's summary, then cache it under the ETag S3 assigned"""
+        response = get_aws_client("s3").put_object(
+            Bucket=self.bucket,
+            Key=self._s3_key(contact_id),
+            Body=summary.encode("utf-8"),
+            ContentType="text/plain",
+        )
+        self._write(contact_id, _CachedSummary(etag=response["ETag"], summary=summary))
+
+    def invalidate(self, contact_id: str) -> None:
+        self._path(contact_id).unlink(missing_ok=True)
+
+
+contact_summary_store = ContactSummaryStore(
+    max_size=int(os.getenv("CONTACT_SUMMARY_CACHE_MAX_SIZE", CONTACT_SUMMARY_CACHE_MAX_SIZE)),
+)
+
+
+def get_contact_summary(contact_id: str) -> Optional[str]:
+    return contact_summary_store.get(contact_id)
+
+
+def put_contact_summary(contact_id: str, summary: str) -> None:
+    contact_summary_store.put(contact_id, summary)
@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Literal, Optional, Tuple, Union
+from uuid import UUID
+from pydantic import BaseModel
+from sqlalchemy import bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.types import String
+from sqlmodel import select
+from models.contact import Contact
+from services.database import postgres_session
+
+ContactIdentifierKind = Literal["email", "phone_number", "slack_id"]
+ContactIdentifier = Tuple[ContactIdentifierKind, str]
+
+# Each kind maps to a contacts column backed by a unique index, which ON CONFLICT targets
+CONTACT_IDENTIFIER_KINDS: Tuple[ContactIdentifierKind, ...] = ("email", "phone_number", "slack_id")
+
+_RESOLVE_CONTACTS_SQL = "WITH " + ",\n".join(
+    f"""\
+{kind}_input AS (
+    SELECT DISTINCT unnest(:{kind}_values) AS value
+),
+{kind}_inserted AS (
+    INSERT INTO contacts ({kind})
+    SELECT value FROM {kind}_input
+    ON CONFLICT ({kind}) DO NOTHING
+    RETURNING id, {kind} AS value
+)"""
+    for kind in CONTACT_IDENTIFIER_KINDS
+) + "\n" + "\nUNION ALL\n".join(
+    f"""\
+SELECT '{kind}' AS kind, value, id FROM {kind}_inserted
+UNION ALL
+SELECT '{kind}' AS kind, c.{kind} AS value, c.id FROM contacts c JOIN {kind}_input i ON c.{kind} = i.value"""
+    for kind in CONTACT_IDENTIFIER_KINDS
+)
+
+_SELECT_CONTACTS_SQL = "\nUNION ALL\n".join(
+    f"SELECT '{kind}' AS kind, {kind} AS value, id FROM contacts WHERE {kind} = ANY(:{kind}_values)"
+    for kind in CONTACT_IDENTIFIER_KINDS
+)
+
+
+CONTACT_CACHE_TTL_SECONDS = 300
+CONTACT_CACHE_MAX_SIZE = 1024
+
+
+class ContactCacheStats(BaseModel):
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class ContactCache:
+    """
+    Bounded, thread-safe LRU of contacts keyed by id, with secondary keys for each identifier.
+
+    Entries expire after `ttl_seconds`, which bounds staleness from writers outside this
+    process such as the web app. Writers in this process must call `invalidate` instead
+    of waiting for expiry. Contacts are stored and returned as detached copies, so callers
+    may freely mutate or add what they get back to a session.
+    """
+
+    def __init__(self, max_size: int = CONTACT_CACHE_MAX_SIZE, ttl_seconds: float = CONTACT_CACHE_TTL_SECONDS) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[UUID, Tuple[float, Contact]]" = OrderedDict()
+        self._identifiers: Dict[ContactIdentifier, UUID] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _copy(contact: Contact) -> Contact:
+        return Contact.model_validate(contact.model_dump())
+
+    @staticmethod
+    def _identifiers_of(contact: Contact) -> List[ContactIdentifier]:
+        identifiers: List[ContactIdentifier] = []
+        for kind in CONTACT_IDENTIFIER_KINDS:
+            value = getattr(contact, kind)
+            if value:
+                identifiers.append((kind, value))
+        return identifiers
+
+    def _remove(self, contact_id: UUID) -> None:
+        entry = self._entries.pop(contact_id, None)
+        if entry is None:
+            return
+        for identifier in self._identifiers_of(entry[1]):
+            if self._identifiers.get(identifier) == contact_id:
+                del self._identifiers[identifier]
+
+    def _lookup(self, contact_id: Optional[UUID]) -> Optional[Contact]:
+        if contact_id is None:
+            self.misses += 1
+            return None
+        entry = self._entries.get(contact_id)
+        if entry is None or entry[0] < time.monotonic():
+            self._remove(contact_id)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(contact_id)
+        self.hits += 1
+        return self._copy(entry[1])
+
+    def get(self, contact_id: UUID) -> Optional[Contact]:
+        with self._lock:
+            return self._lookup(contact_id)
+
+    def get_by(self, kind: ContactIdentifierKind, value: str) -> Optional[Contact]:
+        with self._lock:
+            return self._lookup(self._identifiers.get((kind, value)))
+
+    def put(self, contact: Contact) -> None:
+        with self._lock:
+            self._remove(contact.id)
+            self._entries[contact.id] = (time.monotonic() + self.ttl_seconds, self._copy(contact))
+            for identifier in self._identifiers_of(contact):
+                self._identifiers[identifier] = contact.id
+            while len(self._entries) > self.max_size:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+                self.evictions += 1
+
+    def invalidate(self, contact_id: UUID) -> None:
+        with self._lock:
+            self._remove(contact_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._identifiers.clear()
+
+    def stats(self) -> ContactCacheStats:
+        with self._lock:
+            return ContactCacheStats(
+                size=len(self._entries),
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+            )
+
+
+contact_cache = ContactCache(
+    max_size=int(os.getenv("CONTACT_CACHE_MAX_SIZE", CONTACT_CACHE_MAX_SIZE)),
+    ttl_seconds=float(os.getenv("CONTACT_CACHE_TTL_SECONDS", CONTACT_CACHE_TTL_SECONDS)),
+)
+
+
+def _as_uuid(contact_id: Union[UUID, str]) -> UUID:
+    return contact_id if isinstance(contact_id, UUID) else UUID(contact_id)
+
+
+def get_contact(contact_id: Union[UUID, str]) -> Optional[Contact]:
+    """Get a contact by id, from the contact cache when possible"""
+    contact_id = _as_uuid(contact_id)
+    contact = contact_cache.get(contact_id)
+    if contact:
+        return contact
+
+    with postgres_session(expire_on_commit=False) as session:
+        contact = session.get(Contact, contact_id)
+    if contact:
+        contact_cache.put(contact)
+    return contact
+
+
+def get_contact_by(kind: ContactIdentifierKind, value: str) -> Optional[Contact]:
+    """Get a contact by email, phone number or Slack ID, from the contact cache when possible"""
+    contact = contact_cache.get_by(kind, value)
+    if contact:
+        return contact
+
+    with postgres_session(expire_on_commit=False) as session:
+        statement = select(Contact).where(getattr(Contact, kind) == value)
+        contact = session.exec(statement).one_or_none()
+    if contact:
+        contact_cache.put(contact)
+    return contact
+
+
+def invalidate_contact(contact_id: Union[UUID, str]) -> None:
+    """Drop a contact from the cache. Call after writing any of its fields."""
+    contact_cache.invalidate(_as_uuid(contact_id))
+
+
+def get_contact_cache_stats() -> ContactCacheStats:
+    return contact_cache.stats()
+
+
+def _group_by_kind(identifiers: Iterable[ContactIdentifier]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {f"{kind}_values": [] for kind in CONTACT_IDENTIFIER_KINDS}
+    for kind, value in identifiers:
+        if kind not in CONTACT_IDENTIFIER_KINDS:
+            raise ValueError(f"Unknown contact identifier kind {kind}")
+        grouped[f"{kind}_values"].append(value)
+    return grouped
+
+
+def _bind_arrays(sql: str):
+    return text(sql).bindparams(
+        *[bindparam(f"{kind}_values", type_=ARRAY(String)) for kind in CONTACT_IDENTIFIER_KINDS]
+    )
+
+
+def resolve_contacts(identifiers: Iterable[ContactIdentifier]) -> Dict[ContactIdentifier, str]:
+    """
+    Get or create contacts for any mix of emails, phone numbers and Slack IDs.
+
+    Identifiers already in the contact cache are answered without a query. The rest are
+    upserted in a single statement with INSERT ... ON CONFLICT DO NOTHING, so concurrent
+    callers never create duplicate contacts.
+
+    Args:
+        identifiers: (kind, value) pairs, e.g. ("email", "jane@example.com")
+
+    Returns:
+        A map from each (kind, value) pair to its contact id
+    """
+    resolved: Dict[ContactIdentifier, str] = {}
+    identifiers = list(dict.fromkeys(identifiers))
+    for kind, value in identifiers:
+        cached = contact_cache.get_by(kind, value)
+        if cached:
+            resolved[(kind, value)] = str(cached.id)
+
+    identifiers = [identifier for identifier in identifiers if identifier not in resolved]
+    if not identifiers:
+        return resolved
+
+    params = _group_by_kind(identifiers)
+    with postgres_session() as session:
+        rows = session.execute(_bind_arrays(_RESOLVE_CONTACTS_SQL), params).all()
+        resolved.update({(row.kind, row.value): str(row.id) for row in rows})
+
+        # A contact committed by another worker after our statement began is skipped by
+        # ON CONFLICT but invisible to its snapshot, so look those up again
+        missing = [identifier for identifier in identifiers if identifier not in resolved]
+        if missing:
+            rows = session.execute(_bind_arrays(_SELECT_CONTACTS_SQL), _group_by_kind(missing)).all()
+            resolved.update({(row.kind, row.value): str(row.id) for row in rows})
+
+        session.commit()
+
+    return resolved
@@ -0,0 +1,277 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from pydantic import BaseModel
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+from sqlmodel import Session
+from services.constants import MEMORY_DIR
+from services.sql_metrics import instrument_engine
+
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+# Negative cache_size is measured in KiB rather than pages
+SQLITE_CACHE_SIZE = -64 * 1024
+SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+class PostgresPoolConfig(BaseModel):
+    pool_size: int = 5
+    max_overflow: int = 5
+    pool_timeout: float = 30.0
+    # Neon suspends idle compute after five minutes, so recycle before that
+    pool_recycle: int = 240
+    pool_pre_ping: bool = True
+
+    @classmethod
+    def from_env(cls) -> "PostgresPoolConfig":
+        """Build the pool config from POSTGRES_POOL_* environment variables"""
+        defaults = cls()
+        return cls(
+            pool_size=int(os.getenv("POSTGRES_POOL_SIZE", defaults.pool_size)),
+            max_overflow=int(os.getenv("POSTGRES_POOL_MAX_OVERFLOW", defaults.max_overflow)),
+            pool_timeout=float(os.getenv("POSTGRES_POOL_TIMEOUT", defaults.pool_timeout)),
+            pool_recycle=int(os.getenv("POSTGRES_POOL_RECYCLE", defaults.pool_recycle)),
+            pool_pre_ping=os.getenv("POSTGRES_POOL_PRE_PING", str(defaults.pool_pre_ping)).lower()
+            in ("1", "true", "yes"),
+        )
+
+
+class PoolStats(BaseModel):
+    url: str
+    size: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    checkouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+
+
+class _TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+
+_postgres_engines: dict[str, Engine] = {}
+_postgres_engines_lock = threading.Lock()
+
+
+def normalize_postgres_url(url: str) -> str:
+    """Rewrite postgres:// and postgresql:// URLs to use the psycopg driver"""
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+psycopg://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+psycopg://", 1)
+    return url
+
+
+def mask_url_password(url: str) -> str:
+    """Mask password in database URL while preserving protocol and other details"""
+    if "@" not in url:
+        return f"No @ found in URL: {url}"
+
+    try:
+        protocol_and_auth = url.split("@")[0]  # protocol://user:password
+        host_and_rest = url.split("@")[1]      # host:port/database?params
+
+        if "://" not in protocol_and_auth:
+            return f"No :// found in URL: {url}"
+
+        protocol = protocol_and_auth.split("://")[0]  # protocol
+        auth_part = protocol_and_auth.split("://")[1]  # user:password
+
+        if ":" in auth_part:
+            user = auth_part.split(":")[0]
+            return f"{protocol}://{user}:***@{host_and_rest}"
+        else:
+            return f"{protocol}://{auth_part}:***@{host_and_rest}"
+    except Exception:
+        if "://" in url:
+            protocol = url.split("://")[0]
+            return f"{protocol}://***"
+        return "***"
+
+
+def get_postgres_url() -> str:
+    url = os.getenv("NEON_URL") or os.getenv("POSTGRES_URL")
+    if not url:
+        raise ValueError("POSTGRES_URL is not set")
+    return url
+
+
+def get_postgres_engine(url: Optional[str] = None, config: Optional[PostgresPoolConfig] = None) -> Engine:
+    """
+    Get the process-wide pooled engine for a Postgres URL.
+
+    Engines are cached by normalized URL, so every session opened against the same
+    database reuses warm connections instead of paying TCP/TLS setup each time. Queries
+    are recorded per workflow node, see services.sql_metrics.
+
+    Args:
+        url: Database URL. Defaults to NEON_URL or POSTGRES_URL.
+        config: Pool settings used when the engine is first created. Defaults to
+            the POSTGRES_POOL_* environment variables.
+
+    Returns:
+        The cached Engine for the URL
+    """
+    key = make_url(normalize_postgres_url(url or get_postgres_url())).render_as_string(hide_password=False)
+    engine = _postgres_engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _postgres_engines_lock:
+        engine = _postgres_engines.get(key)
+        if engine is None:
+            pool_config = config or PostgresPoolConfig.from_env()
+            engine = create_engine(
+                key,
+                poolclass=_TimedQueuePool,
+                pool_size=pool_config.pool_size,
+                max_overflow=pool_config.max_overflow,
+                pool_timeout=pool_config.pool_timeout,
+                pool_recycle=pool_config.pool_recycle,
+                pool_pre_ping=pool_config.pool_pre_ping,
+            )
+            instrument_engine(engine)
+            _postgres_engines[key] = engine
+        return engine
+
+
+def get_postgres_pool_stats() -> list[PoolStats]:
+    """Report checkout, overflow and wait statistics for every cached Postgres engine"""
+    stats = []
+    for key, engine in list(_postgres_engines.items()):
+        pool = engine.pool
+        if not isinstance(pool, _TimedQueuePool):
+            continue
+        stats.append(
+            PoolStats(
+                url=mask_url_password(key),
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=pool.overflow(),
+                checkouts=pool.checkouts,
+                total_wait_seconds=pool.total_wait_seconds,
+                max_wait_seconds=pool.max_wait_seconds,
+            )
+        )
+    return stats
+
+
+def dispose_postgres_engines() -> None:
+    """Close every pooled Postgres connection, e.g. after forking a worker process"""
+    with _postgres_engines_lock:
+        for engine in _postgres_engines.values():
+            engine.dispose()
+        _postgres_engines.clear()
+
+
+def postgres_session(expire_on_commit: bool = True):
+    """Get a SQLModel Session using the POSTGRES_URL environment variable"""
+    url = get_postgres_url()
+
+    try:
+        engine = get_postgres_engine(url)
+        return Session(engine, expire_on_commit=expire_on_commit)
+    except Exception as e:
+        masked_url = mask_url_password(normalize_postgres_url(url))
+        url_prefix = url[:20] + "..." if len(url) > 20 else url
+        raise Exception(f"Failed to create database session with URL: {masked_url} (original URL prefix: {url_prefix})") from e
+
+
+_sqlite_engines: dict[tuple[str, bool], Engine] = {}
+_sqlite_engines_lock = threading.Lock()
+
+
+def _configure_sqlite_connection(dbapi_connection, read_only: bool) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        if not read_only:
+            # WAL is persisted in the database file, so only the writer needs to set it
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+    finally:
+        cursor.close()
+
+
+def get_sqlite_engine(read_only: bool = False, path: Optional[Path] = None, check_schema: bool = True) -> Engine:
+    """
+    Get the shared engine for the pkm.db SQLite database.
+
+    Every connection runs in WAL mode with relaxed fsyncs, a memory-mapped file and
+    a larger page cache. The read-only engine opens the file with mode=ro, so
+    analytics readers never take a write lock and never block the game writer.
+
+    When the engine is created, it raises PkmSchemaOutOfDateError if pkm.db is behind
+    the models, so nothing runs against an older schema. Engines never migrate the
+    database themselves; scripts/pkm_migrate.py does.
+
+    Args:
+        read_only: Whether to return the read-only engine
+        path: Database file. Defaults to MEMORY_DIR/pkm.db.
+        check_schema: Whether to check the schema when the engine is created. Only the
+            migration scripts turn this off.
+
+    Returns:
+        The cached Engine for the database file and mode
+    """
+    db_path = str(path or MEMORY_DIR / "pkm.db")
+    key = (db_path, read_only)
+    engine = _sqlite_engines.get(key)
+    if engine is not None:
+        return engine
+
+    with _sqlite_engines_lock:
+        engine = _sqlite_engines.get(key)
+        if engine is None:
+            if read_only:
+                engine = create_engine(f"sqlite:///file:{db_path}?mode=ro&uri=true")
+            else:
+                engine = create_engine(f"sqlite:///{db_path}")
+
+            @event.listens_for(engine, "connect")
+            def _on_connect(dbapi_connection, connection_record) -> None:
+                _configure_sqlite_connection(dbapi_connection, read_only)
+
+            instrument_engine(engine)
+            # A read-only connection can't create the file, so a missing one has nothing to check
+            if check_schema and (not read_only or Path(db_path).exists()):
+                from services.pkm_migrations import check_pkm_schema
+
+                with engine.connect() as connection:
+                    check_pkm_schema(connection)
+            _sqlite_engines[key] = engine
+        return engine
+
+
+def sqlite_session(read_only: bool = False):
+    """Get a SQLModel Session against the shared pkm.db engine"""
+    return Session(get_sqlite_engine(read_only=read_only))
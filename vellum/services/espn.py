@@ -0,0 +1,203 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from logging import Logger
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+import requests
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from models.types import Sport
+
+ESPN_SCOREBOARDS: Dict[Sport, Tuple[str, Dict[str, str]]] = {
+    Sport.MLB: ("https://site.api.espn.com/apis/site/v2/sports/baseball/mlb/scoreboard", {}),
+    Sport.NBA: ("https://site.api.espn.com/apis/site/v2/sports/basketball/nba/scoreboard", {}),
+    Sport.NCAAB: (
+        "https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard",
+        {"groups": "50"},
+    ),
+    Sport.NFL: ("https://site.api.espn.com/apis/site/v2/sports/football/nfl/scoreboard", {}),
+}
+
+# (connect, read) seconds
+ESPN_TIMEOUT = (5, 30)
+ESPN_MAX_RETRIES = 3
+ESPN_POOL_SIZE = 16
+# Response bodies kept for conditional requests, oldest evicted first. A day's
+# scoreboard can run to a few MB, so the cache is bounded by size, not count.
+ESPN_RESPONSE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+class EspnCompletedGame(BaseModel):
+    sport: Sport
+    name: str
+    home_espn_id: str
+    away_espn_id: str
+    home_display_name: str
+    away_display_name: str
+    home_score: int
+    away_score: int
+    start_time: datetime
+
+
+class _CachedResponse(BaseModel):
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content: bytes
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_responses: "OrderedDict[str, _CachedResponse]" = OrderedDict()
+_responses_bytes = 0
+_responses_lock = threading.Lock()
+
+
+def get_espn_session() -> requests.Session:
+    """Get the process-wide keep-alive session for ESPN, which retries transient failures with backoff"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=ESPN_MAX_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=("GET",),
+                respect_retry_after_header=True,
+            )
+            adapter = HTTPAdapter(pool_connections=ESPN_POOL_SIZE, pool_maxsize=ESPN_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _cache_response(key: str, cached: _CachedResponse) -> None:
+    global _responses_bytes
+    if len(cached.content) > ESPN_RESPONSE_CACHE_MAX_BYTES:
+        return
+    with _responses_lock:
+        previous = _responses.pop(key, None)
+        if previous:
+            _responses_bytes -= len(previous.content)
+        _responses[key] = cached
+        _responses_bytes += len(cached.content)
+        while _responses_bytes > ESPN_RESPONSE_CACHE_MAX_BYTES:
+            _, evicted = _responses.popitem(last=False)
+            _responses_bytes -= len(evicted.content)
+
+
+def fetch_espn_json(url: str, params: Optional[Dict[str, str]] = None, use_cache: bool = True) -> Any:
+    """
+    GET an ESPN endpoint and return its JSON body.
+
+    Repeat requests are sent with If-None-Match/If-Modified-Since, and a 304 response
+    returns the body cached from the previous request.
+
+    Args:
+        url: Endpoint to fetch
+        params: Query parameters
+        use_cache: Whether to revalidate against and store in the response cache. Callers
+            fetching each URL once, like backfills, turn it off so they don't evict the
+            responses that are actually requested again.
+    """
+    request = requests.Request("GET", url, params=params).prepare()
+    key = request.url or url
+    cached = None
+    if use_cache:
+        with _responses_lock:
+            cached = _responses.get(key)
+
+    headers = {}
+    if cached and cached.etag:
+        headers["If-None-Match"] = cached.etag
+    if cached and cached.last_modified:
+        headers["If-Modified-Since"] = cached.last_modified
+
+    response = get_espn_session().get(key, headers=headers, timeout=ESPN_TIMEOUT)
+    if response.status_code == 304 and cached:
+        with _responses_lock:
+            if key in _responses:
+                _responses.move_to_end(key)
+        return json.loads(cached.content)
+
+    response.raise_for_status()
+    data = response.json()
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if use_cache and (etag or last_modified):
+        _cache_response(key, _CachedResponse(etag=etag, last_modified=last_modified, content=response.content))
+    return data
+
+
+def iter_completed_games(sport: Sport, data: dict, logger: Logger) -> Iterator[EspnCompletedGame]:
+    """Parse the completed games out of an ESPN scoreboard response, one event at a time"""
+    for espn_event in data["events"]:
+        espn_competition = espn_event["competitions"][0]
+        espn_home_team = next(
+            (competitor for competitor in espn_competition["competitors"] if competitor["homeAway"] == "home"),
+            None,
+        )
+        espn_away_team = next(
+            (competitor for competitor in espn_competition["competitors"] if competitor["homeAway"] == "away"),
+            None,
+        )
+        if not espn_home_team or not espn_away_team:
+            logger.error(f"No home or away team found for {espn_event['name']}")
+            continue
+        if not espn_competition["status"]["type"]["completed"]:
+            if espn_competition["status"]["type"]["name"] == "STATUS_POSTPONED":
+                logger.info(f"Game {espn_event['name']} was postponed. Skipping...")
+                continue
+            logger.error(f"Game {espn_event['name']} is not completed")
+            continue
+
+        yield EspnCompletedGame(
+            sport=sport,
+            name=espn_event["name"],
+            home_espn_id=espn_home_team["id"],
+            away_espn_id=espn_away_team["id"],
+            home_display_name=espn_home_team["team"]["displayName"],
+            away_display_name=espn_away_team["team"]["displayName"],
+            home_score=espn_home_team["score"],
+            away_score=espn_away_team["score"],
+            start_time=datetime.fromisoformat(espn_competition["date"]),
+        )
+
+
+def fetch_scoreboard(sport: Sport, date: datetime, use_cache: bool = True) -> dict:
+    url, extra_params = ESPN_SCOREBOARDS[sport]
+    return fetch_espn_json(url, {"dates": date.strftime("%Y%m%d"), **extra_params}, use_cache=use_cache)
+
+
+def stream_completed_games(
+    date: datetime,
+    logger: Logger,
+    sports: Optional[Iterable[Sport]] = None,
+) -> Iterator[EspnCompletedGame]:
+    """
+    Fetch every sport's scoreboard for a date concurrently and yield completed games.
+
+    Games are yielded as soon as their sport's response arrives, so the total latency is
+    that of the slowest scoreboard rather than the sum. A sport that fails is logged and
+    skipped without affecting the others.
+
+    Args:
+        date: Day whose games are fetched
+        logger: Logger for skipped games and failed sports
+        sports: Sports to fetch. Defaults to every sport in ESPN_SCOREBOARDS.
+    """
+    selected = list(sports or ESPN_SCOREBOARDS)
+    with ThreadPoolExecutor(max_workers=len(selected) or 1) as executor:
+        futures = {executor.submit(fetch_scoreboard, sport, date): sport for sport in selected}
+        for future in as_completed(futures):
+            sport = futures[future]
+            try:
+                data = future.result()
+            except Exception:
+                logger.exception(f"Failed to fetch {sport} scoreboard for {date.date()}")
+                continue
+            yield from iter_completed_games(sport, data, logger)
@@ -0,0 +1,487 @@
+import logging
+import os
+import socket
+import threading
+from datetime import UTC, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import String, and_, case, cast, exists, func, insert, literal, or_, tuple_, union_all, update
+from sqlalchemy import select as sa_select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlmodel import Session, select
+from vellum.client.core.pydantic_utilities import UniversalBaseModel
+from models.contact import Contact
+from models.inbox import Inbox
+from models.inbox_message import InboxMessage
+from models.inbox_message_operation import InboxMessageOperation
+from models.outbox_message import OutboxMessage
+from models.outbox_message_recipient import OutboxMessageRecipient
+from models.types import InboxMessageOperationType, InboxType
+
+
+logger = logging.getLogger(__name__)
+
+UnreadMessage = Tuple[InboxMessage, InboxType, str, Contact]
+
+# How long a worker owns a claimed message before another worker may retry it
+DEFAULT_LEASE_SECONDS = 600
+# Claims a message gets before it is marked FAILED instead of being retried
+MAX_CLAIM_ATTEMPTS = 3
+
+DEFAULT_HISTORY_DEPTH = 5
+MAX_HISTORY_DEPTH = 50
+
+# Rows per INSERT statement when ingesting a batch of messages
+INGEST_CHUNK_SIZE = 1000
+
+
+class NewInboxMessage(UniversalBaseModel):
+    inbox_name: str
+    contact_id: UUID
+    body: str
+    thread_id: Optional[str] = None
+    external_id: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+
+
+class MessageHistoryEntry(UniversalBaseModel):
+    message_id: UUID
+    created_at: datetime
+    source: str
+    channel: str
+    body: str
+    is_incoming: bool
+
+
+class MessageHistoryPage(UniversalBaseModel):
+    entries: List[MessageHistoryEntry]
+    next_cursor: Optional[str] = None
+
+
+_inbox_ids: Dict[str, UUID] = {}
+_inbox_ids_lock = threading.Lock()
+
+
+def get_inbox_ids(session: Session, inbox_names: Iterable[str]) -> Dict[str, UUID]:
+    """
+    Resolve inbox names to ids, querying only for names not seen before in this process.
+
+    Raises:
+        ValueError: If any inbox does not exist
+    """
+    names = set(inbox_names)
+    with _inbox_ids_lock:
+        resolved = {name: _inbox_ids[name] for name in names if name in _inbox_ids}
+
+    missing = names - resolved.keys()
+    if missing:
+        statement = select(Inbox.name, Inbox.id).where(Inbox.name.in_(missing))  # type: ignore[attr-defined]
+        found = {name: inbox_id for name, inbox_id in session.exec(statement).all()}
+        unknown = missing - found.keys()
+        if unknown:
+            raise ValueError(f"Inboxes not found: {', '.join(sorted(unknown))}")
+        with _inbox_ids_lock:
+            _inbox_ids.update(found)
+        resolved.update(found)
+
+    return resolved
+
+
+def create_inbox_messages(session: Session, messages: Sequence[NewInboxMessage]) -> List[Optional[UUID]]:
+    """
+    Insert a batch of inbox messages in one transaction.
+
+    Messages sharing an inbox and external_id with an existing message, or with an earlier
+    message in the batch, are skipped, so re-importing the same backlog is a no-op. Rows are
+    sent in chunks of INGEST_CHUNK_SIZE per statement. Commits the session.
+
+    Args:
+        session: Postgres session to insert with
+        messages: Messages to insert
+
+    Returns:
+        The new message id for each input message, in order, or None where it was a duplicate
+    """
+    if not messages:
+        return []
+
+    inbox_ids = get_inbox_ids(session, (message.inbox_name for message in messages))
+    rows: List[Dict[str, Any]] = []
+    row_indexes: List[int] = []
+    seen_external_ids = set()
+    for index, message in enumerate(messages):
+        inbox_id = inbox_ids[message.inbox_name]
+        if message.external_id is not None:
+            if (inbox_id, message.external_id) in seen_external_ids:
+                continue
+            seen_external_ids.add((inbox_id, message.external_id))
+
+        rows.append(
+            {
+                "id": uuid4(),
+                "inbox_id": inbox_id,
+                "contact_id": message.contact_id,
+                "body": message.body,
+                "thread_id": message.thread_id,
+                "external_id": message.external_id,
+                "message_metadata": message.metadata,
+                "created_at": message.created_at or datetime.now(UTC),
+            }
+        )
+        row_indexes.append(index)
+
+    inserted_ids: Set[UUID] = set()
+    statement = (
+        pg_insert(InboxMessage)
+        .on_conflict_do_nothing(index_elements=["inbox_id", "external_id"])
+        .returning(InboxMessage.id)  # type: ignore[call-overload]
+    )
+    for start in range(0, len(rows), INGEST_CHUNK_SIZE):
+        inserted_ids.update(session.scalars(statement, rows[start : start + INGEST_CHUNK_SIZE]).all())
+    session.commit()
+
+    new_ids: List[Optional[UUID]] = [None] * len(messages)
+    for index, row in zip(row_indexes, rows):
+        if row["id"] in inserted_ids:
+            new_ids[index] = row["id"]
+    return new_ids
+
+
+def is_unread_clause():
+    """
+    The predicate for messages still waiting to be triaged.
+
+    Mirrors the partial index on inbox_messages(created_at), so the planner serves
+    it from the index instead of scanning the operations history.
+    """
+    return or_(
+        InboxMessage.latest_operation.is_(None),  # type: ignore[union-attr]
+        InboxMessage.latest_operation == InboxMessageOperationType.UNREAD,
+    )
+
+
+def record_inbox_message_operations(
+    session: Session,
+    inbox_message_ids: Sequence[UUID],
+    operation: InboxMessageOperationType,
+    execution_id: Optional[str] = None,
+) -> None:
+    """
+    Append an operation to each message and update its latest_operation projection.
+
+    Both writes happen in the caller's transaction, so the projection never drifts
+    from the operations log. The caller is responsible for committing.
+    """
+    if not inbox_message_ids:
+        return
+
+    operations = [
+        InboxMessageOperation(
+            inbox_message_id=inbox_message_id,
+            operation=operation,
+            execution_id=execution_id,
+        ).model_dump()
+        for inbox_message_id in inbox_message_ids
+    ]
+    session.execute(insert(InboxMessageOperation), operations)
+    session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.id.in_(inbox_message_ids))  # type: ignore[attr-defined]
+        .values(latest_operation=operation)
+    )
+
+
+def get_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_lease_expired_clause():
+    """Messages a worker read but let the lease expire on before finishing"""
+    return and_(
+        InboxMessage.latest_operation == InboxMessageOperationType.READ,
+        InboxMessage.leased_until.is_not(None),  # type: ignore[union-attr]
+        InboxMessage.leased_until < func.now(),  # type: ignore[operator]
+    )
+
+
+def is_lease_held_clause(worker_id: str):
+    """Messages whose lease `worker_id` still holds"""
+    return and_(
+        InboxMessage.leased_by == worker_id,  # type: ignore[arg-type]
+        InboxMessage.leased_until > func.now(),  # type: ignore[operator]
+    )
+
+
+def is_claimable_clause(max_attempts: int = MAX_CLAIM_ATTEMPTS):
+    """Unread messages, plus expired leases that have attempts left"""
+    return or_(
+        is_unread_clause(),
+        and_(is_lease_expired_clause(), InboxMessage.claim_attempts < max_attempts),  # type: ignore[arg-type]
+    )
+
+
+def fail_exhausted_messages(session: Session, max_attempts: int = MAX_CLAIM_ATTEMPTS) -> List[UUID]:
+    """
+    Mark expired leases that are out of attempts as FAILED, so they are never claimed again.
+
+    Marking the message UNREAD, e.g. from the admin UI, makes it claimable again with fresh
+    attempts. The caller is responsible for committing.
+
+    Returns:
+        The ids of the messages marked FAILED
+    """
+    statement = (
+        select(InboxMessage.id)
+        .where(is_lease_expired_clause(), InboxMessage.claim_attempts >= max_attempts)
+        .with_for_update(skip_locked=True)
+    )
+    failed_ids = list(session.exec(statement).all())
+    if not failed_ids:
+        return []
+
+    record_inbox_message_operations(session, failed_ids, InboxMessageOperationType.FAILED)
+    session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.id.in_(failed_ids))  # type: ignore[attr-defined]
+        .values(leased_by=None, leased_until=None)
+    )
+    return failed_ids
+
+
+def claim_unread_messages(
+    session: Session,
+    limit: int = 1,
+    worker_id: Optional[str] = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    execution_id: Optional[str] = None,
+    max_attempts: int = MAX_CLAIM_ATTEMPTS,
+) -> List[UnreadMessage]:
+    """
+    Atomically lease up to `limit` of the most recent claimable messages.
+
+    Rows are locked with FOR UPDATE SKIP LOCKED, so concurrent workers never block on
+    or receive the same message. Each claimed message gets a READ operation and a lease;
+    if the worker does not release it before the lease expires, the message becomes
+    claimable again. Every claim counts as an attempt, and a message whose lease expires
+    after `max_attempts` claims is marked FAILED instead. Commits the session.
+
+    Args:
+        session: Postgres session to claim with
+        limit: Maximum number of messages to claim
+        worker_id: Identifier recorded as the lease owner. Defaults to host:pid.
+        lease_seconds: How long the lease lasts
+        execution_id: Execution recorded on the READ operations
+        max_attempts: Claims a message gets before it is marked FAILED
+
+    Returns:
+        The claimed messages with their inbox type, inbox name and contact, newest first
+    """
+    failed_ids = fail_exhausted_messages(session, max_attempts)
+    if failed_ids:
+        logger.warning(f"Marked {len(failed_ids)} messages FAILED after {max_attempts} attempts: {failed_ids}")
+
+    claim_statement = (
+        select(InboxMessage.id)
+        .where(is_claimable_clause(max_attempts))
+        .order_by(InboxMessage.created_at.desc())  # type: ignore[attr-defined]
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    claimed_ids = list(session.exec(claim_statement).all())
+    if not claimed_ids:
+        session.commit()
+        return []
+
+    # Unread messages start counting again, so a message marked UNREAD gets fresh attempts
+    session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.id.in_(claimed_ids))  # type: ignore[attr-defined]
+        .values(
+            leased_by=worker_id or get_worker_id(),
+            leased_until=func.now() + timedelta(seconds=lease_seconds),
+            claim_attempts=case(
+                (InboxMessage.latest_operation == InboxMessageOperationType.READ, InboxMessage.claim_attempts + 1),  # type: ignore[arg-type]
+                else_=1,
+            ),
+        )
+    )
+    record_inbox_message_operations(
+        session,
+        claimed_ids,
+        InboxMessageOperationType.READ,
+        execution_id=execution_id,
+    )
+    session.commit()
+
+    statement = (
+        select(InboxMessage, Inbox.type, Inbox.name, Contact)
+        .join(Inbox, Inbox.id == InboxMessage.inbox_id)  # type: ignore[arg-type]
+        .join(Contact, Contact.id == InboxMessage.contact_id)  # type: ignore[arg-type]
+        .where(InboxMessage.id.in_(claimed_ids))  # type: ignore[attr-defined]
+        .order_by(InboxMessage.created_at.desc())  # type: ignore[attr-defined]
+    )
+    # Inbox.type is typed as its str base, but rows carry the InboxType member
+    return list(session.exec(statement).all())  # type: ignore[arg-type]
+
+
+def claim_next_unread_message(
+    session: Session,
+    worker_id: Optional[str] = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    execution_id: Optional[str] = None,
+) -> Optional[UnreadMessage]:
+    """Lease the single most recent claimable message, see claim_unread_messages"""
+    claimed = claim_unread_messages(
+        session,
+        limit=1,
+        worker_id=worker_id,
+        lease_seconds=lease_seconds,
+        execution_id=execution_id,
+    )
+    return claimed[0] if claimed else None
+
+
+def get_claimed_message(session: Session, inbox_message_id: UUID, worker_id: str) -> Optional[UnreadMessage]:
+    """
+    Load a message along with its inbox type, inbox name and contact, if `worker_id` still
+    holds its lease. Returns None once the lease has expired or been taken by another worker.
+    """
+    statement = (
+        select(InboxMessage, Inbox.type, Inbox.name, Contact)
+        .join(Inbox, Inbox.id == InboxMessage.inbox_id)  # type: ignore[arg-type]
+        .join(Contact, Contact.id == InboxMessage.contact_id)  # type: ignore[arg-type]
+        .where(InboxMessage.id == inbox_message_id, is_lease_held_clause(worker_id))
+    )
+    return session.exec(statement).first()  # type: ignore[return-value]
+
+
+def release_inbox_message_leases(session: Session, inbox_message_ids: Sequence[UUID], worker_id: str) -> List[UUID]:
+    """
+    Mark claimed messages as finished so they are never retried. Only leases `worker_id` still
+    holds are released. The caller commits.
+
+    Returns:
+        The ids of the messages released. Any others had already expired or been reclaimed.
+    """
+    if not inbox_message_ids:
+        return []
+
+    result = session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.id.in_(inbox_message_ids), is_lease_held_clause(worker_id))  # type: ignore[attr-defined]
+        .values(leased_by=None, leased_until=None)
+        .returning(InboxMessage.id)  # type: ignore[call-overload]
+    )
+    return list(result.scalars().all())
+
+
+def abandon_inbox_message_lease(session: Session, inbox_message_id: UUID, worker_id: str) -> None:
+    """
+    Expire a lease whose triage failed, so the message is retried on the next claim instead
+    of when the lease would have run out, or marked FAILED if it is out of attempts. The
+    caller commits.
+    """
+    session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.id == inbox_message_id, is_lease_held_clause(worker_id))  # type: ignore[arg-type]
+        .values(leased_until=func.now())
+    )
+
+
+def encode_history_cursor(entry: MessageHistoryEntry) -> str:
+    direction = "in" if entry.is_incoming else "out"
+    return f"{entry.created_at.isoformat()}|{direction}|{entry.message_id}"
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, bool, UUID]:
+    created_at, direction, message_id = cursor.split("|", 2)
+    return datetime.fromisoformat(created_at), direction == "in", UUID(message_id)
+
+
+def get_message_history(
+    session: Session,
+    message_id: UUID,
+    limit: int = DEFAULT_HISTORY_DEPTH,
+    before: Optional[str] = None,
+) -> MessageHistoryPage:
+    """
+    Get the merged inbound and outbound timeline for the contact who sent a message.
+
+    Both directions are fetched in one UNION ALL query, each branch served by the
+    (contact_id, created_at) indexes and capped at `limit`, then merged newest first.
+    Messages sent at the same moment list incoming before outgoing, as they always have.
+
+    Args:
+        session: Postgres session
+        message_id: Message whose contact's history is retrieved. It is excluded from the results.
+        limit: Number of messages per page, capped at MAX_HISTORY_DEPTH
+        before: Cursor from a previous page's next_cursor, to page into older messages
+
+    Returns:
+        The page of messages, newest first, and a cursor for the next older page if there is one
+    """
+    limit = max(1, min(limit, MAX_HISTORY_DEPTH))
+    contact_id = select(InboxMessage.contact_id).where(InboxMessage.id == message_id).scalar_subquery()
+
+    incoming = (
+        sa_select(
+            InboxMessage.id.label("message_id"),  # type: ignore[attr-defined]
+            InboxMessage.created_at.label("created_at"),  # type: ignore[attr-defined]
+            InboxMessage.body.label("body"),  # type: ignore[attr-defined]
+            Inbox.name.label("channel"),  # type: ignore[attr-defined]
+            func.coalesce(
+                Contact.full_name,
+                Contact.slack_display_name,
+                Contact.email,
+                Contact.phone_number,
+                cast(Contact.id, String),
+            ).label("source"),
+            literal(True).label("is_incoming"),
+        )
+        .join(Inbox, Inbox.id == InboxMessage.inbox_id)  # type: ignore[arg-type]
+        .join(Contact, Contact.id == InboxMessage.contact_id)  # type: ignore[arg-type]
+        .where(InboxMessage.contact_id == contact_id)  # type: ignore[arg-type]
+        .where(InboxMessage.id != message_id)  # type: ignore[arg-type]
+    )
+    outgoing = sa_select(
+        OutboxMessage.id.label("message_id"),  # type: ignore[attr-defined]
+        OutboxMessage.created_at.label("created_at"),  # type: ignore[attr-defined]
+        OutboxMessage.body.label("body"),  # type: ignore[attr-defined]
+        cast(OutboxMessage.type, String).label("channel"),
+        literal("VargasJR").label("source"),
+        literal(False).label("is_incoming"),
+    ).where(
+        exists().where(
+            OutboxMessageRecipient.message_id == OutboxMessage.id,  # type: ignore[arg-type]
+            OutboxMessageRecipient.contact_id == contact_id,  # type: ignore[arg-type]
+        )
+    )
+
+    if before:
+        cursor_created_at, cursor_is_incoming, cursor_message_id = decode_history_cursor(before)
+        cursor_key = tuple_(literal(cursor_created_at), literal(cursor_message_id))
+        # Within one timestamp incoming messages come first, so a cursor on an incoming
+        # message still has every outgoing message at that timestamp ahead of it
+        if cursor_is_incoming:
+            incoming = incoming.where(tuple_(InboxMessage.created_at, InboxMessage.id) < cursor_key)  # type: ignore[arg-type]
+            outgoing = outgoing.where(OutboxMessage.created_at <= cursor_created_at)  # type: ignore[arg-type]
+        else:
+            incoming = incoming.where(InboxMessage.created_at < cursor_created_at)  # type: ignore[arg-type]
+            outgoing = outgoing.where(tuple_(OutboxMessage.created_at, OutboxMessage.id) < cursor_key)  # type: ignore[arg-type]
+
+    # Each branch fetches one extra row so we know whether an older page exists
+    incoming = incoming.order_by(InboxMessage.created_at.desc(), InboxMessage.id.desc()).limit(limit + 1)  # type: ignore[attr-defined]
+    outgoing = outgoing.order_by(OutboxMessage.created_at.desc(), OutboxMessage.id.desc()).limit(limit + 1)  # type: ignore[attr-defined]
+    timeline = union_all(sa_select(incoming.subquery()), sa_select(outgoing.subquery())).subquery()
+    statement = (
+        sa_select(timeline)
+        .order_by(timeline.c.created_at.desc(), timeline.c.is_incoming.desc(), timeline.c.message_id.desc())
+        .limit(limit + 1)
+    )
+
+    rows = session.execute(statement).mappings().all()
+    entries = [MessageHistoryEntry(**row) for row in rows[:limit]]
+    next_cursor = encode_history_cursor(entries[-1]) if len(rows) > limit else None
+    return MessageHistoryPage(entries=entries, next_cursor=next_cursor)
+
@@ -0,0 +1,403 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, UTC
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from services.aws import get_aws_client
+from services.constants import MEMORY_CACHE_DIR, MEMORY_DIR, S3_MEMORY_BUCKET
+
+# Lives outside of any directory mirrored from MEMORY_DIR, so it is never backed up as a memory file
+MEMORY_MANIFEST_KEY = ".manifests/memory.json"
+MEMORY_SYNC_WORKERS = 8
+# S3 deletes at most this many keys per request
+S3_DELETE_BATCH_SIZE = 1000
+# How long the object of a file removed locally is kept, so a file lost by mistake can be restored
+MEMORY_TOMBSTONE_TTL = timedelta(days=30)
+# A backup missing more than this fraction of the manifest's files is more likely a partial
+# restore than deliberate deletes, so it removes nothing
+MAX_REMOVED_FRACTION = 0.5
+# Databases are uploaded as consistent snapshots, and their write-ahead logs never on their own
+SQLITE_DATABASE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+SQLITE_SIDECAR_SUFFIXES = ("-wal", "-shm", "-journal")
+
+MEMORY_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=16 * 1024 * 1024,
+    multipart_chunksize=16 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+
+class MemoryFile(BaseModel):
+    size: int
+    mtime: float
+    sha256: str
+
+
+class MemoryManifest(BaseModel):
+    files: Dict[str, MemoryFile] = {}
+    # Files removed locally, by when the removal was first backed up. Their objects are only
+    # deleted once MEMORY_TOMBSTONE_TTL has passed, and restores skip them until then.
+    tombstones: Dict[str, datetime] = {}
+    updated_at: Optional[datetime] = None
+
+
+class MemoryRestoreResult(BaseModel):
+    downloaded: int = 0
+    unchanged: int = 0
+    # Objects of removed files and write-ahead logs uploaded before databases were snapshotted
+    skipped: int = 0
+    failed: int = 0
+    bytes_downloaded: int = 0
+
+
+class MemoryBackupResult(BaseModel):
+    uploaded: int = 0
+    unchanged: int = 0
+    tombstoned: int = 0
+    deleted: int = 0
+    failed: int = 0
+    bytes_uploaded: int = 0
+
+
+def hash_file(path: Path, algorithm: str = "sha256") -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, algorithm).hexdigest()
+
+
+def is_sqlite_database(key: str) -> bool:
+    return key.endswith(SQLITE_DATABASE_SUFFIXES)
+
+
+def is_sqlite_sidecar(key: str) -> bool:
+    return key.endswith(SQLITE_SIDECAR_SUFFIXES)
+
+
+def snapshot_sqlite_database(path: Path, snapshot_path: Path) -> None:
+    """
+    Copy a live SQLite database with the backup API.
+
+    The copy includes transactions still in the write-ahead log and is consistent even while
+    another process writes, which copying the file itself guarantees neither of.
+    """
+    source = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        target = sqlite3.connect(snapshot_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def scan_memory(
+    previous: MemoryManifest,
+    memory_dir: Path = MEMORY_DIR,
+    snapshot_dir: Optional[Path] = None,
+) -> Tuple[Dict[str, MemoryFile], Dict[str, Path]]:
+    """
+    Describe every file under the memory directory, keyed by its path relative to it.
+    Local caches under MEMORY_CACHE_DIR and SQLite write-ahead logs are skipped.
+
+    A file whose size and mtime match the previous manifest keeps its recorded hash, so only
+    files that were touched are read. SQLite databases are snapshotted into snapshot_dir and
+    described by their snapshot instead, since their latest writes may only be in the log.
+
+    Returns:
+        The files, and the path to upload each file from
+    """
+    files: Dict[str, MemoryFile] = {}
+    sources: Dict[str, Path] = {}
+    cache_dir = memory_dir / MEMORY_CACHE_DIR.relative_to(MEMORY_DIR)
+    for root, dirs, names in os.walk(memory_dir):
+        dirs[:] = [name for name in dirs if Path(root) / name != cache_dir]
+        for name in names:
+            path = Path(root) / name
+            key = path.relative_to(memory_dir).as_posix()
+            if key == MEMORY_MANIFEST_KEY or is_sqlite_sidecar(key):
+                continue
+            if snapshot_dir and is_sqlite_database(key):
+                path = snapshot_dir / key
+                path.parent.mkdir(parents=True, exist_ok=True)
+                snapshot_sqlite_database(memory_dir / key, path)
+            sources[key] = path
+            stat = path.stat()
+            recorded = previous.files.get(key)
+            if recorded and recorded.size == stat.st_size and recorded.mtime == stat.st_mtime:
+                files[key] = recorded
+            else:
+                files[key] = MemoryFile(size=stat.st_size, mtime=stat.st_mtime, sha256=hash_file(path))
+    return files, sources
+
+
+def get_memory_manifest(s3_client: Any, bucket: str = S3_MEMORY_BUCKET) -> MemoryManifest:
+    """The manifest of the last backup, or an empty one if there hasn't been one"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=MEMORY_MANIFEST_KEY)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return MemoryManifest()
+        raise
+    return MemoryManifest.model_validate_json(response["Body"].read())
+
+
+def put_memory_manifest(s3_client: Any, manifest: MemoryManifest, bucket: str = S3_MEMORY_BUCKET) -> None:
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=MEMORY_MANIFEST_KEY,
+        Body=manifest.model_dump_json().encode(),
+        ContentType="application/json",
+    )
+
+
+def _delete_objects(s3_client: Any, keys: List[str], bucket: str, logger: Logger) -> List[str]:
+    """Delete objects in batches, returning the keys that failed"""
+    failed: List[str] = []
+    for start in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        batch = keys[start : start + S3_DELETE_BATCH_SIZE]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=bucket,
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+            )
+        except Exception:
+            logger.exception(f"Failed to delete {len(batch)} removed files from s3://{bucket}")
+            failed.extend(batch)
+            continue
+        for error in response.get("Errors", []):
+            logger.error(f"Failed to delete {error['Key']} from s3://{bucket}")
+            failed.append(error["Key"])
+    return failed
+
+
+def backup_memory_incremental(
+    logger: Logger,
+    memory_dir: Path = MEMORY_DIR,
+    bucket: str = S3_MEMORY_BUCKET,
+    max_workers: int = MEMORY_SYNC_WORKERS,
+) -> MemoryBackupResult:
+    """
+    Back up the memory directory to S3, transferring only what changed since the last backup.
+
+    Files are compared to the manifest stored in the bucket by content hash. New and changed
+    files are uploaded in parallel, with large files sent as multipart uploads, and SQLite
+    databases are uploaded as snapshots. A file that fails keeps its previous manifest entry,
+    so the next backup retries it.
+
+    Files removed locally are tombstoned rather than deleted, and their objects are deleted
+    once the tombstone is older than MEMORY_TOMBSTONE_TTL. Nothing is tombstoned when more
+    than MAX_REMOVED_FRACTION of the manifest is missing locally, as after a partial restore.
+    """
+    result = MemoryBackupResult()
+    if not memory_dir.exists():
+        logger.info("No memory directory found")
+        return result
+
+    s3_client = get_aws_client("s3")
+    previous = get_memory_manifest(s3_client, bucket)
+    with tempfile.TemporaryDirectory(prefix="memory-snapshots-") as snapshot_dir:
+        current, sources = scan_memory(previous, memory_dir, Path(snapshot_dir))
+        _sync_memory(s3_client, previous, current, sources, bucket, max_workers, logger, result)
+
+    logger.info(
+        f"Backed up memory: {result.uploaded} uploaded ({result.bytes_uploaded} bytes), "
+        f"{result.tombstoned} tombstoned, {result.deleted} deleted, {result.failed} failed"
+    )
+    return result
+
+
+def _sync_memory(
+    s3_client: Any,
+    previous: MemoryManifest,
+    current: Dict[str, MemoryFile],
+    sources: Dict[str, Path],
+    bucket: str,
+    max_workers: int,
+    logger: Logger,
+    result: MemoryBackupResult,
+) -> None:
+    changed = [
+        key for key, file in current.items() if key not in previous.files or previous.files[key].sha256 != file.sha256
+    ]
+    removed = [key for key in previous.files if key not in current]
+    result.unchanged = len(current) - len(changed)
+
+    changed_keys = set(changed)
+    manifest = MemoryManifest(
+        files={key: file for key, file in current.items() if key not in changed_keys},
+        tombstones={key: removed_at for key, removed_at in previous.tombstones.items() if key not in current},
+    )
+    if len(removed) > len(previous.files) * MAX_REMOVED_FRACTION:
+        logger.warning(
+            f"{len(removed)} of the {len(previous.files)} backed up files are missing locally, which looks like "
+            "a partial restore. Keeping them in the backup; delete them in smaller batches if it was intended."
+        )
+        manifest.files.update({key: previous.files[key] for key in removed})
+        removed = []
+    logger.info(f"Backing up {len(changed)} changed files, {result.unchanged} unchanged, {len(removed)} removed")
+
+    def upload(key: str) -> str:
+        s3_client.upload_file(
+            str(sources[key]),
+            bucket,
+            key,
+            ExtraArgs={"Metadata": {"sha256": current[key].sha256}},
+            Config=MEMORY_TRANSFER_CONFIG,
+        )
+        return key
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(upload, key): key for key in changed}
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                future.result()
+            except Exception:
+                logger.exception(f"Failed to upload {key} to s3://{bucket}/{key}")
+                result.failed += 1
+                if key in previous.files:
+                    manifest.files[key] = previous.files[key]
+                continue
+            logger.info(f"Uploaded {key} to s3://{bucket}/{key}")
+            manifest.files[key] = current[key]
+            result.uploaded += 1
+            result.bytes_uploaded += current[key].size
+
+    now = datetime.now(UTC)
+    for key in removed:
+        manifest.tombstones[key] = now
+    result.tombstoned = len(removed)
+
+    expired = [key for key, removed_at in manifest.tombstones.items() if now - removed_at >= MEMORY_TOMBSTONE_TTL]
+    failed = set(_delete_objects(s3_client, expired, bucket, logger))
+    for key in expired:
+        if key not in failed:
+            del manifest.tombstones[key]
+    result.deleted = len(expired) - len(failed)
+    result.failed += len(failed)
+
+    manifest.updated_at = now
+    put_memory_manifest(s3_client, manifest, bucket)
+
+
+def _is_current(path: Path, obj: Dict[str, Any], manifest: MemoryManifest) -> bool:
+    """
+    Whether a local file already matches an object in the bucket.
+
+    Files are only read when their size matches but their mtime is neither the one a
+    previous restore set nor the one recorded by the last backup.
+    """
+    if not path.is_file():
+        return False
+    stat = path.stat()
+    if stat.st_size != obj["Size"]:
+        return False
+    if stat.st_mtime == obj["LastModified"].timestamp():
+        return True
+
+    recorded = manifest.files.get(obj["Key"])
+    if recorded and recorded.size == obj["Size"]:
+        return recorded.mtime == stat.st_mtime or recorded.sha256 == hash_file(path)
+
+    # Multipart ETags aren't a hash of the content
+    etag = obj["ETag"].strip('"')
+    return "-" not in etag and etag == hash_file(path, "md5")
+
+
+def list_memory_objects(s3_client: Any, prefix: str = "", bucket: str = S3_MEMORY_BUCKET) -> Iterable[Dict[str, Any]]:
+    """Every object in the bucket under a prefix, across as many pages as it takes"""
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        yield from page.get("Contents", [])
+
+
+def restore_memory(
+    logger: Logger,
+    prefixes: Optional[List[str]] = None,
+    memory_dir: Path = MEMORY_DIR,
+    bucket: str = S3_MEMORY_BUCKET,
+    max_workers: int = MEMORY_SYNC_WORKERS,
+) -> MemoryRestoreResult:
+    """
+    Restore the memory directory from S3, downloading only objects that differ locally.
+
+    Objects are listed page by page and compared to local files by size, then by the
+    mtime of a previous restore, the backup manifest, or the ETag. Differing objects are
+    downloaded in parallel to a temporary file and moved into place, and each restored
+    file's mtime is set to the object's so the next restore skips it without reading it.
+    Tombstoned files and SQLite write-ahead logs are never restored, and restoring a
+    database removes the local logs of the one it replaces.
+
+    Args:
+        logger: Logger for progress and failures
+        prefixes: Key prefixes to restore, e.g. "reports/" or "pkm.db". Defaults to the whole bucket.
+        memory_dir: Directory to restore into
+        bucket: Bucket to restore from
+        max_workers: Maximum number of objects downloaded at once
+    """
+    result = MemoryRestoreResult()
+    if not memory_dir.exists():
+        memory_dir.mkdir(parents=True)
+        logger.info(f"Created memory directory: {memory_dir}")
+
+    s3_client = get_aws_client("s3")
+    manifest = get_memory_manifest(s3_client, bucket)
+    root = memory_dir.resolve()
+
+    def download(obj: Dict[str, Any], target_path: Path) -> None:
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=target_path.parent, prefix=f".{target_path.name}.")
+        os.close(fd)
+        try:
+            s3_client.download_file(bucket, obj["Key"], temp_path, Config=MEMORY_TRANSFER_CONFIG)
+            modified = obj["LastModified"].timestamp()
+            os.utime(temp_path, (modified, modified))
+            os.replace(temp_path, target_path)
+        except Exception:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+        if is_sqlite_database(obj["Key"]):
+            # A log left from the replaced database would be replayed into the restored one
+            for suffix in SQLITE_SIDECAR_SUFFIXES:
+                Path(f"{target_path}{suffix}").unlink(missing_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for prefix in prefixes or [""]:
+            for obj in list_memory_objects(s3_client, prefix, bucket):
+                key = obj["Key"]
+                target_path = (memory_dir / key).resolve()
+                if key == MEMORY_MANIFEST_KEY or key.endswith("/") or not target_path.is_relative_to(root):
+                    continue
+                if key in manifest.tombstones or is_sqlite_sidecar(key):
+                    result.skipped += 1
+                    continue
+                if _is_current(target_path, obj, manifest):
+                    result.unchanged += 1
+                    continue
+                futures[executor.submit(download, obj, target_path)] = obj
+
+        logger.info(f"Downloading {len(futures)} objects, {result.unchanged} already up to date")
+        for future in as_completed(futures):
+            obj = futures[future]
+            try:
+                future.result()
+            except Exception:
+                logger.exception(f"Failed to download {obj['Key']} from S3")
+                result.failed += 1
+                continue
+            result.downloaded += 1
+            result.bytes_downloaded += obj["Size"]
+
+    logger.info(
+        f"Restored memory: {result.downloaded} downloaded ({result.bytes_downloaded} bytes), "
+        f"{result.unchanged} unchanged, {result.skipped} skipped, {result.failed} failed"
+    )
+    return result
@@ -0,0 +1,274 @@
+import hashlib
+import os
+import shutil
+from datetime import datetime, UTC
+from logging import Logger
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as fs
+import pyarrow.parquet as pq
+from pydantic import BaseModel
+from sqlalchemy import Connection, DateTime, text
+from sqlalchemy.types import TypeEngine
+from services.constants import MEMORY_DIR
+
+PKM_EXPORT_DIR = MEMORY_DIR / "exports" / "pkm"
+PKM_EXPORT_CHUNK_SIZE = 50_000
+MANIFEST_FILE = "manifest.json"
+DATA_FILE = "data.parquet"
+DIGEST_MODULUS = 2**256
+
+
+class PkmExportTable:
+    def __init__(
+        self,
+        name: str,
+        query: str,
+        schema: pa.Schema,
+        columns: Optional[Dict[str, TypeEngine]] = None,
+        partition_by: Optional[List[str]] = None,
+    ) -> None:
+        self.name = name
+        # Selects every row to export, including the partition columns
+        self.query = query
+        self.schema = schema
+        # Result types of columns SQLite returns as text, like timestamps
+        self.columns = columns or {}
+        self.partition_by = partition_by or []
+
+
+# Seasons are named by the year they start. Every sport but MLB starts in the fall.
+_SEASON = """\
+CAST(strftime('%Y', g.start_time) AS INTEGER)
+    - CASE WHEN t.sport != 'MLB' AND CAST(strftime('%m', g.start_time) AS INTEGER) < 7 THEN 1 ELSE 0 END"""
+
+PKM_EXPORT_TABLES: List[PkmExportTable] = [
+    PkmExportTable(
+        name="sport_games",
+        query=f"""\
+SELECT g.id, g.home_team_id, g.away_team_id, g.home_team_score, g.away_team_score,
+    g.start_time, g.end_time, t.sport, {_SEASON} AS season
+FROM sport_games g JOIN sport_teams t ON t.id = g.home_team_id""",
+        columns={"start_time": DateTime(), "end_time": DateTime()},
+        schema=pa.schema(
+            [
+                ("id", pa.string()),
+                ("home_team_id", pa.string()),
+                ("away_team_id", pa.string()),
+                ("home_team_score", pa.int32()),
+                ("away_team_score", pa.int32()),
+                ("start_time", pa.timestamp("us")),
+                ("end_time", pa.timestamp("us")),
+                ("sport", pa.string()),
+                ("season", pa.int32()),
+            ]
+        ),
+        partition_by=["sport", "season"],
+    ),
+    PkmExportTable(
+        name="sport_teams",
+        query="""\
+SELECT id, location, name, sport, espn_id, location || ' ' || name AS full_name
+FROM sport_teams""",
+        schema=pa.schema(
+            [
+                ("id", pa.string()),
+                ("location", pa.string()),
+                ("name", pa.string()),
+                ("sport", pa.string()),
+                ("espn_id", pa.string()),
+                ("full_name", pa.string()),
+            ]
+        ),
+        partition_by=["sport"],
+    ),
+    PkmExportTable(
+        name="transaction_rules",
+        query="""\
+SELECT id, category, operation, target, description
+FROM transaction_rules""",
+        schema=pa.schema(
+            [
+                ("id", pa.string()),
+                ("category", pa.string()),
+                ("operation", pa.string()),
+                ("target", pa.string()),
+                ("description", pa.string()),
+            ]
+        ),
+    ),
+]
+
+
+class PkmTableExport(BaseModel):
+    # Digest of each partition's rows when it was last written, keyed by its path under the table
+    partitions: Dict[str, str] = {}
+    rows: int = 0
+    exported_at: Optional[datetime] = None
+
+
+class PkmExportManifest(BaseModel):
+    tables: Dict[str, PkmTableExport] = {}
+
+
+PartitionKey = Tuple[Tuple[str, Any], ...]
+
+
+def _read_manifest(directory: Path) -> PkmExportManifest:
+    path = directory / MANIFEST_FILE
+    if not path.exists():
+        return PkmExportManifest()
+    return PkmExportManifest.model_validate_json(path.read_text())
+
+
+def _write_manifest(directory: Path, manifest: PkmExportManifest) -> None:
+    path = directory / MANIFEST_FILE
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(manifest.model_dump_json(indent=2))
+    os.replace(temp_path, path)
+
+
+def _partition_path(key: PartitionKey) -> str:
+    """The hive style key=value path of a partition under its table's directory"""
+    return "/".join(f"{column}={value}" for column, value in key)
+
+
+def _digest_partitions(
+    connection: Connection, table: PkmExportTable
+) -> Tuple[Dict[PartitionKey, str], Dict[PartitionKey, int]]:
+    """
+    Digest the rows of every partition of a table, in one pass that writes nothing.
+
+    Each row is hashed and the hashes are summed, so the digest doesn't depend on the order
+    SQLite returns rows in but changes whenever a row is added, deleted or edited.
+    """
+    statement = text(table.query).columns(**table.columns)
+    result = connection.execution_options(yield_per=PKM_EXPORT_CHUNK_SIZE).execute(statement)
+    sums: Dict[PartitionKey, int] = {}
+    counts: Dict[PartitionKey, int] = {}
+    for row in result.mappings():
+        key = tuple((column, row[column]) for column in table.partition_by)
+        row_hash = int.from_bytes(hashlib.sha256(repr(tuple(row.values())).encode()).digest(), "big")
+        sums[key] = (sums.get(key, 0) + row_hash) % DIGEST_MODULUS
+        counts[key] = counts.get(key, 0) + 1
+    return {key: f"{digest:064x}" for key, digest in sums.items()}, counts
+
+
+def _write_partition(connection: Connection, table: PkmExportTable, table_dir: Path, key: PartitionKey) -> None:
+    """
+    Stream one partition's rows into <partition>/data.parquet, replacing every file there.
+
+    The file is written beside the old one and swapped in, so readers never see a partial partition.
+    """
+    filters = " AND ".join(f"{column} = :{column}" for column, _ in key)
+    query = f"SELECT * FROM ({table.query}) WHERE {filters}" if filters else table.query
+    statement = text(query).columns(**table.columns)
+    result = connection.execution_options(yield_per=PKM_EXPORT_CHUNK_SIZE).execute(statement, dict(key))
+
+    partition_dir = table_dir / _partition_path(key)
+    partition_dir.mkdir(parents=True, exist_ok=True)
+    temp_path = partition_dir / ".data.tmp"
+    schema = pa.schema([field for field in table.schema if field.name not in table.partition_by])
+    with pq.ParquetWriter(temp_path, schema) as writer:
+        for partition in result.mappings().partitions():
+            chunk = pa.Table.from_pylist([dict(row) for row in partition], schema=table.schema)
+            writer.write_table(chunk.drop_columns(table.partition_by))
+    os.replace(temp_path, partition_dir / DATA_FILE)
+    for stale_file in partition_dir.glob("*.parquet"):
+        if stale_file.name != DATA_FILE:
+            stale_file.unlink()
+
+
+def _remove_partition(table_dir: Path, path: str) -> None:
+    partition_dir = table_dir / path
+    for stale_file in partition_dir.glob("*.parquet"):
+        stale_file.unlink()
+    # Drop the emptied key=value directories up to the table's
+    while partition_dir != table_dir and partition_dir.exists() and not any(partition_dir.iterdir()):
+        partition_dir.rmdir()
+        partition_dir = partition_dir.parent
+
+
+def export_pkm_table(
+    connection: Connection,
+    table: PkmExportTable,
+    directory: Path,
+    state: PkmTableExport,
+    logger: Logger,
+) -> PkmTableExport:
+    """
+    Rewrite the partitions of a table whose rows changed since the previous export.
+
+    Rows are compared by content rather than by rowid, which SQLite reuses and VACUUM
+    renumbers, so deleted rows (e.g. by dedupe_sport_games) leave the export too.
+    """
+    table_dir = directory / table.name
+    digests, counts = _digest_partitions(connection, table)
+    paths = {_partition_path(key): key for key in digests}
+
+    for path, key in paths.items():
+        if state.partitions.get(path) == digests[key]:
+            continue
+        _write_partition(connection, table, table_dir, key)
+        logger.info(f"Exported {table.name} {path or 'table'} with {counts[key]} rows")
+
+    # Partitions whose rows are all gone, including any left by an export before they were tracked
+    for stale_file in list(table_dir.rglob("*.parquet")):
+        path = stale_file.parent.relative_to(table_dir).as_posix()
+        path = "" if path == "." else path
+        if path not in paths:
+            _remove_partition(table_dir, path)
+            logger.info(f"Removed {table.name} {path or 'table'}, which no longer has rows")
+
+    return PkmTableExport(
+        partitions={path: digests[key] for path, key in paths.items()},
+        rows=sum(counts.values()),
+        exported_at=datetime.now(UTC),
+    )
+
+
+def export_pkm(
+    connection: Connection,
+    logger: Logger,
+    directory: Path = PKM_EXPORT_DIR,
+    tables: Optional[List[str]] = None,
+    full: bool = False,
+) -> PkmExportManifest:
+    """
+    Export pkm.db tables to partitioned Parquet files for analytics.
+
+    sport_games is partitioned by sport and season and sport_teams by sport. Each export reads
+    every table once to digest its partitions, then rewrites only the partitions whose rows
+    changed and removes those left empty. The digests are kept in the manifest, which is
+    written after each table so an interrupted export resumes where it stopped.
+
+    Args:
+        connection: Connection to pkm.db
+        logger: Logger for progress
+        directory: Directory the tables and manifest are written to
+        tables: Names of the tables to export. Defaults to all of PKM_EXPORT_TABLES.
+        full: Whether to discard previous exports and export every row again
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = PkmExportManifest() if full else _read_manifest(directory)
+    for table in PKM_EXPORT_TABLES:
+        if tables is not None and table.name not in tables:
+            continue
+        state = manifest.tables.get(table.name, PkmTableExport())
+        if full:
+            shutil.rmtree(directory / table.name, ignore_errors=True)
+        manifest.tables[table.name] = export_pkm_table(connection, table, directory, state, logger)
+        _write_manifest(directory, manifest)
+    return manifest
+
+
+def read_pkm_export(table: str, directory: Path = PKM_EXPORT_DIR) -> ds.Dataset:
+    """Open an exported table as a memory-mapped dataset, with its partition columns restored"""
+    return ds.dataset(
+        directory / table,
+        format="parquet",
+        partitioning="hive",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
@@ -0,0 +1,221 @@
+import importlib
+import inspect
+import pkgutil
+from datetime import datetime, UTC
+from logging import Logger
+from typing import Callable, List
+from pydantic import BaseModel
+from sqlalchemy import Connection, text
+from sqlmodel import SQLModel
+from services.sport_games import dedupe_sport_games
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+
+class PkmMigration(BaseModel):
+    version: int
+    name: str
+    upgrade: Callable[[Connection], None]
+
+
+PKM_MIGRATIONS: List[PkmMigration] = []
+
+
+def pkm_migration(version: int, name: str):
+    """Register a pkm.db migration. Versions must be unique and are applied in ascending order."""
+
+    def register(upgrade: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if any(migration.version == version for migration in PKM_MIGRATIONS):
+            raise ValueError(f"Duplicate pkm.db migration version {version}")
+        PKM_MIGRATIONS.append(PkmMigration(version=version, name=name, upgrade=upgrade))
+        PKM_MIGRATIONS.sort(key=lambda migration: migration.version)
+        return upgrade
+
+    return register
+
+
+def list_pkm_models() -> list[type[SQLModel]]:
+    """Every SQLModel table defined under models.pkm"""
+    pkm_module = importlib.import_module("models.pkm")
+
+    pkm_models: list[type[SQLModel]] = []
+    for _, name, _ in pkgutil.iter_modules(pkm_module.__path__):  # type: ignore
+        pkm_model_module = importlib.import_module(f"{pkm_module.__name__}.{name}")
+        sql_model = next(
+            (
+                cls
+                for _, cls in inspect.getmembers(pkm_model_module)
+                if inspect.isclass(cls) and issubclass(cls, SQLModel) and cls != SQLModel
+            ),
+            None,
+        )
+        if not sql_model:
+            raise ValueError(f"No SQLModel found in {pkm_model_module.__name__}")
+
+        pkm_models.append(sql_model)
+    return pkm_models
+
+
+def has_column(connection: Connection, table: str, column: str) -> bool:
+    # table_xinfo, unlike table_info, also lists generated columns
+    return any(row[1] == column for row in connection.execute(text(f"PRAGMA table_xinfo({table})")))
+
+
+def get_applied_versions(connection: Connection) -> set[int]:
+    tables = connection.execute(
+        text("SELECT name FROM sqlite_master WHERE type='table' AND name = :name"), {"name": MIGRATIONS_TABLE}
+    ).all()
+    if not tables:
+        return set()
+    return {row[0] for row in connection.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+
+def _create_migrations_table(connection: Connection) -> None:
+    connection.execute(
+        text(
+            f"""\
+CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+    version INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+)"""
+        )
+    )
+
+
+def get_missing_models(connection: Connection) -> list[type[SQLModel]]:
+    """The pkm models whose tables don't exist yet"""
+    existing_tables = {
+        row[0]
+        for row in connection.execute(
+            text("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
+        )
+    }
+    return [model for model in list_pkm_models() if model.__tablename__ not in existing_tables]
+
+
+def migrate_pkm(connection: Connection, logger: Logger, dry_run: bool = False) -> List[PkmMigration]:
+    """
+    Bring pkm.db up to date.
+
+    Missing tables are created from the models first, then every registered migration
+    not yet recorded in schema_migrations is applied in version order. Each migration is
+    recorded as soon as it completes. Migrations are idempotent, so after a failure the
+    runner can simply be run again.
+
+    Args:
+        connection: Connection to pkm.db, outside of any transaction
+        logger: Logger for progress
+        dry_run: Whether to only report what would be created and applied
+
+    Returns:
+        The migrations that were (or with dry_run, would be) applied
+    """
+    models_to_create = get_missing_models(connection)
+    for model in models_to_create:
+        logger.info(f"Creating table: {model.__tablename__}")
+        if not dry_run:
+            SQLModel.metadata.create_all(connection, tables=[getattr(model, "__table__")])
+
+    applied_versions = get_applied_versions(connection)
+    if not dry_run:
+        _create_migrations_table(connection)
+    connection.commit()
+
+    pending = [migration for migration in PKM_MIGRATIONS if migration.version not in applied_versions]
+    for migration in pending:
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        if dry_run:
+            continue
+        with connection.begin():
+            migration.upgrade(connection)
+            # Another process opening pkm.db at the same time may have just recorded it too
+            connection.execute(
+                text(f"INSERT OR IGNORE INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": migration.version, "name": migration.name, "applied_at": datetime.now(UTC).isoformat()},
+            )
+
+    return pending
+
+
+class PkmSchemaOutOfDateError(Exception):
+    def __init__(self, pending: List[PkmMigration], missing_tables: List[str]) -> None:
+        missing = [f"tables {', '.join(missing_tables)}"] if missing_tables else []
+        if pending:
+            missing.append(f"migrations {', '.join(str(migration.version) for migration in pending)}")
+        super().__init__(f"pkm.db is missing {' and '.join(missing)}. Run scripts/pkm_migrate.py to apply them.")
+        self.pending = pending
+        self.missing_tables = missing_tables
+
+
+def get_pending_migrations(connection: Connection) -> List[PkmMigration]:
+    applied_versions = get_applied_versions(connection)
+    return [migration for migration in PKM_MIGRATIONS if migration.version not in applied_versions]
+
+
+def check_pkm_schema(connection: Connection) -> None:
+    """
+    Make sure pkm.db matches the models before anything reads or writes it.
+
+    Nothing is changed here: migrations can rewrite data, so they are only ever applied
+    by scripts/pkm_migrate.py, which has to run after pkm.db is restored or the models
+    change and before anything else opens the database.
+
+    Raises:
+        PkmSchemaOutOfDateError: If tables are missing or migrations are pending
+    """
+    missing_tables = [str(model.__tablename__) for model in get_missing_models(connection)]
+    pending = get_pending_migrations(connection)
+    if missing_tables or pending:
+        raise PkmSchemaOutOfDateError(pending, missing_tables)
+
+
+# Migrations are written to be safe on a database freshly created from the models,
+# which already has every column and index declared there.
+
+
+@pkm_migration(1, "sport_games_unique_start_time_teams")
+def _sport_games_unique_start_time_teams(connection: Connection) -> None:
+    # Duplicates would fail the unique index, so they are removed first
+    dedupe_sport_games(connection)
+    connection.execute(
+        text(
+            """\
+CREATE UNIQUE INDEX IF NOT EXISTS sport_games_start_time_teams_idx
+ON sport_games (start_time, home_team_id, away_team_id)"""
+        )
+    )
+
+
+@pkm_migration(2, "sport_games_team_start_time_indexes")
+def _sport_games_team_start_time_indexes(connection: Connection) -> None:
+    # Include the opponent and scores so a team's recent games are read from the index alone
+    connection.execute(
+        text(
+            """\
+CREATE INDEX IF NOT EXISTS sport_games_home_team_start_time_idx
+ON sport_games (home_team_id, start_time, away_team_id, home_team_score, away_team_score)"""
+        )
+    )
+    connection.execute(
+        text(
+            """\
+CREATE INDEX IF NOT EXISTS sport_games_away_team_start_time_idx
+ON sport_games (away_team_id, start_time, home_team_id, home_team_score, away_team_score)"""
+        )
+    )
+
+
+@pkm_migration(3, "sport_teams_full_name")
+def _sport_teams_full_name(connection: Connection) -> None:
+    # A generated column never needs backfilling and can't drift from location and name
+    if not has_column(connection, "sport_teams", "full_name"):
+        connection.execute(
+            text("ALTER TABLE sport_teams ADD COLUMN full_name VARCHAR GENERATED ALWAYS AS (location || ' ' || name) VIRTUAL")
+        )
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS sport_teams_sport_espn_id_idx ON sport_teams (sport, espn_id)")
+    )
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS sport_teams_sport_full_name_idx ON sport_teams (sport, full_name)")
+    )
@@ -0,0 +1,200 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, UTC
+from logging import Logger
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from uuid import uuid4
+from pydantic import BaseModel
+from sqlalchemy import Connection, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+from models.pkm.backfill_checkpoint import BackfillCheckpoint
+from models.pkm.sport_game import SportGame
+from models.types import Sport
+from services.database import sqlite_session
+from services.espn import ESPN_SCOREBOARDS, EspnCompletedGame, fetch_scoreboard, iter_completed_games
+from services.sport_teams import TeamIndex, get_team_index
+
+DEFAULT_BACKFILL_WORKERS = 8
+
+
+class BackfillResult(BaseModel):
+    days_fetched: int
+    days_skipped: int
+    days_failed: int
+    games_inserted: int
+
+
+class SportGameDuplicates(BaseModel):
+    # Groups of games sharing a start time and teams, and the copies beyond the first in them
+    groups: int
+    duplicates: int
+
+
+COUNT_DUPLICATE_SPORT_GAMES = """\
+SELECT COUNT(*), COALESCE(SUM(copies - 1), 0) FROM (
+    SELECT COUNT(*) AS copies FROM sport_games
+    GROUP BY start_time, home_team_id, away_team_id
+    HAVING COUNT(*) > 1
+)"""
+
+# Keeps the first recorded copy of each game
+DELETE_DUPLICATE_SPORT_GAMES = """\
+DELETE FROM sport_games
+WHERE rowid NOT IN (
+    SELECT MIN(rowid) FROM sport_games GROUP BY start_time, home_team_id, away_team_id
+)"""
+
+
+def dedupe_sport_games(connection: Connection, dry_run: bool = False) -> SportGameDuplicates:
+    """
+    Delete every duplicate of a game with the same start time and teams, in one statement.
+
+    Runs in the connection's transaction if one is open, otherwise in its own.
+
+    Args:
+        connection: Connection to pkm.db
+        dry_run: Whether to only count the duplicates
+
+    Returns:
+        The duplicate groups and rows found, which are the rows deleted unless dry_run
+    """
+    if not connection.in_transaction():
+        with connection.begin():
+            return dedupe_sport_games(connection, dry_run=dry_run)
+
+    groups, duplicates = connection.execute(text(COUNT_DUPLICATE_SPORT_GAMES)).one()
+    if duplicates and not dry_run:
+        connection.execute(text(DELETE_DUPLICATE_SPORT_GAMES))
+    return SportGameDuplicates(groups=groups, duplicates=duplicates)
+
+
+def insert_sport_games(session: Session, games: Iterable[SportGame]) -> int:
+    """
+    Bulk insert games, skipping any already recorded for the same start time and teams.
+
+    Returns the number of games inserted. The caller commits.
+    """
+    rows = [game.model_dump() for game in games]
+    if not rows:
+        return 0
+
+    statement = sqlite_insert(SportGame.__table__).on_conflict_do_nothing(  # type: ignore[attr-defined]
+        index_elements=["start_time", "home_team_id", "away_team_id"]
+    )
+    result = session.connection().execute(statement, rows)
+    return max(result.rowcount, 0)
+
+
+def _to_sport_game(espn_game: EspnCompletedGame, team_index: TeamIndex) -> Optional[SportGame]:
+    home_team = team_index.by_espn_id(espn_game.sport, espn_game.home_espn_id)
+    away_team = team_index.by_espn_id(espn_game.sport, espn_game.away_espn_id)
+    if not home_team or not away_team:
+        return None
+    return SportGame(
+        id=uuid4(),
+        home_team_id=home_team.id,
+        away_team_id=away_team.id,
+        home_team_score=espn_game.home_score,
+        away_team_score=espn_game.away_score,
+        start_time=espn_game.start_time,
+        end_time=espn_game.start_time,
+    )
+
+
+def _fetch_day(sport: Sport, day: date, logger: Logger) -> List[EspnCompletedGame]:
+    # Each past day is fetched once, so caching it would only evict the live scoreboards
+    data = fetch_scoreboard(sport, datetime.combine(day, datetime.min.time()), use_cache=False)
+    return list(iter_completed_games(sport, data, logger))
+
+
+def backfill_sport_games(
+    start: date,
+    end: date,
+    logger: Logger,
+    sports: Optional[Iterable[Sport]] = None,
+    max_workers: int = DEFAULT_BACKFILL_WORKERS,
+    resume: bool = True,
+) -> BackfillResult:
+    """
+    Record every completed game between two dates, fetching days in parallel.
+
+    Each (sport, day) is written in one transaction together with its row in
+    backfill_checkpoints, so an interrupted run resumes from the first unfinished day.
+    Days whose fetch fails are logged and left unchecked, so the next run retries them.
+
+    Args:
+        start: First day to backfill
+        end: Last day to backfill, inclusive
+        logger: Logger for progress and failures
+        sports: Sports to backfill. Defaults to every sport with an ESPN scoreboard.
+        max_workers: Maximum number of days fetched at once
+        resume: Whether to skip days already checkpointed by an earlier run
+
+    Returns:
+        Counts of days fetched, skipped and failed, and of games inserted
+    """
+    selected = list(sports or ESPN_SCOREBOARDS)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+    with sqlite_session() as session:
+        done: Set[Tuple[Sport, date]] = set()
+        if resume:
+            checkpoints = session.exec(
+                select(BackfillCheckpoint.sport, BackfillCheckpoint.game_date).where(  # type: ignore[call-overload]
+                    BackfillCheckpoint.sport.in_(selected),  # type: ignore[attr-defined]
+                    BackfillCheckpoint.game_date >= start,
+                    BackfillCheckpoint.game_date <= end,
+                )
+            ).all()
+            done = {(sport, game_date) for sport, game_date in checkpoints}
+    team_index = get_team_index()
+
+    pending = [(sport, day) for sport in selected for day in days if (sport, day) not in done]
+    logger.info(f"Backfilling {len(pending)} sport days, skipping {len(done)} already checkpointed")
+
+    result = BackfillResult(days_fetched=0, days_skipped=len(done), days_failed=0, games_inserted=0)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, sqlite_session() as session:
+        # Keep a bounded number of fetches in flight so a multi-season range doesn't queue everything up front
+        remaining = iter(pending)
+        in_flight: Dict[Future, Tuple[Sport, date]] = {}
+
+        def submit_next() -> None:
+            sport_day = next(remaining, None)
+            if sport_day:
+                in_flight[executor.submit(_fetch_day, *sport_day, logger)] = sport_day
+
+        for _ in range(max_workers * 2):
+            submit_next()
+
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                sport, day = in_flight.pop(future)
+                submit_next()
+                try:
+                    espn_games = future.result()
+                except Exception:
+                    logger.exception(f"Failed to fetch {sport.value} games for {day}")
+                    result.days_failed += 1
+                    continue
+
+                games = []
+                for espn_game in espn_games:
+                    game = _to_sport_game(espn_game, team_index)
+                    if game:
+                        games.append(game)
+                    else:
+                        logger.error(f"Unknown team in {espn_game.name}. Skipping...")
+
+                inserted = insert_sport_games(session, games)
+                session.merge(
+                    BackfillCheckpoint(sport=sport, game_date=day, games=inserted, completed_at=datetime.now(UTC))
+                )
+                session.commit()
+                result.days_fetched += 1
+                result.games_inserted += inserted
+
+    logger.info(
+        f"Backfilled {result.games_inserted} games over {result.days_fetched} sport days, {result.days_failed} failed"
+    )
+    return result
@@ -0,0 +1,99 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlmodel import select
+from models.pkm.sport_team import SportTeam
+from models.types import Sport
+from services.database import sqlite_session
+
+# Full names other sources use for a team, mapped to the full name in pkm.db
+TEAM_NAME_ALIASES: Dict[str, str] = {
+    "LA Clippers": "Los Angeles Clippers",
+    "American Eagles": "American University Eagles",
+}
+
+
+# Spellings other sources use within a team's name, and what pkm.db has instead
+TEAM_NAME_REPLACEMENTS: List[Tuple[str, str]] = [
+    ("Mt. ", "Mount "),
+    (" St ", " State "),
+    ("SIU-Edwardsville", "SIU Edwardsville"),
+    (" Lopes", " Antelopes"),
+]
+
+
+def normalize_team_name(team_name: str) -> str:
+    for source_spelling, spelling in TEAM_NAME_REPLACEMENTS:
+        team_name = team_name.replace(source_spelling, spelling)
+    return TEAM_NAME_ALIASES.get(team_name, team_name)
+
+
+def normalize_espn_team_name(competitor: dict) -> str:
+    return normalize_team_name(f"{competitor['team']['location']} {competitor['team']['name']}")
+
+
+def team_name_key(team_name: str) -> str:
+    """normalize_team_name, ignoring case and runs of whitespace, for matching full names"""
+    team_name = " ".join(team_name.split()).casefold()
+    for source_spelling, spelling in TEAM_NAME_REPLACEMENTS:
+        team_name = team_name.replace(source_spelling.casefold(), spelling.casefold())
+    aliases = {alias.casefold(): full_name.casefold() for alias, full_name in TEAM_NAME_ALIASES.items()}
+    return aliases.get(team_name, team_name)
+
+
+class TeamIndex:
+    """
+    Every SportTeam held in memory, with O(1) lookups by ESPN id and by full name.
+
+    Full names are keyed by team_name_key on insert and on lookup, so they match
+    case-insensitively and after normalization, which also resolves TEAM_NAME_ALIASES.
+    Teams are copied out of their session when loaded, so the index never holds ORM state.
+    """
+
+    def __init__(self, teams: Iterable[SportTeam]) -> None:
+        self._teams: List[SportTeam] = []
+        self._by_espn_id: Dict[Tuple[Sport, str], SportTeam] = {}
+        self._by_full_name: Dict[Tuple[Sport, str], SportTeam] = {}
+        for team in teams:
+            team = SportTeam.model_validate(team.model_dump())
+            self._teams.append(team)
+            self._by_espn_id[(team.sport, team.espn_id)] = team
+            self._by_full_name[(team.sport, team_name_key(f"{team.location} {team.name}"))] = team
+
+    @classmethod
+    def load(cls) -> "TeamIndex":
+        with sqlite_session(read_only=True) as session:
+            return cls(session.exec(select(SportTeam)).all())
+
+    def __len__(self) -> int:
+        return len(self._teams)
+
+    def teams(self, sport: Optional[Sport] = None) -> List[SportTeam]:
+        return [team for team in self._teams if sport is None or team.sport == sport]
+
+    def by_espn_id(self, sport: Sport, espn_id: str) -> Optional[SportTeam]:
+        return self._by_espn_id.get((sport, espn_id))
+
+    def by_full_name(self, sport: Sport, full_name: str) -> Optional[SportTeam]:
+        return self._by_full_name.get((sport, team_name_key(full_name)))
+
+
+_team_index: Optional[TeamIndex] = None
+_team_index_lock = threading.Lock()
+
+
+def get_team_index() -> TeamIndex:
+    """Get the process-wide TeamIndex, loading it from pkm.db on first use"""
+    global _team_index
+    with _team_index_lock:
+        if _team_index is None:
+            _team_index = TeamIndex.load()
+        return _team_index
+
+
+def reload_team_index() -> TeamIndex:
+    """Reload the process-wide TeamIndex, e.g. after teams are added to pkm.db"""
+    global _team_index
+    team_index = TeamIndex.load()
+    with _team_index_lock:
+        _team_index = team_index
+    return team_index
@@ -0,0 +1,187 @@
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from vellum.workflows.context import get_execution_context
+from vellum.workflows.events.types import NodeParentContext
+
+# Only statements executed at least this many times in one node are reported as repeated
+REPEATED_STATEMENT_THRESHOLD = 2
+# Traces whose counters are kept until reported. Workflows run outside run_triage_batch never
+# report theirs, so the oldest are dropped rather than accumulated forever.
+MAX_TRACKED_TRACES = 256
+NO_TRACE = "untraced"
+NO_NODE = "(outside node)"
+_QUERY_START_KEY = "sql_metrics_query_start"
+
+
+class RepeatedStatement(BaseModel):
+    statement: str
+    executions: int
+    # Executions that also had exactly the same parameters as an earlier one
+    identical_executions: int
+
+
+class NodeQueryStats(BaseModel):
+    node: str
+    queries: int
+    total_seconds: float
+    rows: int
+    repeated_statements: List[RepeatedStatement]
+
+
+class QueryReport(BaseModel):
+    trace_id: str
+    queries: int
+    total_seconds: float
+    nodes: List[NodeQueryStats]
+
+
+class _NodeQueryCounters:
+    def __init__(self) -> None:
+        self.queries = 0
+        self.total_seconds = 0.0
+        self.rows = 0
+        self.statements: Counter[str] = Counter()
+        self.executions: Counter[Tuple[str, str]] = Counter()
+
+    def to_stats(self, node: str) -> NodeQueryStats:
+        identical: Counter[str] = Counter()
+        for (statement, _), executions in self.executions.items():
+            identical[statement] += executions - 1
+        repeated = [
+            RepeatedStatement(statement=statement, executions=executions, identical_executions=identical[statement])
+            for statement, executions in self.statements.most_common()
+            if executions >= REPEATED_STATEMENT_THRESHOLD
+        ]
+        return NodeQueryStats(
+            node=node,
+            queries=self.queries,
+            total_seconds=self.total_seconds,
+            rows=self.rows,
+            repeated_statements=repeated,
+        )
+
+
+class _RowCountingCursor:
+    """
+    Counts the rows a result actually fetches from the DBAPI cursor.
+
+    cursor.rowcount is -1 for SELECTs on SQLite, and only means "rows affected" for DML.
+    """
+
+    def __init__(self, cursor: Any, counters: _NodeQueryCounters) -> None:
+        self._cursor = cursor
+        self._counters = counters
+
+    def _count(self, rows: int) -> None:
+        with _counters_lock:
+            self._counters.rows += rows
+
+    def fetchone(self) -> Any:
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, *args: Any, **kwargs: Any) -> Any:
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self) -> Any:
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+_counters: "OrderedDict[str, Dict[str, _NodeQueryCounters]]" = OrderedDict()
+_counters_lock = threading.Lock()
+
+
+def _current_node() -> Tuple[str, str]:
+    """The (trace id, node name) the calling thread is running in, from the Vellum execution context"""
+    context = get_execution_context()
+    parent = context.parent_context
+    trace_id = str(context.trace_id) if int(context.trace_id) else NO_TRACE
+    while parent is not None:
+        if isinstance(parent, NodeParentContext):
+            return trace_id, parent.node_definition.name
+        parent = parent.parent
+    return trace_id, NO_NODE
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault(_QUERY_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - conn.info[_QUERY_START_KEY].pop()
+    trace_id, node = _current_node()
+    # Scripts and services outside a workflow would otherwise accumulate counters forever
+    if trace_id == NO_TRACE:
+        return
+
+    with _counters_lock:
+        if trace_id not in _counters:
+            _counters[trace_id] = {}
+            while len(_counters) > MAX_TRACKED_TRACES:
+                _counters.popitem(last=False)
+        counters = _counters[trace_id].setdefault(node, _NodeQueryCounters())
+        counters.queries += 1
+        counters.total_seconds += elapsed
+        counters.statements[statement] += 1
+        counters.executions[(statement, repr(parameters))] += 1
+        if cursor.description is None:
+            counters.rows += max(cursor.rowcount, 0)
+
+    # Statements that return rows are counted as the result fetches them
+    if cursor.description is not None and context is not None and context.cursor is cursor:
+        context.cursor = _RowCountingCursor(cursor, counters)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Record query count, time, rows and repeated statements per workflow node for every query on the engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def get_query_report(trace_id: Optional[str] = None, clear: bool = True) -> QueryReport:
+    """
+    Summarize the queries recorded for one workflow execution.
+
+    Args:
+        trace_id: Trace of the workflow execution. Defaults to the calling thread's trace.
+        clear: Whether to drop the recorded counters once reported
+
+    Returns:
+        The report, with nodes ordered by total database time
+    """
+    trace_id = trace_id or _current_node()[0]
+    with _counters_lock:
+        nodes = _counters.pop(trace_id, {}) if clear else dict(_counters.get(trace_id, {}))
+        stats = [counters.to_stats(node) for node, counters in nodes.items()]
+
+    stats.sort(key=lambda node_stats: node_stats.total_seconds, reverse=True)
+    return QueryReport(
+        trace_id=trace_id,
+        queries=sum(node_stats.queries for node_stats in stats),
+        total_seconds=sum(node_stats.total_seconds for node_stats in stats),
+        nodes=stats,
+    )
+
+
+def write_query_report(report: QueryReport, directory: Path) -> Path:
+    """Write a query report to <directory>/<trace_id>.json"""
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{report.trace_id}.json"
+    path.write_text(json.dumps(report.model_dump(), indent=2))
+    return path
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from services.aws import generate_s3_key, get_aws_client
+from services.constants import MEMORY_CACHE_DIR, S3_MEMORY_BUCKET
+
+logger = logging.getLogger(__name__)
+
+WEBPAGE_CACHE_DIR = MEMORY_CACHE_DIR / "webpages"
+WEBPAGE_CACHE_MAX_SIZE = 2048
+WEBPAGE_CACHE_TTL = timedelta(days=7)
+
+# How long pages stay fresh on domains that change faster or slower than most, matched on
+# the domain and its subdomains, most specific first
+WEBPAGE_FRESHNESS_RULES: Dict[str, timedelta] = {
+    "news.ycombinator.com": timedelta(hours=1),
+    "twitter.com": timedelta(hours=1),
+    "x.com": timedelta(hours=1),
+    "github.com": timedelta(days=1),
+    "linkedin.com": timedelta(days=30),
+    "wikipedia.org": timedelta(days=30),
+}
+
+
+class CachedWebpage(BaseModel):
+    url: str
+    content: str
+    # Only summaries written by the LLM are cached, so a fallback summary is retried next time
+    summary: Optional[str] = None
+    fetched_at: datetime
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def get_webpage_ttl(url: str) -> timedelta:
+    host = (urlparse(url).hostname or "").lower()
+    labels = host.split(".")
+    for start in range(len(labels)):
+        ttl = WEBPAGE_FRESHNESS_RULES.get(".".join(labels[start:]))
+        if ttl is not None:
+            return ttl
+    return WEBPAGE_CACHE_TTL
+
+
+class WebpageCache:
+    """
+    Fetched webpages and their summaries, keyed by URL hash, on local disk and in S3.
+
+    Lookups try local disk, then S3, copying S3 hits to disk. An entry is served while it is
+    younger than the TTL of its domain. S3 is a best effort second tier, so its failures are
+    logged and treated as misses.
+    """
+
+    def __init__(
+        self,
+        directory: Path = WEBPAGE_CACHE_DIR,
+        max_size: int = WEBPAGE_CACHE_MAX_SIZE,
+        bucket: str = S3_MEMORY_BUCKET,
+    ) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self.bucket = bucket
+        self._lock = threading.Lock()
+
+    def _s3_key(self, url: str) -> str:
+        return generate_s3_key(f"webpages/{url_hash(url)}.json")
+
+    def _path(self, url: str) -> Path:
+        return self.directory / f"{url_hash(url)}.json"
+
+    def _is_fresh(self, page: CachedWebpage, url: str) -> bool:
+        return page.url == url and datetime.now(UTC) - page.fetched_at < get_webpage_ttl(url)
+
+    def _write_local(self, page: CachedWebpage) -> None:
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._path(page.url)
+            temp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            temp_path.write_text(page.model_dump_json())
+            os.replace(temp_path, path)
+
+            entries = list(self.directory.glob("*.json"))
+            if len(entries) > self.max_size:
+                entries.sort(key=lambda entry: entry.stat().st_mtime)
+                for entry in entries[: len(entries) - self.max_size]:
+                    entry.unlink(missing_ok=True)
+
+    def _read_local(self, url: str) -> Optional[CachedWebpage]:
+        path = self._path(url)
+        try:
+            page = CachedWebpage.model_validate_json(path.read_text())
+        except (OSError, ValueError):
+            return None
+        path.touch(exist_ok=True)
+        return page
+
+    def _read_s3(self, url: str) -> Optional[CachedWebpage]:
+        try:
+            response = get_aws_client("s3").get_object(Bucket=self.bucket, Key=self._s3_key(url))
+            return CachedWebpage.model_validate_json(response["Body"].read())
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                logger.warning(f"Failed to read cached webpage from S3: {str(e)}")
+        except Exception as e:
+            logger.warning(f"Failed to read cached webpage from S3: {str(e)}")
+        return None
+
+    def get(self, url: str) -> Optional[CachedWebpage]:
+        """The cached page for a URL if it is still fresh"""
+        page = self._read_local(url)
+        if page and self._is_fresh(page, url):
+            return page
+
+        page = self._read_s3(url)
+        if page and self._is_fresh(page, url):
+            self._write_local(page)
+            return page
+        return None
+
+    def put(self, page: CachedWebpage) -> None:
+        self._write_local(page)
+        try:
+            get_aws_client("s3").put_object(
+                Bucket=self.bucket,
+                Key=self._s3_key(page.url),
+                Body=page.model_dump_json().encode("utf-8"),
+                ContentType="application/json",
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store webpage in S3: {str(e)}")
+
+
+webpage_cache = WebpageCache(max_size=int(os.getenv("WEBPAGE_CACHE_MAX_SIZE", WEBPAGE_CACHE_MAX_SIZE)))
@@ -0,0 +1,94 @@
+import logging
+import os
+from pathlib import Path
+from typing import Iterator
+import pytest
+from sqlalchemy import Engine, text
+from sqlmodel import Session, SQLModel
+from fake_s3 import FakeS3
+from models.contact import Contact
+from models.inbox import Inbox
+from models.inbox_message import InboxMessage
+from models.inbox_message_operation import InboxMessageOperation
+from models.outbox_message import OutboxMessage
+from models.outbox_message_recipient import OutboxMessageRecipient
+from services.aws import set_aws_client_factory
+from services.contacts import contact_cache
+from services.inbox import _inbox_ids
+from services.database import get_postgres_engine, get_sqlite_engine
+from services.pkm_migrations import migrate_pkm
+
+POSTGRES_TABLES = [
+    SQLModel.metadata.tables[model.__tablename__]  # type: ignore[index]
+    for model in (Contact, Inbox, InboxMessage, InboxMessageOperation, OutboxMessage, OutboxMessageRecipient)
+]
+
+# The constraints and defaults db/schema.ts adds that the models don't declare
+POSTGRES_CONSTRAINTS = [
+    "ALTER TABLE contacts ALTER COLUMN id SET DEFAULT gen_random_uuid()",
+    "ALTER TABLE contacts ALTER COLUMN created_at SET DEFAULT now()",
+    "ALTER TABLE contacts ADD UNIQUE (email)",
+    "ALTER TABLE contacts ADD UNIQUE (phone_number)",
+    "ALTER TABLE contacts ADD UNIQUE (slack_id)",
+    "ALTER TABLE inbox_messages ADD CONSTRAINT unique_inbox_external_id UNIQUE (inbox_id, external_id)",
+]
+
+
+@pytest.fixture(scope="session")
+def postgres_schema() -> str:
+    """The scratch Postgres database given by TEST_POSTGRES_URL, with the inbox and contact tables"""
+    url = os.getenv("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+
+    engine = get_postgres_engine(url)
+    SQLModel.metadata.drop_all(engine, tables=POSTGRES_TABLES)
+    SQLModel.metadata.create_all(engine, tables=POSTGRES_TABLES)
+    with engine.begin() as connection:
+        for statement in POSTGRES_CONSTRAINTS:
+            connection.execute(text(statement))
+    return url
+
+
+@pytest.fixture
+def postgres_engine(postgres_schema: str, monkeypatch: pytest.MonkeyPatch) -> Iterator[Engine]:
+    """
+    An engine for the scratch database with every table emptied. postgres_session() connects
+    to it for the duration of the test.
+    """
+    monkeypatch.setenv("POSTGRES_URL", postgres_schema)
+    monkeypatch.delenv("NEON_URL", raising=False)
+    engine = get_postgres_engine(postgres_schema)
+    with engine.begin() as connection:
+        connection.execute(text(f"TRUNCATE {', '.join(table.name for table in POSTGRES_TABLES)}"))
+    contact_cache.clear()
+    _inbox_ids.clear()
+
+    yield engine
+
+    contact_cache.clear()
+    _inbox_ids.clear()
+
+
+@pytest.fixture
+def mock_sql_session(postgres_engine: Engine) -> Iterator[Session]:
+    with Session(postgres_engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def pkm_db(tmp_path: Path) -> Path:
+    """A pkm.db under the test's temporary directory, migrated as scripts/pkm_migrate.py would"""
+    db_path = tmp_path / "pkm.db"
+    with get_sqlite_engine(path=db_path, check_schema=False).connect() as connection:
+        migrate_pkm(connection, logging.getLogger(__name__))
+    return db_path
+
+
+@pytest.fixture
+def s3() -> Iterator[FakeS3]:
+    """An in-memory S3 that every get_aws_client("s3") returns for the duration of the test"""
+    s3 = FakeS3()
+    set_aws_client_factory(lambda service, region: s3)
+    yield s3
+    set_aws_client_factory(None)
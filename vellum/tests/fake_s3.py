@@ -0,0 +1,89 @@
+import hashlib
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from botocore.exceptions import ClientError
+
+
+class FakeS3Object:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.last_modified = datetime.now(UTC)
+        self.etag = f'"{hashlib.md5(body).hexdigest()}"'
+
+
+class FakeBody:
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+
+    def read(self) -> bytes:
+        return self.body
+
+
+class FakePaginator:
+    def __init__(self, s3: "FakeS3") -> None:
+        self.s3 = s3
+
+    def paginate(self, Bucket: str, Prefix: str) -> Iterator[Dict[str, Any]]:
+        keys = sorted(key for key in self.s3.objects if key.startswith(Prefix))
+        # Two keys a page, so restores have to follow the pagination
+        for start in range(0, len(keys), 2):
+            yield {
+                "Contents": [
+                    {
+                        "Key": key,
+                        "Size": len(self.s3.objects[key].body),
+                        "LastModified": self.s3.objects[key].last_modified,
+                        "ETag": self.s3.objects[key].etag,
+                    }
+                    for key in keys[start : start + 2]
+                ]
+            }
+
+
+class FakeS3:
+    """
+    The slice of the S3 client our services use, holding one bucket in memory.
+
+    Installed with services.aws.set_aws_client_factory by the s3 fixture, since the
+    services only ever reach S3 through get_aws_client.
+    """
+
+    def __init__(self) -> None:
+        self.objects: Dict[str, FakeS3Object] = {}
+        # Keys whose get_object fails with the given error code
+        self.errors: Dict[str, str] = {}
+        self.downloads: List[str] = []
+        self.uploads: List[str] = []
+        self.deletes: List[str] = []
+
+    def get_object(self, Bucket: str, Key: str, IfNoneMatch: Optional[str] = None) -> Dict[str, Any]:
+        if Key in self.errors:
+            raise ClientError({"Error": {"Code": self.errors[Key]}}, "GetObject")
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        obj = self.objects[Key]
+        if IfNoneMatch == obj.etag:
+            raise ClientError({"Error": {"Code": "304"}}, "GetObject")
+        self.downloads.append(Key)
+        return {"Body": FakeBody(obj.body), "ETag": obj.etag}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, **kwargs: Any) -> Dict[str, Any]:
+        self.objects[Key] = FakeS3Object(Body)
+        return {"ETag": self.objects[Key].etag}
+
+    def upload_file(self, Filename: str, Bucket: str, Key: str, **kwargs: Any) -> None:
+        self.objects[Key] = FakeS3Object(Path(Filename).read_bytes())
+        self.uploads.append(Key)
+
+    def download_file(self, Bucket: str, Key: str, Filename: str, **kwargs: Any) -> None:
+        Path(Filename).write_bytes(self.objects[Key].body)
+
+    def delete_objects(self, Bucket: str, Delete: Dict[str, Any]) -> Dict[str, Any]:
+        for obj in Delete["Objects"]:
+            self.objects.pop(obj["Key"], None)
+            self.deletes.append(obj["Key"])
+        return {}
+
+    def get_paginator(self, operation: str) -> FakePaginator:
+        return FakePaginator(self)
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+from typing import List, Tuple
+from uuid import UUID, uuid4
+import numpy as np
+from models.pkm.sport_game import SportGame
+from models.types import Sport
+from services.backtest import BacktestGames, run_backtest
+
+TEAMS = [uuid4() for _ in range(4)]
+FIRST_DAY = date(2024, 1, 1)
+
+
+def _game(day: int, home: UUID, away: UUID, home_score: int, away_score: int, hour: int = 19) -> SportGame:
+    start_time = datetime.combine(FIRST_DAY + timedelta(days=day), datetime.min.time()) + timedelta(hours=hour)
+    return SportGame(
+        home_team_id=home,
+        away_team_id=away,
+        home_team_score=home_score,
+        away_team_score=away_score,
+        start_time=start_time,
+        end_time=start_time,
+    )
+
+
+def _season(final_day_scores: List[Tuple[int, int]]) -> List[SportGame]:
+    """Two days of history, then a day whose games, and every later game, use the given scores"""
+    games = [
+        _game(0, TEAMS[0], TEAMS[1], 100, 90),
+        _game(0, TEAMS[2], TEAMS[3], 80, 95),
+        _game(1, TEAMS[1], TEAMS[2], 105, 99),
+        _game(1, TEAMS[3], TEAMS[0], 88, 91),
+    ]
+    (early_home, early_away), (late_home, late_away), (next_home, next_away) = final_day_scores
+    games += [
+        _game(2, TEAMS[0], TEAMS[2], early_home, early_away, hour=12),
+        _game(2, TEAMS[1], TEAMS[0], late_home, late_away, hour=20),
+        _game(3, TEAMS[0], TEAMS[3], next_home, next_away),
+    ]
+    return games
+
+
+def _load(games: List[SportGame], max_window: int = 5) -> BacktestGames:
+    return BacktestGames(games, [Sport.NBA] * len(games), max_window)
+
+
+def test_prior_games_exclude_the_same_day_and_later() -> None:
+    games = _load(_season([(70, 120), (130, 60), (50, 150)]))
+
+    # TEAMS[0] plays twice on day 2; the evening game sees only days 0 and 1, not the noon game
+    evening = 5
+    assert games.away_played[evening].sum() == 2
+    np.testing.assert_array_equal(games.away_diffs[evening, :2], [91 - 88, 100 - 90])
+    assert games.away_was_home[evening, :2].tolist() == [False, True]
+
+    # On day 3 it sees both day 2 games, most recent first
+    assert games.home_played[6].sum() == 4
+    np.testing.assert_array_equal(games.home_diffs[6, :2], [60 - 130, 70 - 120])
+
+
+def test_picks_do_not_depend_on_the_results_they_bet_on() -> None:
+    final_day = FIRST_DAY + timedelta(days=2)
+    results = [
+        run_backtest(_load(_season(scores)), final_day, final_day)
+        for scores in ([(70, 120), (130, 60), (50, 150)], [(120, 70), (60, 130), (150, 50)])
+    ]
+
+    # Flipping every result from the bet day on flips every settled bet, which is only
+    # possible if the picks themselves were made without seeing those results
+    assert [(result.sports[0].wins, result.sports[0].losses) for result in results] == [(0, 2), (2, 0)]
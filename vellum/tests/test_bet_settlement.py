@@ -0,0 +1,69 @@
+import pytest
+from models.types import Sport
+from services.bet_settlement import CompletedGame, SpreadBet, settle_bet, settle_bets
+
+GAME = CompletedGame(
+    sport=Sport.NBA,
+    home_team="Boston Celtics",
+    away_team="New York Knicks",
+    home_team_score=110,
+    away_team_score=104,
+)
+
+
+def _bet(pick: str, opponent: str, spread: float, odds: int = -110, row: int = 2) -> SpreadBet:
+    return SpreadBet(row=row, sport=Sport.NBA, pick=pick, opponent=opponent, spread=spread, odds=odds, wager=10)
+
+
+@pytest.mark.parametrize(
+    "pick, opponent, spread, result, winnings",
+    [
+        # Celtics won by 6
+        ("Boston Celtics", "New York Knicks", -5.5, "win", 19.09),
+        ("Boston Celtics", "New York Knicks", -6, "push", 10),
+        ("Boston Celtics", "New York Knicks", -6.5, "loss", 0),
+        ("New York Knicks", "Boston Celtics", 6.5, "win", 19.09),
+        ("New York Knicks", "Boston Celtics", 6, "push", 10),
+        ("New York Knicks", "Boston Celtics", 5.5, "loss", 0),
+    ],
+)
+def test_spread_decides_the_result(pick: str, opponent: str, spread: float, result: str, winnings: float) -> None:
+    settled = settle_bet(_bet(pick, opponent, spread), GAME)
+
+    assert settled.result == result
+    assert settled.winnings == winnings
+    assert settled.game == GAME
+
+
+def test_plus_odds_pay_out_more_than_the_wager() -> None:
+    settled = settle_bet(_bet("New York Knicks", "Boston Celtics", 6.5, odds=150), GAME)
+
+    assert settled.result == "win"
+    assert settled.winnings == 25
+
+
+def test_bet_without_a_game_is_void_and_refunded() -> None:
+    settled = settle_bet(_bet("Boston Celtics", "New York Knicks", -3), None)
+
+    assert settled.result == "void"
+    assert settled.winnings == 10
+
+
+def test_pick_not_in_the_game_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        settle_bet(_bet("Miami Heat", "New York Knicks", -3), GAME)
+
+
+def test_settle_bets_matches_each_bet_to_its_most_recent_game() -> None:
+    rematch = GAME.model_copy(update={"home_team_score": 90})
+    other_sport = GAME.model_copy(update={"sport": Sport.NCAAB, "home_team_score": 50})
+    bets = [
+        _bet("New York Knicks", "Boston Celtics", 1.5, row=3),
+        _bet("Boston Celtics", "Miami Heat", -3, row=4),
+    ]
+
+    settled = settle_bets(bets, [rematch, GAME, other_sport])
+
+    assert [settled_bet.bet.row for settled_bet in settled] == [3, 4]
+    assert [settled_bet.result for settled_bet in settled] == ["win", "void"]
+    assert settled[0].game == rematch
@@ -0,0 +1,102 @@
+import os
+from pathlib import Path
+from uuid import uuid4
+import pytest
+from botocore.exceptions import ClientError
+from vellum.workflows.state import BaseState
+from fake_s3 import FakeS3, FakeS3Object
+from models.types import InboxType
+from services.aws import generate_s3_key
+from services.contact_summaries import ContactSummaryStore
+from workflows.triage_message.nodes.fetch_contact_summary_node import FetchContactSummaryNode
+from workflows.triage_message.nodes.read_message_node import ReadMessageNode, SlimMessage
+
+
+def _key(contact_id: str) -> str:
+    return generate_s3_key(f"contacts/{contact_id}/summary.txt")
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> ContactSummaryStore:
+    return ContactSummaryStore(directory=tmp_path / "contact_summaries", max_size=2)
+
+
+def test_unchanged_summary_is_served_from_the_cache(store: ContactSummaryStore, s3: FakeS3) -> None:
+    s3.objects[_key("jane")] = FakeS3Object(b"Jane is a client")
+
+    assert store.get("jane") == "Jane is a client"
+    assert store.get("jane") == "Jane is a client"
+    # The second read was answered with a 304
+    assert s3.downloads == [_key("jane")]
+
+
+def test_summary_edited_elsewhere_is_downloaded_again(store: ContactSummaryStore, s3: FakeS3) -> None:
+    s3.objects[_key("jane")] = FakeS3Object(b"Jane is a client")
+    store.get("jane")
+
+    s3.objects[_key("jane")] = FakeS3Object(b"Jane is a former client")
+
+    assert store.get("jane") == "Jane is a former client"
+    assert s3.downloads == [_key("jane"), _key("jane")]
+
+
+def test_missing_summary_is_none_and_drops_the_cached_copy(store: ContactSummaryStore, s3: FakeS3) -> None:
+    s3.objects[_key("jane")] = FakeS3Object(b"Jane is a client")
+    store.get("jane")
+
+    del s3.objects[_key("jane")]
+
+    assert store.get("jane") is None
+    assert list(store.directory.iterdir()) == []
+
+
+def test_other_errors_are_raised(store: ContactSummaryStore, s3: FakeS3) -> None:
+    s3.objects[_key("jane")] = FakeS3Object(b"Jane is a client")
+    store.get("jane")
+    s3.errors[_key("jane")] = "AccessDenied"
+
+    with pytest.raises(ClientError):
+        store.get("jane")
+
+
+def test_put_caches_the_summary_under_its_new_etag(store: ContactSummaryStore, s3: FakeS3) -> None:
+    store.put("jane", "Jane is a client")
+
+    assert s3.objects[_key("jane")].body == b"Jane is a client"
+    assert store.get("jane") == "Jane is a client"
+    assert s3.downloads == []
+
+
+def test_least_recently_used_summaries_are_evicted(store: ContactSummaryStore, s3: FakeS3) -> None:
+    for index, contact_id in enumerate(["a", "b"]):
+        store.put(contact_id, f"Summary {contact_id}")
+        # File mtimes order the entries, so keep them apart regardless of the clock's resolution
+        os.utime(store.directory / f"{contact_id}.json", (index, index))
+    # Reading "a" makes "b" the least recently used
+    store.get("a")
+
+    store.put("c", "Summary c")
+
+    assert sorted(path.name for path in store.directory.iterdir()) == ["a.json", "c.json"]
+
+
+def test_failed_fetch_skips_the_summary_update(s3: FakeS3) -> None:
+    contact_id = uuid4()
+    s3.errors[_key(str(contact_id))] = "AccessDenied"
+    state = BaseState()
+    state.meta.node_outputs[ReadMessageNode.Outputs.message] = SlimMessage(
+        message_id=uuid4(),
+        body="Hi",
+        contact_id=contact_id,
+        channel=InboxType.EMAIL,
+        inbox_name="email",
+        inbox_id=uuid4(),
+    )
+    node = FetchContactSummaryNode(state=state)
+
+    outputs = node.run()
+    for descriptor, value in outputs:
+        state.meta.node_outputs[descriptor] = value
+
+    assert outputs.summary_unavailable
+    assert node.Ports()(outputs, state) == {FetchContactSummaryNode.Ports.unavailable}
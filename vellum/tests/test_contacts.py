@@ -0,0 +1,192 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from uuid import uuid4
+import pytest
+from sqlalchemy import Engine
+from sqlmodel import Session, select
+from models.contact import Contact
+from services import contacts
+from services.contacts import (
+    ContactCache,
+    ContactCacheStats,
+    ContactIdentifier,
+    contact_cache,
+    get_contact,
+    get_contact_by,
+    invalidate_contact,
+    resolve_contacts,
+)
+
+IDENTIFIERS: List[ContactIdentifier] = [
+    ("email", "jane@example.com"),
+    ("phone_number", "+15555550100"),
+    ("slack_id", "U0123456"),
+]
+
+
+def _contacts(engine: Engine) -> List[Contact]:
+    with Session(engine) as session:
+        return list(session.exec(select(Contact)).all())
+
+
+def test_resolve_contacts_is_idempotent(postgres_engine: Engine) -> None:
+    first = resolve_contacts(IDENTIFIERS + [IDENTIFIERS[0]])
+    contact_cache.clear()
+    second = resolve_contacts(IDENTIFIERS)
+
+    assert first == second
+    assert set(first) == set(IDENTIFIERS)
+    contacts = _contacts(postgres_engine)
+    assert len(contacts) == len(IDENTIFIERS)
+    assert {(contact.email, contact.phone_number, contact.slack_id) for contact in contacts} == {
+        ("jane@example.com", None, None),
+        (None, "+15555550100", None),
+        (None, None, "U0123456"),
+    }
+
+
+def test_resolve_contacts_finds_existing_contacts(mock_sql_session: Session) -> None:
+    existing = Contact(email="jane@example.com", full_name="Jane")
+    mock_sql_session.add(existing)
+    mock_sql_session.commit()
+
+    resolved = resolve_contacts([("email", "jane@example.com")])
+
+    assert resolved == {("email", "jane@example.com"): str(existing.id)}
+
+
+def test_concurrent_resolves_create_each_contact_once(postgres_engine: Engine) -> None:
+    workers = 8
+    barrier = threading.Barrier(workers)
+
+    def resolve(_: int) -> Dict[ContactIdentifier, str]:
+        barrier.wait()
+        return resolve_contacts(IDENTIFIERS)
+
+    for _ in range(5):
+        contact_cache.clear()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(resolve, range(workers)))
+
+        assert all(result == results[0] for result in results)
+        assert len(_contacts(postgres_engine)) == len(IDENTIFIERS)
+
+
+def test_resolve_contacts_rejects_unknown_kinds(postgres_engine: Engine) -> None:
+    with pytest.raises(ValueError):
+        resolve_contacts([("twitter", "@jane")])  # type: ignore[list-item]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(contacts.time, "monotonic", clock)
+    return clock
+
+
+def _contact(**identifiers: str) -> Contact:
+    return Contact(id=uuid4(), **identifiers)
+
+
+def test_cache_finds_contacts_by_each_identifier(clock: FakeClock) -> None:
+    cache = ContactCache()
+    contact = _contact(email="jane@example.com", phone_number="+15555550100", slack_id="U0123456")
+    cache.put(contact)
+
+    for kind, value in IDENTIFIERS:
+        found = cache.get_by(kind, value)
+        assert found is not None and found.id == contact.id
+    assert cache.get_by("email", "john@example.com") is None
+
+
+def test_cache_drops_identifiers_a_contact_no_longer_has(clock: FakeClock) -> None:
+    cache = ContactCache()
+    contact = _contact(email="jane@example.com")
+    cache.put(contact)
+
+    contact.email = "jane@example.org"
+    cache.put(contact)
+
+    assert cache.get_by("email", "jane@example.com") is None
+    assert cache.get_by("email", "jane@example.org") is not None
+
+
+def test_cache_entries_expire_after_the_ttl(clock: FakeClock) -> None:
+    cache = ContactCache(ttl_seconds=60)
+    contact = _contact(email="jane@example.com")
+    cache.put(contact)
+
+    clock.now += 59
+    assert cache.get(contact.id) is not None
+    clock.now += 2
+    assert cache.get(contact.id) is None
+    assert cache.get_by("email", "jane@example.com") is None
+    assert cache.stats().size == 0
+
+
+def test_cache_evicts_the_least_recently_used_contact(clock: FakeClock) -> None:
+    cache = ContactCache(max_size=2)
+    first, second, third = (_contact(email=f"{name}@example.com") for name in ("a", "b", "c"))
+    cache.put(first)
+    cache.put(second)
+    # Reading the first contact makes the second the least recently used
+    assert cache.get(first.id) is not None
+
+    cache.put(third)
+
+    assert cache.get(second.id) is None
+    assert cache.get_by("email", "b@example.com") is None
+    assert cache.get(first.id) is not None and cache.get(third.id) is not None
+
+
+def test_cache_counts_hits_misses_and_evictions(clock: FakeClock) -> None:
+    cache = ContactCache(max_size=1)
+    first, second = _contact(email="a@example.com"), _contact(email="b@example.com")
+    cache.put(first)
+    cache.get(first.id)
+    cache.get_by("email", "a@example.com")
+    cache.get_by("email", "unknown@example.com")
+    cache.put(second)
+    cache.get(first.id)
+
+    assert cache.stats() == ContactCacheStats(size=1, hits=2, misses=2, evictions=1)
+
+
+def test_cached_contacts_are_copies(clock: FakeClock) -> None:
+    cache = ContactCache()
+    contact = _contact(email="jane@example.com")
+    cache.put(contact)
+
+    found = cache.get(contact.id)
+    assert found is not None
+    found.full_name = "Changed"
+    cached = cache.get(contact.id)
+    assert cached is not None and cached.full_name is None
+
+
+def test_invalidated_contact_is_read_again(mock_sql_session: Session) -> None:
+    contact = Contact(email="jane@example.com", full_name="Jane")
+    mock_sql_session.add(contact)
+    mock_sql_session.commit()
+    found = get_contact_by("email", "jane@example.com")
+    assert found is not None and found.full_name == "Jane"
+
+    contact.full_name = "Jane Doe"
+    mock_sql_session.commit()
+    # Until it is invalidated, the cached copy is served
+    found = get_contact(contact.id)
+    assert found is not None and found.full_name == "Jane"
+
+    invalidate_contact(str(contact.id))
+
+    found = get_contact(contact.id)
+    assert found is not None and found.full_name == "Jane Doe"
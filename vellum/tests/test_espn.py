@@ -0,0 +1,52 @@
+import pytest
+import requests_mock
+from services import espn
+from services.espn import fetch_espn_json
+
+URL = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba/scoreboard"
+
+
+@pytest.fixture(autouse=True)
+def empty_response_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(espn, "_responses", espn.OrderedDict())
+    monkeypatch.setattr(espn, "_responses_bytes", 0)
+
+
+def _register_day(mocker: requests_mock.Mocker, day: str, body: str) -> None:
+    mocker.get(
+        f"{URL}?dates={day}",
+        [
+            {"text": body, "headers": {"ETag": f'"{day}"'}},
+            {"status_code": 304},
+        ],
+    )
+
+
+def test_revalidated_response_is_served_from_cache() -> None:
+    with requests_mock.Mocker() as mocker:
+        _register_day(mocker, "20240101", '{"events": []}')
+
+        assert fetch_espn_json(URL, {"dates": "20240101"}) == {"events": []}
+        assert fetch_espn_json(URL, {"dates": "20240101"}) == {"events": []}
+        assert mocker.request_history[1].headers["If-None-Match"] == '"20240101"'
+
+
+def test_cache_stays_within_its_byte_budget(monkeypatch: pytest.MonkeyPatch) -> None:
+    body = '{"events": [], "padding": "' + "x" * 80 + '"}'
+    monkeypatch.setattr(espn, "ESPN_RESPONSE_CACHE_MAX_BYTES", len(body) * 2)
+    with requests_mock.Mocker() as mocker:
+        for day in ("20240101", "20240102", "20240103"):
+            _register_day(mocker, day, body)
+            fetch_espn_json(URL, {"dates": day})
+
+    assert [key.rsplit("=", 1)[1] for key in espn._responses] == ["20240102", "20240103"]
+    assert espn._responses_bytes == len(body) * 2
+
+
+def test_uncached_fetch_leaves_the_cache_alone() -> None:
+    with requests_mock.Mocker() as mocker:
+        _register_day(mocker, "20240101", '{"events": []}')
+
+        fetch_espn_json(URL, {"dates": "20240101"}, use_cache=False)
+
+    assert not espn._responses
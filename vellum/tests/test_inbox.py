@@ -0,0 +1,267 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+import pytest
+from sqlalchemy import Engine, update
+from sqlmodel import Session, select
+from models.contact import Contact
+from models.inbox import Inbox
+from models.inbox_message import InboxMessage
+from models.inbox_message_operation import InboxMessageOperation
+from models.outbox_message import OutboxMessage
+from models.outbox_message_recipient import OutboxMessageRecipient
+from models.types import InboxMessageOperationType, InboxType, OutboxRecipientType
+from services.inbox import (
+    INGEST_CHUNK_SIZE,
+    NewInboxMessage,
+    abandon_inbox_message_lease,
+    claim_unread_messages,
+    create_inbox_messages,
+    get_claimed_message,
+    get_message_history,
+    record_inbox_message_operations,
+    release_inbox_message_leases,
+)
+
+
+def _add_messages(session: Session, count: int) -> List[UUID]:
+    """Add `count` messages from one contact, oldest first, returning their ids"""
+    inbox = Inbox(name="email", type=InboxType.EMAIL)
+    contact = Contact(email="jane@example.com")
+    session.add_all([inbox, contact])
+    session.flush()
+
+    start = datetime.now(UTC) - timedelta(hours=1)
+    messages = [
+        InboxMessage(
+            inbox_id=inbox.id,
+            contact_id=contact.id,
+            body=f"Message {index}",
+            created_at=start + timedelta(minutes=index),
+        )
+        for index in range(count)
+    ]
+    session.add_all(messages)
+    session.commit()
+    return [message.id for message in messages]
+
+
+def _expire_leases(session: Session) -> None:
+    session.execute(
+        update(InboxMessage)
+        .where(InboxMessage.leased_until.is_not(None))  # type: ignore[union-attr]
+        .values(leased_until=datetime.now(UTC) - timedelta(minutes=1))
+    )
+    session.commit()
+
+
+def test_claim_leases_newest_messages_first(mock_sql_session: Session) -> None:
+    message_ids = _add_messages(mock_sql_session, 3)
+
+    claimed = claim_unread_messages(mock_sql_session, limit=2, worker_id="worker-1")
+
+    assert [message.id for message, _, _, _ in claimed] == [message_ids[2], message_ids[1]]
+    assert all(inbox_type == InboxType.EMAIL for _, inbox_type, _, _ in claimed)
+    for message, _, _, _ in claimed:
+        mock_sql_session.refresh(message)
+        assert message.latest_operation == InboxMessageOperationType.READ
+        assert message.leased_by == "worker-1"
+    operations = mock_sql_session.exec(select(InboxMessageOperation)).all()
+    assert sorted(operation.inbox_message_id for operation in operations) == sorted(message_ids[1:])
+
+
+def test_concurrent_claims_never_share_a_message(postgres_engine: Engine) -> None:
+    with Session(postgres_engine) as session:
+        message_ids = _add_messages(session, 40)
+
+    def drain(worker: int) -> List[UUID]:
+        claimed_ids: List[UUID] = []
+        with Session(postgres_engine) as session:
+            while claimed := claim_unread_messages(session, limit=3, worker_id=f"worker-{worker}"):
+                claimed_ids.extend(message.id for message, _, _, _ in claimed)
+        return claimed_ids
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(drain, range(4)))
+
+    claimed_ids = [message_id for result in results for message_id in result]
+    assert len(claimed_ids) == len(set(claimed_ids))
+    assert set(claimed_ids) == set(message_ids)
+
+
+def test_expired_lease_is_claimable_again(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    claim_unread_messages(mock_sql_session, worker_id="worker-1")
+    assert claim_unread_messages(mock_sql_session, worker_id="worker-2") == []
+
+    _expire_leases(mock_sql_session)
+    claimed = claim_unread_messages(mock_sql_session, worker_id="worker-2")
+
+    assert [message.id for message, _, _, _ in claimed] == [message_id]
+    assert claimed[0][0].leased_by == "worker-2"
+
+
+def test_released_message_is_never_claimed_again(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    claim_unread_messages(mock_sql_session, worker_id="worker-1")
+
+    assert release_inbox_message_leases(mock_sql_session, [message_id], "worker-1") == [message_id]
+    mock_sql_session.commit()
+    _expire_leases(mock_sql_session)
+
+    assert claim_unread_messages(mock_sql_session, worker_id="worker-2") == []
+
+
+def test_claimed_message_is_only_loaded_by_its_lease_owner(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    claim_unread_messages(mock_sql_session, worker_id="worker-1")
+
+    claimed = get_claimed_message(mock_sql_session, message_id, "worker-1")
+    assert claimed is not None and claimed[0].id == message_id
+    assert get_claimed_message(mock_sql_session, message_id, "worker-2") is None
+
+    _expire_leases(mock_sql_session)
+    assert get_claimed_message(mock_sql_session, message_id, "worker-1") is None
+
+
+def test_release_after_losing_the_lease_is_a_no_op(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    claim_unread_messages(mock_sql_session, worker_id="worker-1")
+    _expire_leases(mock_sql_session)
+    claim_unread_messages(mock_sql_session, worker_id="worker-2")
+
+    assert release_inbox_message_leases(mock_sql_session, [message_id], "worker-1") == []
+    mock_sql_session.commit()
+
+    message = mock_sql_session.get(InboxMessage, message_id, populate_existing=True)
+    assert message is not None and message.leased_by == "worker-2"
+
+
+def test_abandoned_lease_is_retried_on_the_next_claim(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    claim_unread_messages(mock_sql_session, worker_id="worker-1")
+
+    abandon_inbox_message_lease(mock_sql_session, message_id, "worker-1")
+    mock_sql_session.commit()
+    claimed = claim_unread_messages(mock_sql_session, worker_id="worker-2")
+
+    assert [message.id for message, _, _, _ in claimed] == [message_id]
+    assert claimed[0][0].claim_attempts == 2
+
+
+def test_message_is_marked_failed_after_its_last_attempt(mock_sql_session: Session) -> None:
+    (message_id,) = _add_messages(mock_sql_session, 1)
+    for attempt in range(2):
+        assert claim_unread_messages(mock_sql_session, worker_id=f"worker-{attempt}", max_attempts=2)
+        _expire_leases(mock_sql_session)
+
+    assert claim_unread_messages(mock_sql_session, worker_id="worker-2", max_attempts=2) == []
+    message = mock_sql_session.get(InboxMessage, message_id, populate_existing=True)
+    assert message is not None
+    assert message.latest_operation == InboxMessageOperationType.FAILED
+    assert message.leased_by is None and message.leased_until is None
+
+    # Marking it unread again gives it a fresh set of attempts
+    record_inbox_message_operations(mock_sql_session, [message_id], InboxMessageOperationType.UNREAD)
+    mock_sql_session.commit()
+    claimed = claim_unread_messages(mock_sql_session, worker_id="worker-3", max_attempts=2)
+    assert [message.id for message, _, _, _ in claimed] == [message_id]
+    assert claimed[0][0].claim_attempts == 1
+
+
+def test_history_lists_incoming_before_outgoing_at_the_same_moment(mock_sql_session: Session) -> None:
+    message_ids = _add_messages(mock_sql_session, 4)
+    first, second = (mock_sql_session.get(InboxMessage, message_id) for message_id in message_ids[:2])
+    assert first is not None and second is not None
+    # Each reply is stored with the same timestamp as the message it answers
+    replies = [
+        OutboxMessage(parent_inbox_message_id=message.id, body=f"Reply {index}", created_at=message.created_at, type=InboxType.EMAIL)
+        for index, message in enumerate([first, second])
+    ]
+    mock_sql_session.add_all(replies)
+    mock_sql_session.add_all(
+        OutboxMessageRecipient(message_id=reply.id, contact_id=first.contact_id, type=OutboxRecipientType.TO)
+        for reply in replies
+    )
+    mock_sql_session.commit()
+
+    bodies: List[str] = []
+    before = None
+    while True:
+        page = get_message_history(mock_sql_session, message_ids[3], limit=2, before=before)
+        bodies.extend(entry.body for entry in page.entries)
+        if not page.next_cursor:
+            break
+        before = page.next_cursor
+
+    assert bodies == ["Message 2", "Message 1", "Reply 1", "Message 0", "Reply 0"]
+
+
+def _add_inbox_and_contact(session: Session) -> UUID:
+    """Add the "email" inbox and a contact, returning the contact's id"""
+    contact = Contact(email="jane@example.com")
+    session.add_all([Inbox(name="email", type=InboxType.EMAIL), contact])
+    session.commit()
+    return contact.id
+
+
+def _new_message(contact_id: UUID, external_id: Optional[str], inbox_name: str = "email") -> NewInboxMessage:
+    return NewInboxMessage(inbox_name=inbox_name, contact_id=contact_id, body=f"Body {external_id}", external_id=external_id)
+
+
+def _stored_external_ids(session: Session) -> List[Optional[str]]:
+    return sorted(
+        session.exec(select(InboxMessage.external_id)).all(),
+        key=lambda external_id: external_id or "",
+    )
+
+
+def test_create_returns_ids_in_input_order_with_none_for_duplicates(mock_sql_session: Session) -> None:
+    contact_id = _add_inbox_and_contact(mock_sql_session)
+    (existing_id,) = create_inbox_messages(mock_sql_session, [_new_message(contact_id, "a")])
+    assert existing_id is not None
+
+    new_ids = create_inbox_messages(
+        mock_sql_session,
+        [
+            _new_message(contact_id, "b"),
+            _new_message(contact_id, "a"),
+            _new_message(contact_id, "c"),
+            _new_message(contact_id, "b"),
+            _new_message(contact_id, None),
+            _new_message(contact_id, None),
+        ],
+    )
+
+    assert [new_id is not None for new_id in new_ids] == [True, False, True, False, True, True]
+    assert len(set(new_ids) - {None}) == 4
+    stored = {message.id: message.external_id for message in mock_sql_session.exec(select(InboxMessage)).all()}
+    assert stored[existing_id] == "a"
+    assert [stored[new_id] if new_id else None for new_id in new_ids] == ["b", None, "c", None, None, None]
+    assert _stored_external_ids(mock_sql_session) == [None, None, "a", "b", "c"]
+
+
+def test_create_inserts_batches_larger_than_one_chunk(mock_sql_session: Session) -> None:
+    contact_id = _add_inbox_and_contact(mock_sql_session)
+    count = INGEST_CHUNK_SIZE * 2 + 1
+    messages = [_new_message(contact_id, str(index)) for index in range(count)]
+    # A duplicate of a message two chunks earlier
+    messages.append(_new_message(contact_id, "0"))
+
+    new_ids = create_inbox_messages(mock_sql_session, messages)
+
+    assert all(new_id is not None for new_id in new_ids[:count])
+    assert new_ids[count] is None
+    assert len(mock_sql_session.exec(select(InboxMessage.id)).all()) == count
+
+
+def test_create_rejects_unknown_inboxes(mock_sql_session: Session) -> None:
+    contact_id = _add_inbox_and_contact(mock_sql_session)
+
+    with pytest.raises(ValueError, match="sms"):
+        create_inbox_messages(
+            mock_sql_session, [_new_message(contact_id, "a"), _new_message(contact_id, "b", inbox_name="sms")]
+        )
+
+    assert _stored_external_ids(mock_sql_session) == []
@@ -0,0 +1,30 @@
+from typing import List
+from workflows.triage_message.nodes.lookup_url_node import LookupUrlNode
+
+
+def _extract(chunks: List[str], max_chars: int = 1000) -> str:
+    parser = LookupUrlNode._HTMLTextExtractor(max_chars=max_chars)
+    for chunk in chunks:
+        parser.feed(chunk)
+    parser.close()
+    return parser.get_text()
+
+
+def test_text_split_mid_word_is_joined_back_together() -> None:
+    document = "<html><head><title>Ignored</title></head><body><p>Hello world,\n  again</p><p>Bye</p></body></html>"
+
+    for split in range(len(document) + 1):
+        assert _extract([document[:split], document[split:]]) == "Hello world, again Bye", split
+
+
+def test_runs_between_tags_are_separated_by_a_space() -> None:
+    assert _extract(["<p>One</p><p>Two<br>Three</p><script>var x = 1;</script>"]) == "One Two Three"
+
+
+def test_text_stops_at_the_character_cap() -> None:
+    parser = LookupUrlNode._HTMLTextExtractor(max_chars=8)
+    parser.feed("<p>abcdef</p><p>ghijkl</p>")
+
+    assert parser.is_full
+    parser.feed("<p>never read</p>")
+    assert parser.get_text() == "abcdef g"
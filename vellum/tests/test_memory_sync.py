@@ -0,0 +1,183 @@
+import logging
+import shutil
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict
+from fake_s3 import FakeS3, FakeS3Object
+from services.memory_sync import (
+    MEMORY_MANIFEST_KEY,
+    MEMORY_TOMBSTONE_TTL,
+    MemoryManifest,
+    backup_memory_incremental,
+    restore_memory,
+)
+
+BUCKET = "test-memory"
+logger = logging.getLogger(__name__)
+
+
+def _manifest(s3: FakeS3) -> MemoryManifest:
+    return MemoryManifest.model_validate_json(s3.objects[MEMORY_MANIFEST_KEY].body)
+
+
+def _backup(memory_dir: Path) -> Any:
+    return backup_memory_incremental(logger, memory_dir, bucket=BUCKET, max_workers=2)
+
+
+def _write(memory_dir: Path, files: Dict[str, str]) -> None:
+    for key, content in files.items():
+        path = memory_dir / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+
+
+def test_backup_uploads_only_changed_files(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path, {"notes.md": "one", "reports/a.md": "a", "reports/b.md": "b"})
+    first = _backup(tmp_path)
+    assert (first.uploaded, first.unchanged) == (3, 0)
+
+    s3.uploads.clear()
+    _write(tmp_path, {"reports/a.md": "a, revised", "reports/c.md": "c"})
+    second = _backup(tmp_path)
+
+    assert sorted(s3.uploads) == ["reports/a.md", "reports/c.md"]
+    assert (second.uploaded, second.unchanged) == (2, 2)
+    assert set(_manifest(s3).files) == {"notes.md", "reports/a.md", "reports/b.md", "reports/c.md"}
+
+
+def test_touched_file_with_the_same_content_is_not_uploaded(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path, {"notes.md": "one"})
+    _backup(tmp_path)
+
+    s3.uploads.clear()
+    _write(tmp_path, {"notes.md": "one"})
+    result = _backup(tmp_path)
+
+    assert s3.uploads == []
+    assert result.unchanged == 1
+
+
+def test_removed_file_is_tombstoned_before_it_is_deleted(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path, {"a.md": "a", "b.md": "b", "c.md": "c"})
+    _backup(tmp_path)
+
+    (tmp_path / "c.md").unlink()
+    result = _backup(tmp_path)
+
+    assert (result.tombstoned, result.deleted) == (1, 0)
+    assert "c.md" in s3.objects
+    manifest = _manifest(s3)
+    assert "c.md" not in manifest.files and "c.md" in manifest.tombstones
+
+    # Once the tombstone expires, the next backup deletes the object
+    manifest.tombstones["c.md"] -= MEMORY_TOMBSTONE_TTL
+    s3.put_object(Bucket=BUCKET, Key=MEMORY_MANIFEST_KEY, Body=manifest.model_dump_json().encode())
+    result = _backup(tmp_path)
+
+    assert result.deleted == 1
+    assert s3.deletes == ["c.md"]
+    assert "c.md" not in s3.objects and _manifest(s3).tombstones == {}
+
+
+def test_file_that_reappears_clears_its_tombstone(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path, {"a.md": "a", "b.md": "b", "c.md": "c"})
+    _backup(tmp_path)
+    (tmp_path / "c.md").unlink()
+    _backup(tmp_path)
+
+    _write(tmp_path, {"c.md": "c"})
+    _backup(tmp_path)
+
+    manifest = _manifest(s3)
+    assert "c.md" in manifest.files and manifest.tombstones == {}
+
+
+def test_backup_missing_most_files_removes_nothing(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path, {"a.md": "a", "b.md": "b", "c.md": "c"})
+    _backup(tmp_path)
+
+    shutil.rmtree(tmp_path)
+    _write(tmp_path, {"a.md": "a"})
+    result = _backup(tmp_path)
+
+    assert (result.tombstoned, result.deleted) == (0, 0)
+    manifest = _manifest(s3)
+    assert set(manifest.files) == {"a.md", "b.md", "c.md"} and manifest.tombstones == {}
+
+
+def test_database_is_backed_up_as_a_snapshot_with_its_log(tmp_path: Path, s3: FakeS3) -> None:
+    database = sqlite3.connect(tmp_path / "pkm.db")
+    database.execute("PRAGMA journal_mode=WAL")
+    database.execute("PRAGMA wal_autocheckpoint=0")
+    database.execute("CREATE TABLE notes (body TEXT)")
+    database.execute("INSERT INTO notes VALUES ('only in the log')")
+    database.commit()
+    try:
+        assert (tmp_path / "pkm.db-wal").exists()
+        _backup(tmp_path)
+    finally:
+        database.close()
+
+    assert set(_manifest(s3).files) == {"pkm.db"}
+    restored = tmp_path / "restored.db"
+    restored.write_bytes(s3.objects["pkm.db"].body)
+    with sqlite3.connect(restored) as connection:
+        assert connection.execute("SELECT body FROM notes").fetchall() == [("only in the log",)]
+
+
+def _restore(memory_dir: Path) -> Any:
+    return restore_memory(logger, memory_dir=memory_dir, bucket=BUCKET, max_workers=2)
+
+
+def test_restore_pages_through_every_object(tmp_path: Path, s3: FakeS3) -> None:
+    files = {f"reports/{index}.md": f"report {index}" for index in range(5)}
+    _write(tmp_path / "backed-up", files)
+    _backup(tmp_path / "backed-up")
+
+    result = _restore(tmp_path / "restored")
+
+    assert result.downloaded == 5
+    assert {key: (tmp_path / "restored" / key).read_text() for key in files} == files
+
+
+def test_restore_downloads_only_files_that_differ(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path / "backed-up", {"a.md": "a", "b.md": "b", "c.md": "c"})
+    _backup(tmp_path / "backed-up")
+    _restore(tmp_path / "restored")
+
+    _write(tmp_path / "restored", {"b.md": "local edit"})
+    result = _restore(tmp_path / "restored")
+
+    assert (result.downloaded, result.unchanged) == (1, 2)
+    assert (tmp_path / "restored" / "b.md").read_text() == "b"
+
+
+def test_restore_skips_tombstoned_files(tmp_path: Path, s3: FakeS3) -> None:
+    _write(tmp_path / "backed-up", {"a.md": "a", "b.md": "b", "c.md": "c"})
+    _backup(tmp_path / "backed-up")
+    (tmp_path / "backed-up" / "c.md").unlink()
+    _backup(tmp_path / "backed-up")
+
+    result = _restore(tmp_path / "restored")
+
+    assert (result.downloaded, result.skipped) == (2, 1)
+    assert not (tmp_path / "restored" / "c.md").exists()
+
+
+def test_restoring_a_database_drops_its_stale_log(tmp_path: Path, s3: FakeS3) -> None:
+    with sqlite3.connect(tmp_path / "backed-up.db") as connection:
+        connection.execute("CREATE TABLE notes (body TEXT)")
+        connection.execute("INSERT INTO notes VALUES ('backed up')")
+    connection.close()
+    s3.objects["pkm.db"] = FakeS3Object((tmp_path / "backed-up.db").read_bytes())
+    s3.objects["pkm.db-wal"] = FakeS3Object(b"uploaded before snapshots")
+    restored = tmp_path / "restored"
+    _write(restored, {"pkm.db": "replaced", "pkm.db-wal": "stale", "pkm.db-shm": "stale"})
+
+    result = _restore(restored)
+
+    assert (result.downloaded, result.skipped) == (1, 1)
+    assert sorted(path.name for path in restored.iterdir()) == ["pkm.db"]
+    with sqlite3.connect(restored / "pkm.db") as connection:
+        assert connection.execute("SELECT body FROM notes").fetchall() == [("backed up",)]
+    connection.close()
@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+import pytest
+from sqlalchemy import Connection, text
+from sqlmodel import Session
+from models.pkm.sport_game import SportGame
+from models.pkm.sport_team import SportTeam
+from models.types import Sport
+from services.database import get_sqlite_engine
+from services.pkm_export import export_pkm, read_pkm_export
+
+logger = logging.getLogger(__name__)
+
+
+@pytest.fixture
+def connection(pkm_db: Path) -> Iterator[Connection]:
+    engine = get_sqlite_engine(path=pkm_db)
+    celtics = SportTeam(location="Boston", name="Celtics", sport=Sport.NBA, espn_id="2")
+    knicks = SportTeam(location="New York", name="Knicks", sport=Sport.NBA, espn_id="18")
+    with Session(engine) as session:
+        session.add_all([celtics, knicks])
+        session.add_all(
+            SportGame(
+                home_team_id=celtics.id,
+                away_team_id=knicks.id,
+                home_team_score=100 + day,
+                away_team_score=90,
+                start_time=start_time,
+                end_time=start_time,
+            )
+            for day, start_time in enumerate([datetime(2023, 11, 1), datetime(2023, 11, 2), datetime(2024, 11, 1)])
+        )
+        session.commit()
+
+    with engine.connect() as connection:
+        yield connection
+
+
+def _exported_scores(directory: Path) -> list[tuple[int, int]]:
+    rows = read_pkm_export("sport_games", directory).to_table().to_pylist()
+    return sorted((row["season"], row["home_team_score"]) for row in rows)
+
+
+def test_export_drops_deleted_rows_and_survives_vacuum(connection: Connection, tmp_path: Path) -> None:
+    directory = tmp_path / "export"
+    export_pkm(connection, logger, directory)
+    assert _exported_scores(directory) == [(2023, 100), (2023, 101), (2024, 102)]
+    untouched = directory / "sport_games" / "sport=NBA" / "season=2024" / "data.parquet"
+    untouched_mtime = untouched.stat().st_mtime_ns
+
+    # Deleting a row and vacuuming renumbers the rest, and the next insert may reuse a rowid
+    connection.execute(text("DELETE FROM sport_games WHERE home_team_score = 100"))
+    connection.commit()
+    connection.execute(text("VACUUM"))
+    connection.execute(
+        text(
+            """\
+INSERT INTO sport_games (id, home_team_id, away_team_id, home_team_score, away_team_score, start_time, end_time)
+SELECT 'new-game', home_team_id, away_team_id, 103, 90, '2023-11-03 00:00:00.000000', '2023-11-03 00:00:00.000000'
+FROM sport_games LIMIT 1"""
+        )
+    )
+    connection.commit()
+
+    manifest = export_pkm(connection, logger, directory)
+
+    assert _exported_scores(directory) == [(2023, 101), (2023, 103), (2024, 102)]
+    assert manifest.tables["sport_games"].rows == 3
+    assert untouched.stat().st_mtime_ns == untouched_mtime
+
+
+def test_export_removes_partitions_without_rows(connection: Connection, tmp_path: Path) -> None:
+    directory = tmp_path / "export"
+    export_pkm(connection, logger, directory)
+
+    connection.execute(text("DELETE FROM sport_games WHERE start_time >= '2024-01-01'"))
+    connection.commit()
+    export_pkm(connection, logger, directory)
+
+    assert not (directory / "sport_games" / "sport=NBA" / "season=2024").exists()
+    assert _exported_scores(directory) == [(2023, 100), (2023, 101)]
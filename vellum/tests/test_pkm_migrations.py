@@ -0,0 +1,48 @@
+import logging
+import sqlite3
+from pathlib import Path
+import pytest
+from sqlalchemy import text
+from services.database import get_sqlite_engine
+from services.pkm_migrations import PKM_MIGRATIONS, PkmSchemaOutOfDateError, migrate_pkm
+
+logger = logging.getLogger(__name__)
+
+
+def _create_pre_migration_db(path: Path) -> None:
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE sport_teams (id INTEGER PRIMARY KEY, sport VARCHAR, location VARCHAR, name VARCHAR, espn_id VARCHAR)"
+    )
+    connection.execute("INSERT INTO sport_teams (sport, location, name) VALUES ('NBA', 'Boston', 'Celtics')")
+    connection.commit()
+    connection.close()
+
+
+@pytest.mark.parametrize("read_only", [True, False])
+def test_engines_refuse_a_database_behind_the_models(tmp_path: Path, read_only: bool) -> None:
+    db_path = tmp_path / "pkm.db"
+    _create_pre_migration_db(db_path)
+
+    with pytest.raises(PkmSchemaOutOfDateError):
+        get_sqlite_engine(read_only=read_only, path=db_path)
+
+    # Creating the engine changed nothing
+    connection = sqlite3.connect(db_path)
+    tables = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    connection.close()
+    assert tables == {"sport_teams"}
+
+
+def test_engines_open_the_database_once_it_is_migrated(tmp_path: Path) -> None:
+    db_path = tmp_path / "pkm.db"
+    _create_pre_migration_db(db_path)
+
+    with get_sqlite_engine(path=db_path, check_schema=False).connect() as connection:
+        migrate_pkm(connection, logger)
+        versions = connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars().all()
+        full_names = connection.execute(text("SELECT full_name FROM sport_teams")).scalars().all()
+
+    assert versions == [migration.version for migration in PKM_MIGRATIONS]
+    assert full_names == ["Boston Celtics"]
+    get_sqlite_engine(read_only=True, path=db_path)
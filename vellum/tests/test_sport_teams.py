@@ -0,0 +1,38 @@
+import pytest
+from models.pkm.sport_team import SportTeam
+from models.types import Sport
+from services.sport_teams import TeamIndex
+
+
+@pytest.fixture
+def team_index() -> TeamIndex:
+    return TeamIndex(
+        [
+            SportTeam(location="Los Angeles", name="Clippers", sport=Sport.NBA, espn_id="12"),
+            SportTeam(location="Boston", name="Celtics", sport=Sport.NBA, espn_id="2"),
+            SportTeam(location="Mount St. Mary's", name="Mountaineers", sport=Sport.NCAAB, espn_id="116"),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "sport, full_name, espn_id",
+    [
+        (Sport.NBA, "Boston Celtics", "2"),
+        (Sport.NBA, "boston  CELTICS", "2"),
+        (Sport.NBA, "LA Clippers", "12"),
+        (Sport.NBA, "la clippers", "12"),
+        (Sport.NCAAB, "Mt. St. Mary's Mountaineers", "116"),
+        (Sport.NCAAB, "mt. st. mary's mountaineers", "116"),
+    ],
+)
+def test_full_names_match_ignoring_case_spacing_and_aliases(
+    team_index: TeamIndex, sport: Sport, full_name: str, espn_id: str
+) -> None:
+    team = team_index.by_full_name(sport, full_name)
+    assert team is not None and team.espn_id == espn_id
+
+
+def test_full_name_lookup_is_scoped_to_the_sport(team_index: TeamIndex) -> None:
+    assert team_index.by_full_name(Sport.NCAAB, "Boston Celtics") is None
+    assert team_index.by_full_name(Sport.NBA, "Boston Celtic") is None
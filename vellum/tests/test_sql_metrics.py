@@ -0,0 +1,61 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import pytest
+from sqlalchemy import text
+from vellum.workflows import BaseWorkflow
+from vellum.workflows.inputs import BaseInputs
+from vellum.workflows.nodes import BaseNode
+from vellum.workflows.state import BaseState
+from services import sql_metrics
+from services.database import get_sqlite_engine
+from services.sql_metrics import get_query_report
+
+
+class Inputs(BaseInputs):
+    db_path: str
+
+
+class QueryNode(BaseNode):
+    db_path = Inputs.db_path
+
+    def run(self) -> BaseNode.Outputs:
+        with get_sqlite_engine(path=Path(self.db_path)).begin() as connection:
+            connection.execute(text("CREATE TABLE IF NOT EXISTS numbers (value INTEGER)"))
+            connection.execute(text("INSERT INTO numbers VALUES (1), (2), (3)"))
+            connection.execute(text("SELECT value FROM numbers")).all()
+        return self.Outputs()
+
+
+class QueryWorkflow(BaseWorkflow[Inputs, BaseState]):
+    graph = QueryNode
+
+
+def _run(db_path: Path) -> str:
+    # Created up front so the engine's schema check isn't counted against the node
+    get_sqlite_engine(path=db_path)
+    final_event = QueryWorkflow().run(inputs=Inputs(db_path=str(db_path)))
+    assert final_event.name == "workflow.execution.fulfilled"
+    return str(final_event.trace_id)
+
+
+def test_report_counts_rows_selected_from_sqlite(pkm_db: Path) -> None:
+    trace_id = _run(pkm_db)
+
+    report = get_query_report(trace_id)
+
+    (node,) = [node for node in report.nodes if node.node == "QueryNode"]
+    assert node.queries == 3
+    # 3 inserted plus 3 fetched, although SQLite reports a rowcount of -1 for the SELECT
+    assert node.rows == 6
+
+
+def test_unreported_traces_are_dropped_oldest_first(pkm_db: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(sql_metrics, "MAX_TRACKED_TRACES", 2)
+    # Workflows run on one thread share its trace, so give each run its own thread
+    trace_ids = []
+    for _ in range(3):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            trace_ids.append(executor.submit(_run, pkm_db).result())
+
+    assert get_query_report(trace_ids[0]).queries == 0
+    assert all(get_query_report(trace_id).queries for trace_id in trace_ids[1:])
@@ -0,0 +1,61 @@
+import runpy
+import sqlite3
+import sys
+from pathlib import Path
+import pytest
+
+
+def _create_db_with_duplicates(path: Path) -> None:
+    """A pkm.db from before migration 1, holding three copies of one game and one other game"""
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE sport_games (id VARCHAR PRIMARY KEY, home_team_id VARCHAR, away_team_id VARCHAR, "
+        "home_team_score INTEGER, away_team_score INTEGER, start_time DATETIME, end_time DATETIME)"
+    )
+    connection.executemany(
+        "INSERT INTO sport_games VALUES (?, 'home', 'away', 100, 90, ?, ?)",
+        [
+            ("1", "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+            ("2", "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+            ("3", "2024-01-01 00:00:00", "2024-01-01 00:00:00"),
+            ("4", "2024-01-02 00:00:00", "2024-01-02 00:00:00"),
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+def _game_ids(path: Path) -> list[str]:
+    connection = sqlite3.connect(path)
+    ids = [row[0] for row in connection.execute("SELECT id FROM sport_games ORDER BY id")]
+    connection.close()
+    return ids
+
+
+def _run_script(monkeypatch: pytest.MonkeyPatch, *args: str) -> None:
+    monkeypatch.setattr(sys, "argv", ["uniq_sport_games.py", *args])
+    runpy.run_module("scripts.uniq_sport_games", run_name="__main__")
+
+
+def test_dry_run_counts_duplicates_without_deleting_them(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    db_path = tmp_path / "pkm.db"
+    _create_db_with_duplicates(db_path)
+
+    _run_script(monkeypatch, "--dry-run", "--db", str(db_path))
+
+    assert capsys.readouterr().out.strip() == "Found 2 duplicate games in 1 groups"
+    assert _game_ids(db_path) == ["1", "2", "3", "4"]
+
+
+def test_run_keeps_the_first_copy_of_each_game(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    db_path = tmp_path / "pkm.db"
+    _create_db_with_duplicates(db_path)
+
+    _run_script(monkeypatch, "--db", str(db_path))
+
+    assert capsys.readouterr().out.strip() == "Deleted 2 duplicate games in 1 groups"
+    assert _game_ids(db_path) == ["1", "4"]
@@ -0,0 +1,100 @@
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import Any, List
+import pytest
+import requests_mock
+from vellum.workflows.state.context import WorkflowContext
+from fake_s3 import FakeS3, FakeS3Object
+from services.aws import generate_s3_key
+from services.webpages import CachedWebpage, WebpageCache, get_webpage_ttl, url_hash
+from workflows.triage_message.nodes import lookup_url_node
+from workflows.triage_message.nodes.lookup_url_node import LookupUrlNode
+from workflows.triage_message.nodes.parse_function_call_node import ParseFunctionCallNode
+from workflows.triage_message.state import State
+
+URL = "https://example.com/about"
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> WebpageCache:
+    return WebpageCache(directory=tmp_path / "webpages")
+
+
+def _page(url: str = URL, age: timedelta = timedelta(0), summary: str = "An example page") -> CachedWebpage:
+    return CachedWebpage(url=url, content="Example content", summary=summary, fetched_at=datetime.now(UTC) - age)
+
+
+@pytest.mark.parametrize(
+    "url, ttl",
+    [
+        ("https://en.wikipedia.org/wiki/Python", timedelta(days=30)),
+        ("https://wikipedia.org/", timedelta(days=30)),
+        ("https://news.ycombinator.com/item?id=1", timedelta(hours=1)),
+        ("https://gist.github.com/someone", timedelta(days=1)),
+        ("https://notgithub.com/", timedelta(days=7)),
+        ("https://example.com/", timedelta(days=7)),
+    ],
+)
+def test_freshness_rules_match_domains_and_their_subdomains(url: str, ttl: timedelta) -> None:
+    assert get_webpage_ttl(url) == ttl
+
+
+def test_expired_pages_are_missed(cache: WebpageCache, s3: FakeS3) -> None:
+    wiki_url = "https://en.wikipedia.org/wiki/Python"
+    cache.put(_page(age=timedelta(days=8)))
+    cache.put(_page(wiki_url, age=timedelta(days=8)))
+
+    assert cache.get(URL) is None
+    page = cache.get(wiki_url)
+    assert page is not None and page.url == wiki_url
+
+
+def test_s3_hits_are_copied_to_disk(cache: WebpageCache, s3: FakeS3) -> None:
+    key = generate_s3_key(f"webpages/{url_hash(URL)}.json")
+    s3.objects[key] = FakeS3Object(_page().model_dump_json().encode())
+
+    page = cache.get(URL)
+
+    assert page is not None and page.summary == "An example page"
+    assert (cache.directory / f"{url_hash(URL)}.json").exists()
+    # Served from disk from now on
+    del s3.objects[key]
+    assert cache.get(URL) is not None
+
+
+def test_page_stored_under_a_colliding_hash_is_not_served(cache: WebpageCache, s3: FakeS3) -> None:
+    cache.directory.mkdir(parents=True)
+    (cache.directory / f"{url_hash(URL)}.json").write_text(_page("https://example.org/").model_dump_json())
+
+    assert cache.get(URL) is None
+
+
+class RecordingVellumClient:
+    """Stands in for the Vellum API client, recording every prompt the node runs"""
+
+    def __init__(self) -> None:
+        self.calls: List[str] = []
+
+    @property
+    def ad_hoc(self) -> Any:
+        self.calls.append("ad_hoc")
+        raise RuntimeError("The LLM was called")
+
+
+def test_fresh_summary_is_served_without_fetching_or_summarizing(
+    cache: WebpageCache, s3: FakeS3, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(lookup_url_node, "webpage_cache", cache)
+    cache.put(_page())
+    state = State()
+    state.meta.node_outputs[ParseFunctionCallNode.Outputs.parameters] = {"url": URL}
+    vellum_client = RecordingVellumClient()
+    node = LookupUrlNode(state=state, context=WorkflowContext(vellum_client=vellum_client))  # type: ignore[arg-type]
+
+    with requests_mock.Mocker() as mocker:
+        mocker.get(URL, text="<p>Changed content</p>", headers={"Content-Type": "text/html"})
+        outputs = node.run()
+
+    assert outputs.summary == "An example page"
+    assert not mocker.called
+    assert vellum_client.calls == []
@@ -5,16 +5,19 @@ import logging
 from math import floor
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Literal, Optional, Tuple, TypedDict
+from typing import Any, Dict, List, Literal, Tuple, TypedDict
 import requests
 from sqlalchemy.orm import aliased
-from sqlmodel import or_, select
+from sqlmodel import select
 from models.pkm.sport_game import SportGame
 from models.pkm.sport_team import SportTeam
 from models.types import USER, Sport, SportBroker
 from services import backup_memory, fetch_scoreboard_on_date, get_sport_team_by_full_name, normalize_espn_team_name, sqlite_session
 from services.constants import MEMORY_DIR
+from services.espn import ESPN_SCOREBOARDS, fetch_espn_json
+from services.sport_predictions import RecencyParams, RecentGames, get_recent_games, score_games
 from services.aws import send_email
+from services.bet_settlement import CompletedGame, SpreadBet, settle_bets
 from services.google_sheets import get_spreadsheets, prepend_rows
 from services import to_dollar_float
 from vellum.workflows.state.encoder import DefaultStateEncoder
@@ -60,35 +63,27 @@ class RecordYesterdaysGames(BaseNode):
                 yesterday_recap=f"No bets submitted yesterday. Your balance is ${initial_balance}.",
             )
 
-        with sqlite_session() as session:
+        with sqlite_session(read_only=True) as session:
             HomeTeam = aliased(SportTeam, name="home_team")
             AwayTeam = aliased(SportTeam, name="away_team")
             statement = select(  # type: ignore
                 SportGame.away_team_score,
                 SportGame.home_team_score,
-                AwayTeam.location.label("away_team_location"),  # type: ignore
-                AwayTeam.name.label("away_team_name"),  # type: ignore
-                HomeTeam.location.label("home_team_location"),  # type: ignore
-                HomeTeam.name.label("home_team_name"),  # type: ignore
+                AwayTeam.full_name.label("away_team"),  # type: ignore
+                HomeTeam.full_name.label("home_team"),  # type: ignore
                 HomeTeam.sport,
             ).join(
                 AwayTeam, 
                 SportGame.away_team_id == AwayTeam.id,  # type: ignore
-                isouter=True
             ).join(
                 HomeTeam,
                 SportGame.home_team_id == HomeTeam.id,  # type: ignore
-                isouter=True
             ).where(
                 SportGame.start_time >= yesterday - timedelta(days=1),  # type: ignore
             ).order_by(SportGame.start_time.desc())  # type: ignore
-            games = session.exec(statement).all()
+            games = [CompletedGame.model_validate(game._mapping) for game in session.exec(statement).all()]
 
-        winnings = []
-        total_wager = 0.0
-        range_min: Optional[int] = None
-        range_max: Optional[int] = None
-        sports_records: Dict[Sport, Tuple[int, int, int]] = {}
+        bets: List[SpreadBet] = []
         yesterday_broker = SportBroker.HARDROCKBET
         for index, row in yesterday_games:
             if "COVERS" not in row[6]:
@@ -96,52 +91,35 @@ class RecordYesterdaysGames(BaseNode):
 
             # TODO: should be winnings by broker
             yesterday_broker = SportBroker(row[8])
+            pick, opponent = row[6].split(" COVERS ")
+            bets.append(
+                SpreadBet(
+                    row=index + 2,
+                    sport=Sport(row[4]),
+                    pick=pick,
+                    opponent=opponent,
+                    spread=float(row[5].split(" ")[1]),
+                    odds=int(row[2]),
+                    wager=to_dollar_float(row[1]),
+                )
+            )
 
-            if range_min is None or index + 2 < range_min:
-                range_min = index + 2
-            if range_max is None or index + 2 > range_max:
-                range_max = index + 2
-
-            picks = row[6].split(" COVERS ")
-            selected_winner = picks[0]
-            selected_spread = float(row[5].split(" ")[1])
-            sport = Sport(row[4])
-            odds = int(row[2])
-            wager = to_dollar_float(row[1])
-            total_wager = round(total_wager + wager, 2)
-            
-            recent_game = next((game for game in games if game.sport == sport and f"{game.home_team_location} {game.home_team_name}" in picks and f"{game.away_team_location} {game.away_team_name}" in picks), None)
-            if not recent_game:
-                logger.exception(f"Failed to find recent game for {picks} in {sport}. Treating as a void...")
-                winnings.append([wager])
+        settled_bets = settle_bets(bets, games)
+        winnings = [[settled.winnings] for settled in settled_bets]
+        total_wager = round(sum(bet.wager for bet in bets), 2)
+        range_min = min((bet.row for bet in bets), default=None)
+        range_max = max((bet.row for bet in bets), default=None)
+        sports_records: Dict[Sport, Tuple[int, int, int]] = {}
+        for settled in settled_bets:
+            if settled.result == "void":
+                logger.error(f"Failed to find recent game for {settled.bet.pick} COVERS {settled.bet.opponent} in {settled.bet.sport}. Treating as a void...")
                 continue
-            did_win = False
-            did_tie = False
-            home_team = f"{recent_game.home_team_location} {recent_game.home_team_name}"
-            away_team = f"{recent_game.away_team_location} {recent_game.away_team_name}"
-
-            if selected_winner == home_team:
-                did_win = recent_game.home_team_score + selected_spread > recent_game.away_team_score
-                did_tie = recent_game.home_team_score + selected_spread == recent_game.away_team_score
-            elif selected_winner == away_team:
-                did_win = recent_game.away_team_score + selected_spread > recent_game.home_team_score
-                did_tie = recent_game.away_team_score + selected_spread == recent_game.home_team_score
-            else:
-                raise ValueError(f"Selected winner {selected_winner} not found in game {away_team} @ {home_team}")
-
-            sport_record = sports_records.get(sport, (0, 0, 0))
-            if did_tie:
-                winnings.append([wager])
-                sports_records[sport] = (sport_record[0], sport_record[1], sport_record[2] + 1)
-            elif did_win:
-                delta = (wager * 100 / -odds) if odds < 0 else (wager * odds / 100)
-                winning = round(wager + delta, 2)
-                winnings.append([winning])
-                sports_records[sport] = (sport_record[0] + 1, sport_record[1], sport_record[2])
-            else:
-                winnings.append([0])
-                sports_records[sport] = (sport_record[0], sport_record[1]+ 1, sport_record[2])
-
+            wins, losses, pushes = sports_records.get(settled.bet.sport, (0, 0, 0))
+            sports_records[settled.bet.sport] = (
+                wins + (settled.result == "win"),
+                losses + (settled.result == "loss"),
+                pushes + (settled.result == "push"),
+            )
 
         range_name = f"Bets!D{range_min}:D{range_max}"
         total_winnings = sum([w[0] for w in winnings])
@@ -268,20 +246,16 @@ class GatherTodaysGames(BaseNode):
         odds: List[TodaysGame]
 
     def run(self) -> Outputs:
-        ncaab_top_25_url = "http://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/rankings"
-        ncaab_top_25_response = requests.get(ncaab_top_25_url)
-        ncaab_top_25_response.raise_for_status()
-        ncaab_top_25_data = ncaab_top_25_response.json()
+        ncaab_top_25_url = "https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/rankings"
+        ncaab_top_25_data = fetch_espn_json(ncaab_top_25_url)
         poll = next((poll for poll in ncaab_top_25_data["rankings"] if poll["shortName"] == "AP Poll"), None)
         if not poll:
             raise ValueError("AP Poll not found")
         
         ncaab_top_25 = {normalize_espn_team_name(rank) for rank in poll['ranks']}
 
-        ncaab_today_url = "https://site.api.espn.com/apis/site/v2/sports/basketball/mens-college-basketball/scoreboard"
-        ncaab_today_response = requests.get(ncaab_today_url)
-        ncaab_today_response.raise_for_status()
-        ncaab_today_data = ncaab_today_response.json()
+        ncaab_today_url, _ = ESPN_SCOREBOARDS[Sport.NCAAB]
+        ncaab_today_data = fetch_espn_json(ncaab_today_url)
 
         is_neutral: Dict[str, bool] = {}
         ncaab_game_map = {}
@@ -389,50 +363,47 @@ class PredictOutcomes(BaseNode):
         outcomes: List[PredictedOutcome]
 
     def run(self):
-        outcomes = []
-        for game in self.games:
-            home_team_last_5_games = self._get_team_last_5_games(game.home_team)
-            away_team_last_5_games = self._get_team_last_5_games(game.away_team)
-
-            home_multiplier = 1.0 if game.is_neutral else 1.1
-            away_multiplier = 1.0 if game.is_neutral else 0.9
-            home_recency_score = sum(game.score_diff * (0.9 if game.was_home else 1.1) for game in home_team_last_5_games) * home_multiplier
-            away_recency_score = sum(game.score_diff * (0.9 if not game.was_home else 1.1) for game in away_team_last_5_games) * away_multiplier
-
-            calculated_spread = (away_recency_score - home_recency_score) / 5
-            outcome = "home" if calculated_spread < game.spread else "away"
-            confidence = abs(calculated_spread - game.spread)
-
-            outcomes.append(
-                PredictedOutcome(
-                    game=game,
-                    outcome=outcome,
-                    confidence=confidence,
-                    reasoning=PredictedOutcomeReasoning(
-                        home_team_last_5_games=home_team_last_5_games,
-                        away_team_last_5_games=away_team_last_5_games,
-                        home_team_recency_score=home_recency_score,
-                        away_team_recency_score=away_recency_score,
-                        calculated_spread=calculated_spread,
-                    ),
-                )
+        if not self.games:
+            return self.Outputs(outcomes=[])
+
+        params = RecencyParams()
+        with sqlite_session(read_only=True) as session:
+            recent_games = get_recent_games(
+                session,
+                [team.id for game in self.games for team in (game.home_team, game.away_team)],
+                params.window,
             )
+        scores = score_games(
+            recent_games,
+            home_team_ids=[game.home_team.id for game in self.games],
+            away_team_ids=[game.away_team.id for game in self.games],
+            is_neutral=[game.is_neutral for game in self.games],
+            spreads=[game.spread for game in self.games],
+            params=params,
+        )
+
+        outcomes = [
+            PredictedOutcome(
+                game=game,
+                outcome="home" if scores.picks_home[index] else "away",
+                confidence=float(scores.confidences[index]),
+                reasoning=PredictedOutcomeReasoning(
+                    home_team_last_5_games=self._get_team_recent_games(recent_games, game.home_team),
+                    away_team_last_5_games=self._get_team_recent_games(recent_games, game.away_team),
+                    home_team_recency_score=float(scores.home_recency_scores[index]),
+                    away_team_recency_score=float(scores.away_recency_scores[index]),
+                    calculated_spread=float(scores.calculated_spreads[index]),
+                ),
+            )
+            for index, game in enumerate(self.games)
+        ]
 
         return self.Outputs(outcomes=sorted(outcomes, key=lambda x: x.confidence, reverse=True))
-    
-    def _get_team_last_5_games(self, team: SportTeam) -> List[TeamRecentGame]:
-        with sqlite_session() as session:
-            statement = select(SportGame).where(
-                or_(SportGame.home_team_id == team.id, SportGame.away_team_id == team.id),
-            ).order_by(SportGame.start_time.desc()).limit(5)  # type: ignore
-            sport_games = session.exec(statement).all()
-        
+
+    def _get_team_recent_games(self, recent_games: RecentGames, team: SportTeam) -> List[TeamRecentGame]:
         return [
-            TeamRecentGame(
-                score_diff=game.home_team_score - game.away_team_score if game.home_team_id == team.id else game.away_team_score - game.home_team_score,
-                was_home=game.home_team_id == team.id,
-            )
-            for game in sport_games
+            TeamRecentGame(score_diff=score_diff, was_home=was_home)
+            for score_diff, was_home in recent_games.games(team.id)
         ]
 
 
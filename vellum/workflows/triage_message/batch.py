@@ -0,0 +1,109 @@
+import itertools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from uuid import UUID
+from vellum.client.core.pydantic_utilities import UniversalBaseModel
+from services import ActionRecord, postgres_session
+from services.inbox import abandon_inbox_message_lease, claim_next_unread_message, get_worker_id
+from services.sql_metrics import QueryReport, get_query_report
+from .state import State
+from .workflow import TriageMessageWorkflow
+
+logger = logging.getLogger(__name__)
+
+
+class TriageBatchResult(UniversalBaseModel):
+    message_id: UUID
+    fulfilled: bool
+    summary: Optional[str] = None
+    message_url: Optional[str] = None
+    error: Optional[str] = None
+    action_history: List[ActionRecord] = []
+    query_report: Optional[QueryReport] = None
+
+
+def _abandon_lease(message_id: UUID, worker_id: str) -> None:
+    try:
+        with postgres_session() as session:
+            abandon_inbox_message_lease(session, message_id, worker_id)
+            session.commit()
+    except Exception:
+        # The lease still runs out on its own, it just takes longer to be retried
+        logger.exception(f"Failed to expire the lease on message {message_id}")
+
+
+def _triage_claimed_message(message_id: UUID, worker_id: str) -> TriageBatchResult:
+    state = State(action_history=[], claimed_message_id=message_id, lease_owner=worker_id)
+    try:
+        final_event = TriageMessageWorkflow().run(state=state)
+    except Exception as e:
+        logger.exception(f"Triage crashed for message {message_id}")
+        _abandon_lease(message_id, worker_id)
+        return TriageBatchResult(message_id=message_id, fulfilled=False, error=str(e))
+
+    # Each run gets its own trace, so its SQL metrics never mix with concurrent runs
+    query_report = get_query_report(str(final_event.trace_id))
+
+    if final_event.name != "workflow.execution.fulfilled":
+        _abandon_lease(message_id, worker_id)
+        error = getattr(final_event, "error", None)
+        return TriageBatchResult(
+            message_id=message_id,
+            fulfilled=False,
+            error=error.message if error else final_event.name,
+            action_history=state.action_history,
+            query_report=query_report,
+        )
+
+    final_state = final_event.final_state
+    return TriageBatchResult(
+        message_id=message_id,
+        fulfilled=True,
+        summary=final_event.outputs.summary,
+        message_url=final_event.outputs.message_url,
+        action_history=final_state.action_history if isinstance(final_state, State) else state.action_history,
+        query_report=query_report,
+    )
+
+
+def run_triage_batch(limit: int = 10, max_workers: int = 4) -> List[TriageBatchResult]:
+    """
+    Triage up to `limit` unread messages, at most `max_workers` at a time.
+
+    Each worker claims its next message only once it is free to triage it, so a lease starts
+    when triage does and never runs out while the message waits its turn. Each message runs
+    through its own TriageMessageWorkflow with its own State, so action histories never mix.
+    A message whose run fails has its lease expired right away, so the next claim retries it
+    until it runs out of attempts and is marked FAILED.
+
+    Args:
+        limit: Maximum number of messages to triage in this batch
+        max_workers: Maximum number of workflows running at once
+
+    Returns:
+        One result per claimed message, in claim order
+    """
+    # next() on a count is atomic, so workers never take the same claim slot
+    claim_slots = itertools.count()
+    results: Dict[int, TriageBatchResult] = {}
+
+    def drain(worker: int) -> None:
+        worker_id = f"{get_worker_id()}:{worker}"
+        while (slot := next(claim_slots)) < limit:
+            with postgres_session() as session:
+                claimed = claim_next_unread_message(session, worker_id=worker_id)
+            if not claimed:
+                return
+            inbox_message, _, _, _ = claimed
+            results[slot] = _triage_claimed_message(inbox_message.id, worker_id)
+
+    workers = max(1, min(max_workers, limit))
+    logger.info(f"Triaging up to {limit} messages with {workers} workers")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(drain, worker) for worker in range(workers)]:
+            future.result()
+
+    if not results:
+        logger.info("No unread messages to triage")
+    return [results[slot] for slot in sorted(results)]
@@ -4,8 +4,7 @@ from typing import Optional
 from vellum.workflows.nodes import BaseNode
 from services import ActionRecord, postgres_session
 from models.job import Job
-from models.contact import Contact
-from sqlmodel import select
+from services.contacts import get_contact
 from .read_message_node import ReadMessageNode
 from .triage_message_node import TriageMessageNode
 
@@ -24,12 +23,11 @@ class CreateProjectNode(BaseNode):
     def run(self) -> Outputs:
         try:
             contact_identifier = "contact"
+            contact = get_contact(self.contact_id)
+            if contact:
+                contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
+
             with postgres_session() as session:
-                statement = select(Contact).where(Contact.id == self.contact_id)
-                contact = session.exec(statement).first()
-                if contact:
-                    contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
-                
                 external_url: Optional[str] = self.spec_url if self.spec_url else None
                 
                 job = Job(
@@ -4,8 +4,7 @@ from vellum.workflows.nodes import BaseNode
 from services import ActionRecord, postgres_session
 from services.github_auth import get_github_auth_headers, GitHubAppAuthError
 from models.job import Job
-from models.contact import Contact
-from sqlmodel import select
+from services.contacts import get_contact
 from .read_message_node import ReadMessageNode
 from .triage_message_node import TriageMessageNode
 import requests
@@ -59,12 +58,11 @@ class CreateTicketNode(BaseNode):
             issue_number = issue_data["number"]
             
             contact_identifier = "contact"
+            contact = get_contact(self.contact_id)
+            if contact:
+                contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
+
             with postgres_session() as session:
-                statement = select(Contact).where(Contact.id == self.contact_id)
-                contact = session.exec(statement).first()
-                if contact:
-                    contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
-                
                 job = Job(
                     name=f"Ticket #{issue_number}: {self.title}",
                     description=self.body,
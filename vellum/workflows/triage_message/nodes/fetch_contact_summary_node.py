@@ -1,41 +1,47 @@
+import logging
 from typing import List, Optional
 from vellum.workflows.nodes import BaseNode
-from services.aws import get_aws_session, generate_s3_key
-from services.constants import S3_MEMORY_BUCKET
+from vellum.workflows.ports import Port
+from vellum.workflows.references import LazyReference
+from services.contact_summaries import get_contact_summary
 from .read_message_node import ReadMessageNode
 
+logger = logging.getLogger(__name__)
+
 
 class FetchContactSummaryNode(BaseNode):
     message = ReadMessageNode.Outputs.message
 
+    class Ports(BaseNode.Ports):
+        # The update is written from the existing summary, so without it the summary is left as is
+        # rather than rewritten from this one message and uploaded over its history
+        update = Port.on_if(
+            LazyReference(lambda: FetchContactSummaryNode.Outputs.summary_unavailable.equals(False))  # type: ignore
+        )
+        unavailable = Port.on_else()
+
     class Outputs(BaseNode.Outputs):
         current_summary: Optional[str]
+        # Whether the summary couldn't be fetched, as opposed to the contact not having one yet
+        summary_unavailable: bool
         contact_id: str
         repos: List[str]
 
     def run(self) -> Outputs:
         contact_id = str(self.message.contact_id)
         current_summary: Optional[str] = None
+        summary_unavailable = False
         repos: List[str] = list(self.message.repos)
         
         try:
-            session = get_aws_session()
-            s3_client = session.client("s3")
-            bucket_name = S3_MEMORY_BUCKET
-            
-            base_key = f"contacts/{contact_id}/summary.txt"
-            key = generate_s3_key(base_key)
-            
-            response = s3_client.get_object(Bucket=bucket_name, Key=key)
-            current_summary = response["Body"].read().decode("utf-8")
-            
-            del s3_client
-            del session
+            current_summary = get_contact_summary(contact_id)
         except Exception:
-            pass
+            logger.exception(f"Failed to fetch the summary of contact {contact_id}, leaving it unchanged")
+            summary_unavailable = True
         
         return self.Outputs(
             current_summary=current_summary,
+            summary_unavailable=summary_unavailable,
             contact_id=contact_id,
             repos=repos
         )
@@ -6,14 +6,9 @@ if TYPE_CHECKING:
 from uuid import UUID
 from vellum.workflows.nodes import BaseNode
 from services import postgres_session, ActionRecord
-from sqlmodel import select
+from services.inbox import DEFAULT_HISTORY_DEPTH, get_message_history, record_inbox_message_operations
 from models.inbox_message import InboxMessage
-from models.inbox_message_operation import InboxMessageOperation
 from models.types import InboxMessageOperationType
-from models.inbox import Inbox
-from models.outbox_message import OutboxMessage
-from models.outbox_message_recipient import OutboxMessageRecipient
-from models.contact import Contact
 from .read_message_node import ReadMessageNode
 from .parse_function_call_node import ParseFunctionCallNode
 
@@ -35,12 +30,21 @@ class GetMessageHistoryNode(BaseNode):
         except (AttributeError, KeyError):
             resolved_message_id = str(self.message_id)
         
-        args = {
+        try:
+            limit = int(self.parameters.get("limit") or DEFAULT_HISTORY_DEPTH)  # type: ignore[attr-defined]
+            before = self.parameters.get("before")  # type: ignore[attr-defined]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            limit = DEFAULT_HISTORY_DEPTH
+            before = None
+        
+        args: Dict[str, Any] = {
             "message_id": resolved_message_id,
         }
+        if before:
+            args["before"] = before
         
         try:
-            result = self._retrieve_message_history(resolved_message_id)
+            result = self._retrieve_message_history(resolved_message_id, limit, before)
         except Exception as e:
             logger.exception(f"Error retrieving message history: {str(e)}")
             result = f"Error retrieving message history: {str(e)}"
@@ -55,87 +59,35 @@ class GetMessageHistoryNode(BaseNode):
             self.state.action_history = []
         self.state.action_history.append(action_record)
     
-    def _retrieve_message_history(self, message_id_str: str) -> str:
-        """Retrieve the last 5 messages (incoming and outgoing) from the same contact"""
+    def _retrieve_message_history(self, message_id_str: str, limit: int, before: Optional[str]) -> str:
+        """Retrieve the latest messages (incoming and outgoing) from the same contact"""
         try:
             message_uuid = UUID(message_id_str)
             
             with postgres_session() as session:
-                current_message_stmt = select(InboxMessage).where(InboxMessage.id == message_uuid)
-                current_message = session.exec(current_message_stmt).one_or_none()
-                
-                if not current_message:
-                    return f"Message with ID {message_id_str} not found"
-                
-                current_contact_id = current_message.contact_id
-                
-                incoming_stmt = (
-                    select(InboxMessage, Inbox.name, Contact)
-                    .join(Inbox, Inbox.id == InboxMessage.inbox_id)  # type: ignore[arg-type]
-                    .join(Contact, Contact.id == InboxMessage.contact_id)  # type: ignore[arg-type]
-                    .where(InboxMessage.contact_id == current_contact_id)
-                    .where(InboxMessage.id != message_uuid)
-                    .order_by(InboxMessage.created_at.desc())  # type: ignore[attr-defined]
-                    .limit(5)
-                )
-                
-                incoming_results = session.exec(incoming_stmt).all()
-                
-                outgoing_stmt = (
-                    select(OutboxMessage)
-                    .join(OutboxMessageRecipient, OutboxMessageRecipient.message_id == OutboxMessage.id)  # type: ignore[arg-type]
-                    .where(OutboxMessageRecipient.contact_id == current_contact_id)
-                    .order_by(OutboxMessage.created_at.desc())  # type: ignore[attr-defined]
-                    .limit(5)
-                )
-                
-                outgoing_results = session.exec(outgoing_stmt).all()
-                
-                all_messages = []
+                page = get_message_history(session, message_uuid, limit=limit, before=before)
                 
-                for inbox_msg, inbox_name, contact in incoming_results:
-                    source = contact.identifier if hasattr(contact, 'identifier') else (
-                        contact.full_name or contact.email or contact.phone_number or contact.slack_display_name or "Contact"
-                    )
-                    all_messages.append({
-                        "timestamp": inbox_msg.created_at,
-                        "source": source,
-                        "channel": inbox_name,
-                        "body": inbox_msg.body,
-                        "message_id": inbox_msg.id,
-                        "is_incoming": True,
-                    })
-                
-                for outbox_msg in outgoing_results:
-                    all_messages.append({
-                        "timestamp": outbox_msg.created_at,
-                        "source": "VargasJR",
-                        "channel": str(outbox_msg.type),
-                        "body": outbox_msg.body,
-                        "message_id": outbox_msg.id,
-                        "is_incoming": False,
-                    })
-                
-                all_messages.sort(key=lambda x: x["timestamp"], reverse=True)
-                
-                last_5 = all_messages[:5]
+                if not page.entries:
+                    if not before and session.get(InboxMessage, message_uuid) is None:
+                        return f"Message with ID {message_id_str} not found"
+                    return "No previous messages found from this contact"
                 
-                # Mark any inbox messages in last_5 as read
+                # Mark any inbox messages in this page as read
                 inbox_message_ids_to_mark = [
-                    msg["message_id"]
-                    for msg in last_5
-                    if msg.get("is_incoming")
+                    entry.message_id
+                    for entry in page.entries
+                    if entry.is_incoming
                 ]
                 if inbox_message_ids_to_mark:
                     self._mark_messages_as_read(session, inbox_message_ids_to_mark)
                 
-                if not last_5:
-                    return "No previous messages found from this contact"
-                
                 history_lines = []
-                for msg in last_5:
-                    timestamp = msg["timestamp"].strftime("%Y-%m-%d %H:%M:%S")
-                    history_lines.append(f"[{timestamp}] from {msg['source']} via {msg['channel']}: {msg['body']}")
+                for entry in page.entries:
+                    timestamp = entry.created_at.strftime("%Y-%m-%d %H:%M:%S")
+                    history_lines.append(f"[{timestamp}] from {entry.source} via {entry.channel}: {entry.body}")
+                
+                if page.next_cursor:
+                    history_lines.append(f"Older messages available with before={page.next_cursor}")
                 
                 return "\n".join(history_lines)
                 
@@ -152,14 +104,11 @@ class GetMessageHistoryNode(BaseNode):
         
         execution_id = self.state.meta.span_id
         
-        for message_id in inbox_message_ids:
-            session.add(
-                InboxMessageOperation(
-                    inbox_message_id=message_id,
-                    operation=InboxMessageOperationType.READ,
-                    execution_id=execution_id,
-                )
-            )
-        
+        record_inbox_message_operations(
+            session,
+            inbox_message_ids,
+            InboxMessageOperationType.READ,
+            execution_id=execution_id,
+        )
         session.commit()
         logger.info(f"Marked {len(inbox_message_ids)} messages as read")
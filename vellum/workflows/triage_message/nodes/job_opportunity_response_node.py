@@ -5,7 +5,8 @@ from models.outbox_message import OutboxMessage
 from models.outbox_message_recipient import OutboxMessageRecipient
 from models.types import InboxType, OutboxRecipientType
 from models.inbox_message import InboxMessage
-from services import postgres_session, get_or_create_contact_id_by_email
+from services import postgres_session
+from services.contacts import resolve_contacts
 from services.aws import send_email, extract_original_message_id
 from sqlmodel import select
 from vellum.workflows.nodes import BaseNode
@@ -50,8 +51,9 @@ class JobOpportunityResponseNode(BaseNode):
             logger.exception("Failed to send job opportunity emails")
             return self.Outputs(summary=f"Failed to send job opportunity emails: {str(e)}")
 
-        to_contact_id = get_or_create_contact_id_by_email(self.original_recruiter_email)
-        bcc_contact_id = get_or_create_contact_id_by_email(self.forwarder_email)
+        contact_ids = resolve_contacts([("email", self.original_recruiter_email), ("email", self.forwarder_email)])
+        to_contact_id = contact_ids[("email", self.original_recruiter_email)]
+        bcc_contact_id = contact_ids[("email", self.forwarder_email)]
 
         outbox_message = OutboxMessage(
             parent_inbox_message_id=self.inbox_message_id,
@@ -1,53 +1,72 @@
-import hashlib
+import codecs
 import logging
 import re
+from datetime import datetime, UTC
 from html.parser import HTMLParser
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from vellum import ChatMessagePromptBlock, JinjaPromptBlock, PromptParameters
 from vellum.workflows.nodes import BaseNode
 import requests
 from services import ActionRecord
-from services.aws import get_aws_session, generate_s3_key
-from services.constants import S3_MEMORY_BUCKET
+from services.webpages import CachedWebpage, webpage_cache
 from .parse_function_call_node import ParseFunctionCallNode
 
 logger = logging.getLogger(__name__)
 
+FETCH_TIMEOUT = 30
+FETCH_CHUNK_SIZE = 16 * 1024
+# Downloads stop at whichever cap is reached first. Only this much text is ever summarized.
+FETCH_MAX_BYTES = 2 * 1024 * 1024
+FETCH_MAX_TEXT_CHARS = 10_000
+TEXT_CONTENT_TYPES = ("text/", "application/xhtml+xml", "application/xml")
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
 
 class LookupUrlNode(BaseNode):
     class _HTMLTextExtractor(HTMLParser):
-        def __init__(self) -> None:
+        """
+        Collects visible text, one run per stretch between tags. A run may arrive over several
+        feed() calls, so it is buffered and only has its whitespace collapsed once a tag ends it.
+        """
+
+        def __init__(self, max_chars: Optional[int] = None) -> None:
             super().__init__()
             self.text_parts: list[str] = []
-            self.skip_tags = {"script", "style", "head", "meta", "link", "noscript"}
+            self.pending_data: list[str] = []
+            self.skip_tags = {"script", "style", "head", "noscript"}
             self.current_skip_depth = 0
+            self.max_chars = max_chars
+            self.text_length = 0
 
         def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+            self._flush_data()
             if tag.lower() in self.skip_tags:
                 self.current_skip_depth += 1
 
         def handle_endtag(self, tag: str) -> None:
+            self._flush_data()
             if tag.lower() in self.skip_tags and self.current_skip_depth > 0:
                 self.current_skip_depth -= 1
 
         def handle_data(self, data: str) -> None:
-            if self.current_skip_depth == 0:
-                text = data.strip()
-                if text:
-                    self.text_parts.append(text)
+            if self.current_skip_depth == 0 and not self.is_full:
+                self.pending_data.append(data)
 
-        def get_text(self) -> str:
-            return " ".join(self.text_parts)
+        def _flush_data(self) -> None:
+            text = re.sub(r"\s+", " ", "".join(self.pending_data)).strip()
+            self.pending_data.clear()
+            if text:
+                self.text_parts.append(text)
+                self.text_length += len(text) + 1
 
-    def _extract_text_from_html(self, html: str) -> str:
-        parser = self._HTMLTextExtractor()
-        parser.feed(html)
-        text = parser.get_text()
-        text = re.sub(r"\s+", " ", text)
-        return text.strip()
+        @property
+        def is_full(self) -> bool:
+            return self.max_chars is not None and self.text_length >= self.max_chars
 
-    def _generate_url_hash(self, url: str) -> str:
-        return hashlib.sha256(url.encode()).hexdigest()[:16]
+        def get_text(self) -> str:
+            self._flush_data()
+            text = " ".join(self.text_parts)
+            return text[: self.max_chars] if self.max_chars is not None else text
 
     parameters = ParseFunctionCallNode.Outputs.parameters
 
@@ -68,12 +87,29 @@ class LookupUrlNode(BaseNode):
         args = {"url": url}
 
         try:
-            content = self._fetch_and_store_webpage(url)
-            if content.startswith("Error"):
-                self._append_action_history("lookup_url", args, content)
-                return self.Outputs(summary=content)
-
-            summary = self._generate_summary(url, content)
+            cached = webpage_cache.get(url)
+            if cached and cached.summary:
+                self._append_action_history("lookup_url", args, cached.summary)
+                return self.Outputs(summary=cached.summary)
+
+            if cached:
+                content = cached.content
+            else:
+                content = self._fetch_webpage(url)
+                if content.startswith("Error"):
+                    self._append_action_history("lookup_url", args, content)
+                    return self.Outputs(summary=content)
+
+            llm_summary = self._generate_llm_summary(url, content)
+            webpage_cache.put(
+                CachedWebpage(
+                    url=url,
+                    content=content,
+                    summary=llm_summary,
+                    fetched_at=cached.fetched_at if cached else datetime.now(UTC),
+                )
+            )
+            summary = llm_summary or self._generate_heuristic_summary(content)
             self._append_action_history("lookup_url", args, summary)
             return self.Outputs(summary=summary)
 
@@ -89,9 +125,9 @@ class LookupUrlNode(BaseNode):
             self.state.action_history = []
         self.state.action_history.append(action_record)
 
-    def _generate_summary(self, url: str, content: str) -> str:
+    def _generate_llm_summary(self, url: str, content: str) -> Optional[str]:
         try:
-            truncated_content = content[:10000]
+            truncated_content = content[:FETCH_MAX_TEXT_CHARS]
 
             response = self._context.vellum_client.ad_hoc.adhoc_execute_prompt(
                 ml_model="gpt-5.1",
@@ -120,20 +156,20 @@ Provide a 2-3 sentence summary of what this webpage is about.""",
             )
 
             if response.state != "FULFILLED":
-                return self._generate_heuristic_summary(content)
+                return None
 
             output = response.outputs[0]
             if not output:
-                return self._generate_heuristic_summary(content)
+                return None
 
             if output.type != "STRING" or not output.value:
-                return self._generate_heuristic_summary(content)
+                return None
 
             return output.value.strip()
 
         except Exception as e:
             logger.warning(f"Failed to generate LLM summary: {str(e)}, falling back to heuristic")
-            return self._generate_heuristic_summary(content)
+            return None
 
     def _generate_heuristic_summary(self, content: str) -> str:
         sentences = re.split(r"(?<=[.!?])\s+", content)
@@ -144,10 +180,9 @@ Provide a 2-3 sentence summary of what this webpage is about.""",
         return summary if summary else "Could not extract summary from webpage content."
 
     def _build_empty_content_error(
-        self, response: requests.Response, html_content: str
+        self, response: requests.Response, html_length: int, html_head: str = ""
     ) -> str:
         content_type = response.headers.get("Content-Type", "unknown")
-        html_length = len(html_content or "")
 
         note_parts = []
         if "text/html" not in content_type.lower():
@@ -171,54 +206,79 @@ Provide a 2-3 sentence summary of what this webpage is about.""",
         )
 
         if "text/html" in content_type.lower() and html_length > 0:
-            snippet = re.sub(r"\s+", " ", html_content[:200]).strip()
+            snippet = re.sub(r"\s+", " ", html_head[:200]).strip()
             error_message += f" Snippet: {snippet}"
 
         return error_message
 
-    def _fetch_and_store_webpage(self, url: str) -> str:
+    def _get_encoding(self, response: requests.Response, first_chunk: bytes) -> str:
+        """The charset from the Content-Type header, else a <meta> tag near the top of the page, else UTF-8"""
+        candidates = []
+        if "charset" in response.headers.get("Content-Type", "").lower() and response.encoding:
+            candidates.append(response.encoding)
+        match = _META_CHARSET.search(first_chunk[:4096])
+        if match:
+            candidates.append(match.group(1).decode("ascii", errors="ignore"))
+        for encoding in candidates:
+            try:
+                codecs.lookup(encoding)
+                return encoding
+            except LookupError:
+                continue
+        return "utf-8"
+
+    def _stream_webpage(self, response: requests.Response) -> str:
+        """
+        Extract visible text from a response while it downloads.
+
+        Decoded chunks are fed into the parser as they arrive, and the download stops once
+        FETCH_MAX_TEXT_CHARS of text is collected or FETCH_MAX_BYTES is read, so large pages
+        are never held in memory whole.
+        """
+        content_type = response.headers.get("Content-Type", "")
+        if content_type and not content_type.lower().startswith(TEXT_CONTENT_TYPES):
+            return self._build_empty_content_error(response, int(response.headers.get("Content-Length") or 0))
+
+        parser = self._HTMLTextExtractor(max_chars=FETCH_MAX_TEXT_CHARS)
+        decoder = None
+        bytes_read = 0
+        html_head = ""
+        for chunk in response.iter_content(chunk_size=FETCH_CHUNK_SIZE):
+            if not chunk:
+                continue
+            if decoder is None:
+                # Without a Content-Type, the first chunk is sniffed for binary content instead
+                if not content_type and b"\x00" in chunk[:1024]:
+                    return self._build_empty_content_error(response, len(chunk))
+                decoder = codecs.getincrementaldecoder(self._get_encoding(response, chunk))(errors="replace")
+
+            bytes_read += len(chunk)
+            html = decoder.decode(chunk)
+            if len(html_head) < 200:
+                html_head += html[: 200 - len(html_head)]
+            parser.feed(html)
+            if parser.is_full or bytes_read >= FETCH_MAX_BYTES:
+                break
+        else:
+            if decoder is not None:
+                parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+
+        text_content = parser.get_text()
+        if not text_content:
+            return self._build_empty_content_error(response, bytes_read, html_head)
+        return text_content
+
+    def _fetch_webpage(self, url: str) -> str:
         try:
             headers = {
                 "User-Agent": "Mozilla/5.0 (compatible; VargasJR/1.0; +https://vargasjr.dev)"
             }
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
-
-            html_content = response.text
-            text_content = self._extract_text_from_html(html_content)
-
-            if not text_content:
-                return self._build_empty_content_error(response, html_content)
-
-            url_hash = self._generate_url_hash(url)
-            self._store_in_s3(url_hash, url, text_content)
-
-            return text_content
+            with requests.get(url, headers=headers, timeout=FETCH_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                return self._stream_webpage(response)
 
         except requests.exceptions.Timeout:
-            return f"Error: Request timed out while fetching the webpage. Details: url={url}, timeout=30s"
+            return f"Error: Request timed out while fetching the webpage. Details: url={url}, timeout={FETCH_TIMEOUT}s"
         except requests.exceptions.RequestException as e:
             return f"Error fetching webpage: {str(e)}. Details: url={url}"
-
-    def _store_in_s3(self, url_hash: str, url: str, content: str) -> None:
-        try:
-            session = get_aws_session()
-            s3_client = session.client("s3")
-
-            storage_content = f"URL: {url}\n\n---\n\n{content}"
-
-            base_key = f"webpages/{url_hash}.txt"
-            key = generate_s3_key(base_key)
-
-            s3_client.put_object(
-                Bucket=S3_MEMORY_BUCKET,
-                Key=key,
-                Body=storage_content.encode("utf-8"),
-                ContentType="text/plain",
-            )
-
-            del s3_client
-            del session
-
-        except Exception as e:
-            logger.warning(f"Failed to store webpage in S3: {str(e)}")
@@ -1,10 +1,11 @@
 import logging
 from vellum.workflows.nodes import BaseNode
+from sqlalchemy import update
 from services import postgres_session, ActionRecord
+from services.contacts import get_contact, invalidate_contact
 from models.contact import Contact
 from models.types import ContactStatus
 from .read_message_node import ReadMessageNode
-from sqlmodel import select
 
 logger = logging.getLogger(__name__)
 
@@ -17,22 +18,22 @@ class MarkContactAsLeadNode(BaseNode):
     
     def run(self) -> Outputs:
         try:
-            with postgres_session() as session:
-                statement = select(Contact).where(Contact.id == self.contact_id)
-                contact = session.exec(statement).first()
-                
-                if not contact:
-                    result = f"Contact not found with ID: {self.contact_id}"
-                    self._append_action_history("mark_contact_as_lead", {}, result)
-                    return self.Outputs(summary=result)
-                
-                contact.status = ContactStatus.LEAD
-                session.add(contact)
-                session.commit()
-                
-                result = f"Successfully marked contact {contact.identifier} as LEAD"
+            contact = get_contact(self.contact_id)
+            if not contact:
+                result = f"Contact not found with ID: {self.contact_id}"
                 self._append_action_history("mark_contact_as_lead", {}, result)
                 return self.Outputs(summary=result)
+
+            with postgres_session() as session:
+                session.execute(
+                    update(Contact).where(Contact.id == contact.id).values(status=ContactStatus.LEAD)  # type: ignore[arg-type]
+                )
+                session.commit()
+            invalidate_contact(contact.id)
+
+            result = f"Successfully marked contact {contact.identifier} as LEAD"
+            self._append_action_history("mark_contact_as_lead", {}, result)
+            return self.Outputs(summary=result)
                 
         except Exception as e:
             logger.exception(f"Error marking contact as lead: {str(e)}")
@@ -1,11 +1,14 @@
+import logging
 from vellum.workflows.nodes import BaseNode
 from .read_message_node import ReadMessageNode
 from services import postgres_session
+from services.inbox import get_worker_id, record_inbox_message_operations, release_inbox_message_leases
 from models.inbox_message import InboxMessage
-from models.inbox_message_operation import InboxMessageOperation
 from models.types import InboxMessageOperationType, InboxType
 from sqlmodel import select
 
+logger = logging.getLogger(__name__)
+
 
 class NoActionNode(BaseNode):
     message = ReadMessageNode.Outputs.message
@@ -29,13 +32,19 @@ class NoActionNode(BaseNode):
                 return self.Outputs(summary="Message no longer exists - archived.", message_url=message_url)  # type: ignore
             
             execution_id = self.state.meta.span_id
-            
-            session.add(
-                InboxMessageOperation(
-                    inbox_message_id=self.message.message_id,
-                    operation=InboxMessageOperationType.ARCHIVED,
-                    execution_id=execution_id,
-                )
+            worker_id = getattr(self.state, "lease_owner", None) or get_worker_id()
+
+            # Another worker owns the message once our lease is gone, so leave archiving to it
+            if not release_inbox_message_leases(session, [self.message.message_id], worker_id):
+                logger.warning(f"Lease on message {self.message.message_id} expired before it was archived")
+                session.rollback()
+                return self.Outputs(summary="Message lease expired - left for retry.", message_url=message_url)  # type: ignore
+
+            record_inbox_message_operations(
+                session,
+                [self.message.message_id],
+                InboxMessageOperationType.ARCHIVED,
+                execution_id=execution_id,
             )
             session.commit()
         
@@ -5,14 +5,12 @@ from datetime import datetime
 import psycopg
 from sqlalchemy.exc import OperationalError as SQLAlchemyOperationalError
 from services import postgres_session
+from services.contacts import contact_cache
+from services.inbox import claim_next_unread_message, get_claimed_message, get_worker_id
 from vellum.workflows.nodes import BaseNode
-from sqlmodel import select, or_, func
+from sqlmodel import select
 from vellum.client.core.pydantic_utilities import UniversalBaseModel
-from models.inbox_message import InboxMessage
-from models.inbox_message_operation import InboxMessageOperation
-from models.types import InboxMessageOperationType, InboxType, ContactStatus
-from models.inbox import Inbox
-from models.contact import Contact
+from models.types import InboxType, ContactStatus
 from models.contact_github_repo import ContactGithubRepo
 from models.job import Job, JobStatus
 from vellum.workflows.ports import Port
@@ -46,6 +44,23 @@ class SlimJob(UniversalBaseModel):
     contact_id: Optional[UUID] = None
 
 
+def _no_message() -> SlimMessage:
+    return SlimMessage(
+        message_id=uuid4(),
+        body="No messages found",
+        contact_email=None,
+        contact_id=uuid4(),
+        contact_full_name=None,
+        contact_slack_display_name=None,
+        contact_phone_number=None,
+        contact_status=None,
+        channel=InboxType.NONE,
+        inbox_name="",
+        inbox_id=uuid4(),
+        thread_id=None,
+    )
+
+
 class ReadMessageNode(BaseNode):
     class Ports(BaseNode.Ports):
         no_action = Port.on_if(
@@ -65,45 +80,18 @@ class ReadMessageNode(BaseNode):
     def run(self) -> Outputs:
         try:
             with postgres_session() as session:
-                ranked_operations = (
-                    select(
-                        InboxMessageOperation.inbox_message_id,
-                        InboxMessageOperation.operation,
-                        func.row_number()
-                        .over(
-                            partition_by=[InboxMessageOperation.inbox_message_id],  # type: ignore
-                            order_by=InboxMessageOperation.created_at.desc()  # type: ignore
-                        )
-                        .label("rn"),
-                    )
-                    .subquery()
-                )
-
-                latest_operations_subquery = (
-                    select(ranked_operations.c.inbox_message_id, ranked_operations.c.operation)
-                    .where(ranked_operations.c.rn == 1)
-                    .subquery()
-                )
-
-                statement = (
-                    select(InboxMessage, Inbox.type, Inbox.name, Contact)
-                    .join(
-                        latest_operations_subquery,
-                        latest_operations_subquery.c.inbox_message_id == InboxMessage.id,
-                        isouter=True
-                    )
-                    .join(Inbox, Inbox.id == InboxMessage.inbox_id)  # type: ignore
-                    .join(Contact, Contact.id == InboxMessage.contact_id)  # type: ignore
-                    .where(
-                        or_(
-                            latest_operations_subquery.c.operation.is_(None),
-                            latest_operations_subquery.c.operation == InboxMessageOperationType.UNREAD
-                        )
+                worker_id = getattr(self.state, "lease_owner", None) or get_worker_id()
+                # Batch runs claim each message before starting its workflow and hand it over
+                claimed_message_id = getattr(self.state, "claimed_message_id", None)
+                if claimed_message_id:
+                    result = get_claimed_message(session, claimed_message_id, worker_id)
+                    if not result:
+                        logger.warning(f"Lease on message {claimed_message_id} was lost before triage started")
+                        return self.Outputs(message=_no_message(), job=None)
+                else:
+                    result = claim_next_unread_message(
+                        session, worker_id=worker_id, execution_id=self.state.meta.span_id
                     )
-                    .order_by(InboxMessage.created_at.desc())  # type: ignore
-                )
-
-                result = session.exec(statement).first()
 
                 if not result:
                     # No messages found, check for jobs
@@ -127,20 +115,7 @@ class ReadMessageNode(BaseNode):
                     if job_result:
                         # Found a job to process
                         return self.Outputs(
-                            message=SlimMessage(
-                                message_id=uuid4(),
-                                body="No messages found",
-                                contact_email=None,
-                                contact_id=uuid4(),
-                                contact_full_name=None,
-                                contact_slack_display_name=None,
-                                contact_phone_number=None,
-                                contact_status=None,
-                                channel=InboxType.NONE,
-                                inbox_name="",
-                                inbox_id=uuid4(),
-                                thread_id=None,
-                            ),
+                            message=_no_message(),
                             job=SlimJob(
                                 job_id=job_result.id,
                                 name=job_result.name,
@@ -153,35 +128,13 @@ class ReadMessageNode(BaseNode):
                     else:
                         # No messages and no jobs
                         return self.Outputs(
-                            message=SlimMessage(
-                                message_id=uuid4(),
-                                body="No messages found",
-                                contact_email=None,
-                                contact_id=uuid4(),
-                                contact_full_name=None,
-                                contact_slack_display_name=None,
-                                contact_phone_number=None,
-                                contact_status=None,
-                                channel=InboxType.NONE,
-                                inbox_name="",
-                                inbox_id=uuid4(),
-                                thread_id=None,
-                            ),
+                            message=_no_message(),
                             job=None,
                         )
 
                 inbox_message, inbox_type, inbox_name, contact = result
-                
-                execution_id = self.state.meta.span_id
-                
-                session.add(
-                    InboxMessageOperation(
-                        inbox_message_id=inbox_message.id,
-                        operation=InboxMessageOperationType.READ,
-                        execution_id=execution_id,
-                    )
-                )
-                session.commit()
+                # Later nodes look this contact up again, so serve them from memory
+                contact_cache.put(contact)
                 
                 repos_statement = select(ContactGithubRepo).where(
                     ContactGithubRepo.contact_id == inbox_message.contact_id
@@ -212,19 +165,6 @@ class ReadMessageNode(BaseNode):
                 )
         except (psycopg.OperationalError, SQLAlchemyOperationalError):
             return self.Outputs(
-                message=SlimMessage(
-                    message_id=uuid4(),
-                    body="No messages found",
-                    contact_email=None,
-                    contact_id=uuid4(),
-                    contact_full_name=None,
-                    contact_slack_display_name=None,
-                    contact_phone_number=None,
-                    contact_status=None,
-                    channel=InboxType.NONE,
-                    inbox_name="",
-                    inbox_id=uuid4(),
-                    thread_id=None,
-                ),
+                message=_no_message(),
                 job=None,
             )
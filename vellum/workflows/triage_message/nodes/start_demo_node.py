@@ -3,8 +3,7 @@ from datetime import datetime, timedelta, UTC
 from vellum.workflows.nodes import BaseNode
 from services import ActionRecord, postgres_session
 from models.job import Job
-from models.contact import Contact
-from sqlmodel import select
+from services.contacts import get_contact
 from .read_message_node import ReadMessageNode
 from .triage_message_node import TriageMessageNode
 
@@ -22,12 +21,11 @@ class StartDemoNode(BaseNode):
         try:
             # Fetch contact information to create a meaningful job name
             contact_identifier = "contact"
+            contact = get_contact(self.contact_id)
+            if contact:
+                contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
+
             with postgres_session() as session:
-                statement = select(Contact).where(Contact.id == self.contact_id)
-                contact = session.exec(statement).first()
-                if contact:
-                    contact_identifier = contact.identifier or contact.email or contact.phone_number or str(self.contact_id)
-                
                 # Create a job for demo creation that another agent can pick up
                 job = Job(
                     name=f"Create demo for {contact_identifier}",
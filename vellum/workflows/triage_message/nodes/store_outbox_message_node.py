@@ -1,4 +1,6 @@
+import logging
 from services import postgres_session
+from services.inbox import get_worker_id, release_inbox_message_leases
 from vellum.workflows.nodes import BaseNode
 from .email_reply_node import EmailReplyNode
 from .email_initiate_node import EmailInitiateNode
@@ -7,6 +9,8 @@ from .slack_reply_node import SlackReplyNode
 from .job_opportunity_response_node import JobOpportunityResponseNode
 from .read_message_node import ReadMessageNode
 
+logger = logging.getLogger(__name__)
+
 
 class StoreOutboxMessageNode(BaseNode):
     summary = (
@@ -37,12 +41,16 @@ class StoreOutboxMessageNode(BaseNode):
         message_url: str
 
     def run(self) -> BaseNode.Outputs:
-        if self.outbox_message is not None:
-            with postgres_session() as session:
+        with postgres_session() as session:
+            if self.outbox_message is not None:
                 session.add(self.outbox_message)
                 for recipient in self.recipients:
                     session.add(recipient)
-                session.commit()
+            # The reply is already sent, so it is stored even if the lease expired meanwhile
+            worker_id = getattr(self.state, "lease_owner", None) or get_worker_id()
+            if not release_inbox_message_leases(session, [self.message.message_id], worker_id):
+                logger.warning(f"Lease on message {self.message.message_id} expired before triage finished")
+            session.commit()
 
         message_url = f"/admin/messages/{self.message.message_id}"
         return self.Outputs(summary=self.summary, message_url=message_url)
@@ -12,10 +12,15 @@ from ..state import State
 from typing import Optional
 
 
-def get_message_history(message_id: Optional[str] = None) -> str:
+def get_message_history(
+    message_id: Optional[str] = None,
+    limit: Optional[int] = None,
+    before: Optional[str] = None,
+) -> str:
     """
-    Retrieve the last 5 messages (incoming and outgoing) from the same contact to provide
-    conversation context. This helps understand the message history before deciding on an action.
+    Retrieve the most recent messages (incoming and outgoing) from the same contact to provide
+    conversation context, 5 at a time by default or up to 50 with `limit`, newest first.
+    This helps understand the message history before deciding on an action.
     
     Use this function when:
     - You need context about previous interactions with this contact
@@ -27,15 +32,18 @@ def get_message_history(message_id: Optional[str] = None) -> str:
     with the conversation context available in action_history.
     
     IMPORTANT: If you see in the action_history that get_message_history has already been called,
-    DO NOT call it again. The history is already available in the action_history. Use that
-    information to inform your response instead.
+    DO NOT call it again with the same arguments. The history is already available in the
+    action_history. Only call it again with `before` if you need messages older than those shown.
     
     Args:
         message_id: Optional UUID of the message to get history for. If not provided,
                    uses the current message being triaged.
+        limit: Optional number of messages to retrieve, up to 50. Defaults to 5.
+        before: Optional cursor from the "Older messages available with before=..." line of a
+                previous history result, to retrieve the next older page.
     
     Returns:
-        A formatted string containing the last 5 messages with timestamps, sources, and bodies
+        A formatted string containing the messages with timestamps, sources, and bodies
     """
     raise NotImplementedError("Tool stub. Implemented in GetMessageHistoryNode.")
 
@@ -1,9 +1,11 @@
+import logging
 from vellum.workflows.nodes import BaseNode
-from services.aws import get_aws_session, generate_s3_key
-from services.constants import S3_MEMORY_BUCKET
+from services.contact_summaries import put_contact_summary
 from .fetch_contact_summary_node import FetchContactSummaryNode
 from .update_contact_summary_node import UpdateContactSummaryNode
 
+logger = logging.getLogger(__name__)
+
 
 class UploadContactSummaryNode(BaseNode):
     contact_id = FetchContactSummaryNode.Outputs.contact_id
@@ -14,24 +16,8 @@ class UploadContactSummaryNode(BaseNode):
 
     def run(self) -> Outputs:
         try:
-            session = get_aws_session()
-            s3_client = session.client("s3")
-            bucket_name = S3_MEMORY_BUCKET
-            
-            base_key = f"contacts/{self.contact_id}/summary.txt"
-            key = generate_s3_key(base_key)
-            
-            s3_client.put_object(
-                Bucket=bucket_name,
-                Key=key,
-                Body=self.updated_summary.encode("utf-8"),
-                ContentType="text/plain",
-            )
-            
-            del s3_client
-            del session
-            
+            put_contact_summary(self.contact_id, self.updated_summary)
             return self.Outputs(success=True)
-        except Exception as e:
-            print(f"Failed to upload contact summary to S3: {e}")
+        except Exception:
+            logger.exception(f"Failed to upload the summary of contact {self.contact_id} to S3")
             return self.Outputs(success=False)
@@ -1,7 +1,11 @@
-from typing import List
+from typing import List, Optional
+from uuid import UUID
 from vellum.workflows.state import BaseState
 from services import ActionRecord
 
 
 class State(BaseState):
     action_history: List[ActionRecord] = []
+    claimed_message_id: Optional[UUID] = None
+    # Worker the message's lease is held by. Defaults to this process, see services.inbox.get_worker_id.
+    lease_owner: Optional[str] = None
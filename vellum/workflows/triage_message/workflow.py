@@ -68,7 +68,7 @@ class TriageMessageWorkflow(BaseWorkflow[BaseInputs, State]):
                 }
                 >> StoreOutboxMessageNode,
             },
-            FetchContactSummaryNode >> UpdateContactSummaryNode >> UploadContactSummaryNode,
+            FetchContactSummaryNode.Ports.update >> UpdateContactSummaryNode >> UploadContactSummaryNode,
         },
     }
 